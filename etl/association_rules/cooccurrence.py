@@ -0,0 +1,220 @@
+"""
+association_rules/cooccurrence.py
+Motor de reglas de asociación por co-ocurrencia (alternativo a FP-Growth).
+
+Las aplicaciones consumen casi exclusivamente reglas 1→1 y 2→1
+(sp_obtener_consecuentes_por_skus), así que no hace falta minar todos los
+itemsets frecuentes. Con la canasta one-hot X (transacciones × ítems, CSR):
+
+- Soporte de pares:   XᵀX (ítems × ítems)
+- Soporte de triples: Yᵀ X, con Y[:, k] = X[:, a_k] ∧ X[:, b_k] para cada
+  par frecuente (a_k, b_k)
+
+Ambos productos son lineales en el número de transacciones. Con los mismos
+umbrales el resultado coincide con fpgrowth + association_rules para itemsets
+de hasta 3 ítems (mismas columnas y métricas); itemsets de 4+ ítems no se generan.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from association_rules.get_rules import (
+    MIN_CONFIDENCE,
+    MIN_LIFT,
+    MIN_SUPPORT,
+    cargar_datos,
+    construir_matriz_canasta,
+)
+
+# Columnas de mlxtend.frequent_patterns.association_rules, en el mismo orden
+RULE_COLUMNS = [
+    "antecedents",
+    "consequents",
+    "antecedent support",
+    "consequent support",
+    "support",
+    "confidence",
+    "lift",
+    "representativity",
+    "leverage",
+    "conviction",
+    "zhangs_metric",
+    "jaccard",
+    "certainty",
+    "kulczynski",
+]
+
+
+def _pares_frecuentes(conteo_pares, n, min_support):
+    """Pares (a, b) con a < b y soporte >= min_support."""
+    coo = sparse.triu(conteo_pares, k=1).tocoo()
+    mask = coo.data / n >= min_support
+    return coo.row[mask], coo.col[mask], coo.data[mask]
+
+
+def _triples_frecuentes(X, a, b, n, min_support):
+    """Triples (a, b, c) con a < b < c y soporte >= min_support, a partir
+    de los pares frecuentes (a, b)."""
+    if len(a) == 0:
+        vacio = np.array([], dtype=np.int64)
+        return vacio, vacio, vacio, vacio
+
+    columnas = X.tocsc()
+    # Y[:, k] = 1 si la transacción contiene a_k y b_k
+    Y = columnas[:, a].multiply(columnas[:, b]).tocsc()
+    conteo = (Y.T.tocsr() @ X).tocoo()
+
+    par, c = conteo.row, conteo.col
+    mask = (c > b[par]) & (conteo.data / n >= min_support)
+    return a[par[mask]], b[par[mask]], c[mask], conteo.data[mask]
+
+
+def _metricas(s_ac, s_a, s_c):
+    """Métricas de association_rules (mlxtend) a partir de los soportes."""
+    confianza = s_ac / s_a
+    lift = confianza / s_c
+    leverage = s_ac - s_a * s_c
+
+    conviccion = np.full(len(s_ac), np.inf)
+    finita = confianza < 1.0
+    conviccion[finita] = (1.0 - s_c[finita]) / (1.0 - confianza[finita])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom_zhang = np.maximum(s_ac * (1 - s_a), s_a * (s_c - s_ac))
+        zhang = np.where(denom_zhang == 0, 0, leverage / denom_zhang)
+        denom_certeza = 1 - s_c
+        certeza = np.where(denom_certeza == 0, 0, (confianza - s_c) / denom_certeza)
+
+    return {
+        "antecedent support": s_a,
+        "consequent support": s_c,
+        "support": s_ac,
+        "confidence": confianza,
+        "lift": lift,
+        "representativity": np.ones(len(s_ac)),
+        "leverage": leverage,
+        "conviction": conviccion,
+        "zhangs_metric": zhang,
+        "jaccard": s_ac / (s_a + s_c - s_ac),
+        "certainty": certeza,
+        "kulczynski": (s_ac / s_a + s_ac / s_c) / 2,
+    }
+
+
+def reglas_desde_matriz(
+    X,
+    items,
+    min_support=MIN_SUPPORT,
+    min_confidence=MIN_CONFIDENCE,
+    incluir_triples=True,
+):
+    """
+    Genera reglas de asociación desde la canasta one-hot.
+
+    Args:
+        X: Matriz CSR transacciones × ítems
+        items: Etiquetas (SKU) de las columnas de X
+        min_support: Soporte mínimo del itemset de la regla
+        min_confidence: Confianza mínima de la regla
+        incluir_triples: Generar también reglas 2→1 y 1→2
+
+    Returns:
+        DataFrame con el esquema de mlxtend.association_rules
+    """
+    n = X.shape[0]
+    if n == 0:
+        return pd.DataFrame(columns=RULE_COLUMNS)
+
+    X = sparse.csr_matrix(X, dtype=np.int32)
+    etiquetas = np.asarray(items, dtype=object)
+    soporte_item = np.asarray(X.sum(axis=0)).ravel() / n
+
+    conteo_pares = (X.T @ X).tocsr()
+    a, b, conteo_ab = _pares_frecuentes(conteo_pares, n, min_support)
+    s_ab = conteo_ab / n
+
+    # Reglas 1→1 en ambos sentidos
+    antecedentes = [(i,) for i in a] + [(j,) for j in b]
+    consecuentes = [(j,) for j in b] + [(i,) for i in a]
+    s_ac = [s_ab, s_ab]
+    s_a = [soporte_item[a], soporte_item[b]]
+    s_c = [soporte_item[b], soporte_item[a]]
+
+    if incluir_triples:
+        ta, tb, tc, conteo_abc = _triples_frecuentes(X, a, b, n, min_support)
+        s_abc = conteo_abc / n
+
+        def soporte_par(i, j):
+            return np.asarray(conteo_pares[i, j]).ravel() / n
+
+        # Cada triple {x, y, z} genera 3 reglas 2→1 y 3 reglas 1→2
+        for x, y, z in ((ta, tb, tc), (ta, tc, tb), (tb, tc, ta)):
+            antecedentes += list(zip(x, y))
+            consecuentes += [(k,) for k in z]
+            s_ac.append(s_abc)
+            s_a.append(soporte_par(x, y))
+            s_c.append(soporte_item[z])
+
+            antecedentes += [(k,) for k in z]
+            consecuentes += list(zip(x, y))
+            s_ac.append(s_abc)
+            s_a.append(soporte_item[z])
+            s_c.append(soporte_par(x, y))
+
+    if not antecedentes:
+        return pd.DataFrame(columns=RULE_COLUMNS)
+
+    metricas = _metricas(np.concatenate(s_ac), np.concatenate(s_a), np.concatenate(s_c))
+    rules = pd.DataFrame(
+        {
+            "antecedents": [frozenset(etiquetas[list(k)]) for k in antecedentes],
+            "consequents": [frozenset(etiquetas[list(k)]) for k in consecuentes],
+            **metricas,
+        },
+        columns=RULE_COLUMNS,
+    )
+    return rules[rules["confidence"] >= min_confidence].reset_index(drop=True)
+
+
+def generar_reglas_coocurrencia(incluir_triples=True):
+    """Equivalente a generar_reglas_asociacion usando el motor de co-ocurrencia."""
+    try:
+        print("\n=== Iniciando Generación de Reglas (co-ocurrencia) ===")
+        df = cargar_datos()
+
+        if df.empty:
+            print("❌ No hay transacciones con múltiples items para analizar")
+            return None
+
+        print(f"    Transacciones cargadas: {len(df)}")
+
+        X, _, items = construir_matriz_canasta(df)
+
+        if X.shape[0] == 0 or X.shape[1] == 0:
+            print("❌ No hay datos suficientes después de filtrar")
+            return None
+
+        print(
+            f"    Calculando co-ocurrencias con min_support={MIN_SUPPORT}, "
+            f"min_confidence={MIN_CONFIDENCE}, min_lift={MIN_LIFT}..."
+        )
+        rules = reglas_desde_matriz(X, items, incluir_triples=incluir_triples)
+
+        if not rules.empty:
+            rules = rules[rules["lift"] >= MIN_LIFT]
+
+        if not rules.empty:
+            print(f"\n=== {len(rules)} Reglas de asociación generadas ===")
+            rules_to_show = rules[
+                ["antecedents", "consequents", "support", "confidence", "lift"]
+            ].head(20)
+            print(rules_to_show)
+
+            return rules
+        else:
+            print("No se encontraron reglas con los parámetros especificados.")
+            return None
+    except Exception as e:
+        print(f"❌ Error en la generación de reglas de asociación: {e}")
+        return None
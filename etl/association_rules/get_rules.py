@@ -1,5 +1,7 @@
 from mlxtend.frequent_patterns import fpgrowth, association_rules
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from configs.connections import get_dw_engine
 
 
@@ -23,10 +25,15 @@ def cargar_datos():
     return pd.read_sql(query_get_transactions, engine)
 
 
-def transformar_a_one_hot(df):
-    """Transforma la lista (transaction_id, item) a formato one-hot:
-    una fila por transacción, una columna por ítem, 1 si aparece, 0 si no.
+def construir_matriz_canasta(df):
+    """Construye la canasta transacción x ítem como matriz CSR booleana.
     Filtra productos poco frecuentes para reducir uso de memoria.
+
+    Transacciones e ítems se codifican como enteros, así que la memoria crece
+    con el número de ítems comprados y no con transacciones × productos.
+
+    Returns:
+        tuple: (matriz CSR, índice de transacciones, índice de ítems)
     """
 
     # Paso 1: Explotar los items que vienen como strings separados por comas
@@ -45,16 +52,29 @@ def transformar_a_one_hot(df):
         f"    Transacciones después de filtrar: {df_exploded['transaction_id'].nunique()}"
     )
 
-    # Crear una tabla transacción x item usando sparse matrix
-    basket = (
-        df_exploded.groupby(["transaction_id", "item"])["item"]
-        .count()
-        .unstack()
-        .fillna(0)
+    # Paso 3: Codificar transacciones e ítems como enteros (ordenados, igual que unstack)
+    filas, transacciones = pd.factorize(df_exploded["transaction_id"], sort=True)
+    columnas, items = pd.factorize(df_exploded["item"], sort=True)
+
+    # Paso 4: Matriz CSR transacción x item; las entradas repetidas se combinan
+    matriz = sparse.csr_matrix(
+        (np.ones(len(filas), dtype=bool), (filas, columnas)),
+        shape=(len(transacciones), len(items)),
     )
+    return matriz, transacciones, items
+
 
-    # Convertimos a bool (más eficiente en memoria)
-    basket = basket.astype(bool)
+def transformar_a_one_hot(df):
+    """Transforma la lista (transaction_id, item) a formato one-hot:
+    una fila por transacción, una columna por ítem, True si aparece.
+
+    Se devuelve como DataFrame disperso (Sparse[bool]) sobre la matriz CSR de
+    construir_matriz_canasta, que fpgrowth acepta sin densificarlo.
+    """
+    matriz, transacciones, items = construir_matriz_canasta(df)
+    basket = pd.DataFrame.sparse.from_spmatrix(
+        matriz, index=transacciones, columns=items
+    )
     return basket
 
 
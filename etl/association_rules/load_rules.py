@@ -2,29 +2,101 @@ from datetime import datetime
 from sqlalchemy import text
 from configs.connections import get_dw_engine
 from association_rules.get_rules import generar_reglas_asociacion
+from association_rules.cooccurrence import generar_reglas_coocurrencia
 
 engine = get_dw_engine()
 
+# Motores de generación de reglas disponibles
+MOTOR_FPGROWTH = "fpgrowth"
+MOTOR_COOCURRENCIA = "cooccurrence"
+MOTORES = {
+    MOTOR_FPGROWTH: generar_reglas_asociacion,
+    MOTOR_COOCURRENCIA: generar_reglas_coocurrencia,
+}
 
-query_insert = """
-    INSERT INTO analytics.AssociationRules 
+
+# Inserción masiva en la tabla sombra (pyodbc, parámetros posicionales)
+query_insert_shadow = """
+    INSERT INTO analytics.AssociationRules_Shadow
     (Antecedent, Consequent, Support, Confidence, Lift, GeneratedAt)
-    VALUES 
-    (:Antecedent, :Consequent, :Support, :Confidence, :Lift, :GeneratedAt)
+    VALUES (?, ?, ?, ?, ?, ?)
 """
 
-query_delete = """
-    DELETE FROM analytics.AssociationRules
+query_truncate_shadow = """
+    TRUNCATE TABLE analytics.AssociationRules_Shadow;
+    TRUNCATE TABLE analytics.RuleItems_Shadow;
 """
 
+# Ítems normalizados de cada regla (una fila por SKU y rol), usados por los
+# procedimientos de recomendación; se calculan una vez por publicación
+query_insert_rule_items_shadow = """
+    WITH items AS (
+        SELECT r.RuleID, 'A' AS Role, LTRIM(RTRIM(s.value)) AS SKU
+        FROM analytics.AssociationRules_Shadow r
+        CROSS APPLY STRING_SPLIT(r.Antecedent, ',') s
+        UNION ALL
+        SELECT r.RuleID, 'C' AS Role, LTRIM(RTRIM(s.value)) AS SKU
+        FROM analytics.AssociationRules_Shadow r
+        CROSS APPLY STRING_SPLIT(r.Consequent, ',') s
+    ),
+    distintos AS (
+        SELECT DISTINCT RuleID, Role, SKU
+        FROM items
+        WHERE SKU <> ''
+    )
+    INSERT INTO analytics.RuleItems_Shadow (RuleID, SKU, Role, AntecedentSize)
+    SELECT
+        RuleID,
+        SKU,
+        Role,
+        COUNT(CASE WHEN Role = 'A' THEN 1 END) OVER (PARTITION BY RuleID)
+    FROM distintos
+"""
 
-def limpiar_reglas():
-    with engine.begin() as conn:
-        conn.execute(text(query_delete))
+# Publicación atómica (se ejecuta en una sola transacción): ambos SWITCH son
+# operaciones de metadatos, así que las APIs ven el conjunto de reglas anterior
+# o el nuevo, nunca uno parcial
+query_publicar_reglas = """
+    TRUNCATE TABLE analytics.AssociationRules_Retired;
+    TRUNCATE TABLE analytics.RuleItems_Retired;
+    ALTER TABLE analytics.AssociationRules SWITCH TO analytics.AssociationRules_Retired;
+    ALTER TABLE analytics.RuleItems SWITCH TO analytics.RuleItems_Retired;
+    ALTER TABLE analytics.AssociationRules_Shadow SWITCH TO analytics.AssociationRules;
+    ALTER TABLE analytics.RuleItems_Shadow SWITCH TO analytics.RuleItems;
+"""
+
+query_truncate_retired = """
+    TRUNCATE TABLE analytics.AssociationRules_Retired;
+    TRUNCATE TABLE analytics.RuleItems_Retired;
+"""
+
+
+def sku_canonico(sku):
+    """
+    Forma canónica de un SKU en las reglas: sin espacios alrededor y en
+    mayúsculas ('sku-0001 ' -> 'SKU-0001'). Los procedimientos
+    dw.sp_obtener_consecuentes* aplican la misma transformación
+    (UPPER(LTRIM(RTRIM(value)))) a la canasta de entrada antes de calcular el
+    hash, que compara bytes exactos; si cambia aquí, debe cambiar allá.
+    """
+    return str(sku).strip().upper()
+
+
+def clave_canasta(skus):
+    """
+    Antecedent/Consequent canónico: SKUs canónicos sin repetir, ordenados por
+    código (orden binario, el mismo que STRING_AGG ... COLLATE Latin1_General_BIN2)
+    y separados por ', '.
 
+    >>> clave_canasta(["sku-0002", " SKU-0001", "SKU-0002"])
+    'SKU-0001, SKU-0002'
+    """
+    return ", ".join(sorted({sku_canonico(sku) for sku in skus} - {""}))
 
-def preparar_datos_para_insercion(rules):
-    # Prepara los datos en formato de diccionarios para inserción
+
+def preparar_datos_para_insercion(rules, generated_at):
+    """Convierte las reglas en filas (tuplas) para la inserción masiva.
+    Todas las reglas de una publicación comparten el mismo GeneratedAt."""
 
     if rules is None or rules.empty:
         print("⚠️ No hay reglas para preparar")
@@ -32,58 +104,76 @@ def preparar_datos_para_insercion(rules):
 
     datos_para_insertar = []
 
-    for index, row in rules.iterrows():
-        dato = {
-            "Antecedent": ", ".join(sorted(list(row["antecedents"]))),
-            "Consequent": ", ".join(sorted(list(row["consequents"]))),
-            "Support": float(row["support"]),
-            "Confidence": float(row["confidence"]),
-            "Lift": float(row["lift"]),
-            "GeneratedAt": datetime.now(),
-        }
-        datos_para_insertar.append(dato)
+    # Clave canónica que reconstruyen los procedimientos de recomendación
+    # (ver clave_canasta / sku_canonico)
+    for row in rules.itertuples(index=False):
+        datos_para_insertar.append(
+            (
+                clave_canasta(row.antecedents),
+                clave_canasta(row.consequents),
+                float(row.support),
+                float(row.confidence),
+                float(row.lift),
+                generated_at,
+            )
+        )
 
     return datos_para_insertar
 
 
-def insertar_reglas_sql(datos_para_insertar):
-    if not datos_para_insertar:
-        print("⚠️ No hay datos para insertar")
-        return
+def cargar_reglas_en_sombra(conn, datos_para_insertar):
+    """Carga las reglas en analytics.AssociationRules_Shadow en un solo lote
+    y deriva de ellas analytics.RuleItems_Shadow."""
+    conn.exec_driver_sql(query_truncate_shadow)
 
+    cursor = conn.connection.cursor()
     try:
-        registros_insertados = 0
-        with engine.connect() as conn:
-            for dato in datos_para_insertar:
-                conn.execute(text(query_insert), dato)
-                conn.commit()
-                registros_insertados += 1
+        cursor.fast_executemany = True
+        cursor.executemany(query_insert_shadow, datos_para_insertar)
+    finally:
+        cursor.close()
+
+    conn.execute(text(query_insert_rule_items_shadow))
+
 
-    except Exception as e:
-        print(f"❌ Error al insertar: {str(e)}")
+def publicar_reglas(datos_para_insertar):
+    """Carga las reglas en la tabla sombra y las publica con SWITCH."""
+    with engine.begin() as conn:
+        cargar_reglas_en_sombra(conn, datos_para_insertar)
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(query_publicar_reglas)
+
+    # Las reglas anteriores ya no son visibles; liberar el espacio
+    with engine.begin() as conn:
+        conn.exec_driver_sql(query_truncate_retired)
 
 
-def carga_reglas_asociacion():
-    """Función principal"""
+def carga_reglas_asociacion(motor=MOTOR_FPGROWTH):
+    """Función principal
 
-    # Limpiar tabla de reglas existentes
-    limpiar_reglas()
+    Args:
+        motor: 'fpgrowth' (itemsets de cualquier tamaño) o 'cooccurrence'
+            (reglas 1→1, 2→1 y 1→2 por co-ocurrencia, más rápido)
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de reglas desconocido: {motor}")
 
-    # Obtener reglas
-    rules = generar_reglas_asociacion()
+    # Obtener reglas (las publicadas siguen disponibles mientras tanto)
+    rules = MOTORES[motor]()
 
     if rules is None or rules.empty:
-        print("❌ No se generaron reglas de asociación.")
+        print("❌ No se generaron reglas de asociación; se conservan las actuales.")
         return
 
     # Preparar datos para inserción
-    datos_para_insertar = preparar_datos_para_insercion(rules)
+    datos_para_insertar = preparar_datos_para_insercion(rules, datetime.now())
 
     if not datos_para_insertar:
         print("❌ No se pudieron preparar los datos.")
         return
 
-    # Insertar en SQL
-    insertar_reglas_sql(datos_para_insertar)
+    # Cargar en la tabla sombra y publicar de forma atómica
+    publicar_reglas(datos_para_insertar)
 
-    print("Reglas de asociación procesadas correctamente.")
+    print(f"{len(datos_para_insertar)} reglas de asociación publicadas correctamente.")
@@ -0,0 +1,119 @@
+"""
+benchmarks/basket.py
+Compare the dense basket builder (groupby/unstack) with the sparse CSR builder
+used by association_rules.get_rules.transformar_a_one_hot.
+
+Uses synthetic data with the shape of dw.vw_Transacciones (one row per
+transaction, items as a comma-separated string), so no database is needed.
+
+Usage (from etl/):
+    uv run python -m benchmarks.basket
+    uv run python -m benchmarks.basket --sizes 25000,250000 --items 3000
+    uv run python -m benchmarks.basket --dense-limit 0     # sparse only
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from association_rules.get_rules import MIN_ITEM_FREQUENCY, transformar_a_one_hot
+
+DEFAULT_SIZES = [25_000, 250_000, 2_500_000]
+DEFAULT_ITEMS = 2_000
+# The dense path needs ~ transactions x items x 9 bytes (float64 + bool copy)
+DEFAULT_DENSE_LIMIT = 250_000
+
+
+def generar_transacciones(n_transacciones, n_items, seed=42):
+    """Synthetic (transaction_id, item) frame with 2-6 items per order and
+    Zipf-like product popularity."""
+    rng = np.random.default_rng(seed)
+    tamanos = rng.integers(2, 7, size=n_transacciones)
+    total = int(tamanos.sum())
+
+    popularidad = 1.0 / np.arange(1, n_items + 1)
+    popularidad /= popularidad.sum()
+    codigos = rng.choice(n_items, size=total, p=popularidad)
+
+    skus = np.array([f"SKU-{i:04d}" for i in range(n_items)], dtype=object)
+    transaccion = np.repeat(np.arange(n_transacciones), tamanos)
+    exploded = pd.DataFrame({"transaction_id": transaccion, "item": skus[codigos]})
+
+    df = exploded.groupby("transaction_id")["item"].agg(", ".join).reset_index()
+    return df
+
+
+def basket_denso(df):
+    """Previous implementation: dense transaction x item frame."""
+    df_exploded = df.assign(item=df["item"].str.split(", ")).explode("item")
+    df_exploded = df_exploded[df_exploded["item"].str.strip() != ""]
+
+    item_counts = df_exploded["item"].value_counts()
+    frequent_items = item_counts[item_counts >= MIN_ITEM_FREQUENCY].index
+    df_exploded = df_exploded[df_exploded["item"].isin(frequent_items)]
+
+    basket = (
+        df_exploded.groupby(["transaction_id", "item"])["item"]
+        .count()
+        .unstack()
+        .fillna(0)
+    )
+    return basket.astype(bool)
+
+
+def medir(fn, df):
+    """Run fn(df) and return (seconds, peak MB, result)."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = fn(df)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico / 1024 / 1024, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense vs sparse basket builder")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(n) for n in DEFAULT_SIZES),
+        help="Comma-separated transaction counts.",
+    )
+    parser.add_argument("--items", type=int, default=DEFAULT_ITEMS)
+    parser.add_argument(
+        "--dense-limit",
+        type=int,
+        default=DEFAULT_DENSE_LIMIT,
+        help="Skip the dense builder above this many transactions.",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'transactions':>12} {'builder':>7} {'seconds':>9} {'peak MB':>10} {'shape':>16}"
+    )
+    for n in (int(x) for x in args.sizes.split(",")):
+        df = generar_transacciones(n, args.items)
+
+        segundos, pico, basket = medir(transformar_a_one_hot, df)
+        print(
+            f"{n:>12} {'sparse':>7} {segundos:>9.2f} {pico:>10.1f} {str(basket.shape):>16}"
+        )
+        del basket
+
+        if n > args.dense_limit:
+            estimado = n * args.items * 9 / 1024 / 1024
+            print(f"{n:>12} {'dense':>7} {'skipped':>9} {f'~{estimado:,.0f}':>10}")
+            continue
+
+        segundos, pico, basket = medir(basket_denso, df)
+        print(
+            f"{n:>12} {'dense':>7} {segundos:>9.2f} {pico:>10.1f} {str(basket.shape):>16}"
+        )
+        del basket
+
+
+if __name__ == "__main__":
+    main()
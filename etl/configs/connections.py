@@ -4,6 +4,7 @@ Configuración de conexiones a bases de datos.
 
 import os
 
+import httpx
 from dotenv import load_dotenv
 from pymongo import MongoClient
 from sqlalchemy import create_engine
@@ -51,11 +52,25 @@ MONGO_DB = os.getenv("MONGO_DB")
 # Variables de conexión Supabase
 SUPABASE_URI = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Extracción por la API REST (PostgREST): filas por página (el máximo del
+# proyecto suele ser 1000) y páginas en vuelo a la vez entre todas las tablas
+SUPABASE_PAGE_SIZE = int(os.getenv("SUPABASE_PAGE_SIZE", "1000"))
+SUPABASE_MAX_CONCURRENCY = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "8"))
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "30"))
 
 # Variables de conexión Neo4j
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+# Extracción de relaciones: registros por lote del driver, ancho de cada
+# página de ids internos y una sesión en paralelo por tipo de relación
+NEO4J_FETCH_SIZE = int(os.getenv("NEO4J_FETCH_SIZE", "1000"))
+NEO4J_PAGE_SIZE = int(os.getenv("NEO4J_PAGE_SIZE", "50000"))
+NEO4J_PARALLEL_SESSIONS = os.getenv("NEO4J_PARALLEL_SESSIONS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
 
 
 def get_dw_engine():
@@ -108,6 +123,26 @@ def get_supabase_client():
     return client
 
 
+def get_supabase_rest_client(max_connections: int = SUPABASE_MAX_CONCURRENCY):
+    """
+    Cliente HTTP asíncrono para la API REST de Supabase (/rest/v1), con un
+    pool del tamaño de la concurrencia de extracción. Se cierra con aclose().
+    """
+    return httpx.AsyncClient(
+        base_url=f"{SUPABASE_URI.rstrip('/')}/rest/v1",
+        headers={
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Accept": "application/json",
+        },
+        timeout=SUPABASE_HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+    )
+
+
 def get_neo4j_driver():
     uri = NEO4J_URI
     user = NEO4J_USERNAME
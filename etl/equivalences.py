@@ -23,7 +23,10 @@ Priority for SKU resolution:
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
+
+if TYPE_CHECKING:
+    from sku_sequence import SkuSequence
 
 
 @dataclass
@@ -79,8 +82,9 @@ class EquivalenceMap:
         self._by_name_cat: Dict[tuple, ProductEquivalence] = {}
         # Map: (source, source_code) -> ProductEquivalence
         self._by_source_code: Dict[tuple, ProductEquivalence] = {}
-        # Counter for generating new SKUs
+        # Counter for generating new SKUs (used when no SkuSequence is given)
         self._next_sku_num = 1
+        self._sku_sequence: Optional["SkuSequence"] = None
         # Track if SKUs have been resolved
         self._resolved = False
 
@@ -266,17 +270,20 @@ class EquivalenceMap:
 
     def _generate_sku(self) -> str:
         """Generate a new unique SKU."""
+        if self._sku_sequence is not None:
+            return self._sku_sequence.next_sku()
         sku = f"SKU-{self._next_sku_num:04d}"
         self._next_sku_num += 1
         return sku
 
-    def resolve_skus(self, existing_max_sku: int = 0):
+    def resolve_skus(self, sku_sequence: Optional["SkuSequence"] = None):
         """
         Resolve SKUs for all products using priority order.
 
         Args:
-            existing_max_sku: The highest SKU number already in the database.
-                              New SKUs will start from this + 1.
+            sku_sequence: Shared DW sequence to take new SKU numbers from.
+                          Without it, new SKUs are numbered locally from 1
+                          (only safe for dry runs).
 
         Priority:
         1. MSSQL SKU (canonical)
@@ -285,8 +292,7 @@ class EquivalenceMap:
         4. Neo4j sku
         5. Generate new SKU
         """
-        if existing_max_sku > 0:
-            self._next_sku_num = existing_max_sku + 1
+        self._sku_sequence = sku_sequence
 
         # First pass: collect all existing SKUs to avoid duplicates
         existing_skus = set()
@@ -449,7 +455,7 @@ def build_equivalence_map(
     productos_supabase: List[Dict] = None,
     productos_mongo: List[Dict] = None,
     productos_neo4j: List[Dict] = None,
-    existing_max_sku: int = 0,
+    sku_sequence: Optional["SkuSequence"] = None,
     debug: bool = False,
 ) -> EquivalenceMap:
     """
@@ -463,7 +469,7 @@ def build_equivalence_map(
         productos_supabase: Products from Supabase extraction
         productos_mongo: Products from MongoDB extraction
         productos_neo4j: Products from Neo4j extraction
-        existing_max_sku: Highest SKU number already in database
+        sku_sequence: Sequence that hands out numbers for new SKUs
         debug: Print debug information
 
     Returns:
@@ -511,6 +517,6 @@ def build_equivalence_map(
                 f"      Neo4j: added {len(productos_neo4j)} products, unique now: {len(eq_map)} (+{len(eq_map) - before})"
             )
 
-    eq_map.resolve_skus(existing_max_sku)
+    eq_map.resolve_skus(sku_sequence)
 
     return eq_map
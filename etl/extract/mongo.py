@@ -1,4 +1,5 @@
 from configs.connections import get_mongo_database
+from extract.streaming import DEFAULT_CHUNK_SIZE, StreamedAggregation
 
 db = get_mongo_database()
 
@@ -6,15 +7,64 @@ products_collection = db["productos"]
 clients_collection = db["clientes"]
 orders_collection = db["ordenes"]
 
+# -----------------------------------------------------------------------
+#    Items de orden aplanados en el servidor (modo streaming)
+#    Una fila por item con los campos que se escriben a stg.orden_items y
+#    el codigo_mongo del producto ya resuelto ($lookup)
+# -----------------------------------------------------------------------
+pipeline_orden_items = [
+    {"$unwind": "$items"},
+    {
+        "$lookup": {
+            "from": "productos",
+            "localField": "items.producto_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"_id": 0, "codigo_mongo": 1}}],
+            "as": "producto",
+        }
+    },
+    {
+        "$project": {
+            "_id": 0,
+            "orden_id": {"$toString": "$_id"},
+            "cliente_id": {"$toString": "$cliente_id"},
+            "fecha": 1,
+            "canal": 1,
+            "moneda": 1,
+            "total_orden": "$total",
+            "producto_id": {"$toString": "$items.producto_id"},
+            "cantidad": "$items.cantidad",
+            "precio_unitario": "$items.precio_unit",
+            "codigo_mongo": {"$arrayElemAt": ["$producto.codigo_mongo", 0]},
+        }
+    },
+]
 
-def extract_mongo():
+
+def extract_mongo(stream: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE):
     """
     Extrae datos de MongoDB y los convierte a listas para poder procesarlos múltiples veces.
     Retorna tupla: (lista_productos, lista_clientes, lista_ordenes)
+
+    Con stream=True las órdenes no se leen aquí: se devuelve un
+    StreamedAggregation sobre pipeline_orden_items (items ya aplanados, en
+    bloques de chunk_size) que se recorre durante la transformación.
+    Retorna tupla: (lista_productos, lista_clientes, orden_items)
     """
     # Convertir cursores a listas para poder iterar múltiples veces
     lista_productos = list(products_collection.find())
     lista_clientes = list(clients_collection.find())
+
+    if stream:
+        print(
+            f"    mongo: {len(lista_clientes)} clients | {len(lista_productos)} products | items streamed"
+        )
+        return (
+            lista_productos,
+            lista_clientes,
+            StreamedAggregation(orders_collection, pipeline_orden_items, chunk_size),
+        )
+
     lista_ordenes = list(orders_collection.find())
 
     # Count total items from orders
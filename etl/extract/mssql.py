@@ -3,71 +3,226 @@ extract/mssql.py
 Extracción de datos desde la base de datos transaccional DB_SALES en MS SQL Server.
 """
 
+from typing import Dict, Optional
+
 from sqlalchemy import text
 
 from configs.connections import get_mssql_sales_engine
+from extract.streaming import DEFAULT_CHUNK_SIZE, StreamedQuery
+from extract.watermarks import ExtractWindow
+
+SOURCE = "mssql"
 
 engine = get_mssql_sales_engine()
 
 
-def extract_mssql():
-    """
-    Extrae datos de las tablas Cliente, Producto, Orden y OrdenDetalle
-    de la base de datos DB_SALES en MS SQL Server.
+# -----------------------------------------------------------------------
+#            Queries de extracción
+# -----------------------------------------------------------------------
+
+query_clientes = """
+    SELECT
+        ClienteId,
+        Nombre,
+        Email,
+        Genero,
+        Pais,
+        FechaRegistro
+    FROM dbo.Cliente
+    ORDER BY ClienteId
+"""
 
-    Returns:
-        tuple: (clientes, productos, ordenes, orden_detalles)
-    """
+query_productos = """
+    SELECT
+        ProductoId,
+        SKU,
+        Nombre,
+        Categoria
+    FROM dbo.Producto
+    ORDER BY ProductoId
+"""
 
-    query_clientes = """
-        SELECT
-            ClienteId,
-            Nombre,
-            Email,
-            Genero,
-            Pais,
-            FechaRegistro
-        FROM dbo.Cliente
-        ORDER BY ClienteId
-    """
+query_ordenes = """
+    SELECT
+        OrdenId,
+        ClienteId,
+        Fecha,
+        Canal,
+        Moneda,
+        Total
+    FROM dbo.Orden
+    ORDER BY OrdenId
+"""
 
-    query_productos = """
-        SELECT
-            ProductoId,
-            SKU,
-            Nombre,
-            Categoria
-        FROM dbo.Producto
-        ORDER BY ProductoId
-    """
+query_orden_detalles = """
+    SELECT
+        OrdenDetalleId,
+        OrdenId,
+        ProductoId,
+        Cantidad,
+        PrecioUnit,
+        DescuentoPct
+    FROM dbo.OrdenDetalle
+    ORDER BY OrdenDetalleId
+"""
+
+# Modo streaming: cada detalle con las columnas de su orden (una fila sirve
+# como `orden` y como `detalle` en la transformación)
+query_orden_items = """
+    SELECT
+        d.OrdenDetalleId,
+        d.OrdenId,
+        d.ProductoId,
+        d.Cantidad,
+        d.PrecioUnit,
+        d.DescuentoPct,
+        o.ClienteId,
+        o.Fecha,
+        o.Canal,
+        o.Moneda,
+        o.Total
+    FROM dbo.OrdenDetalle d
+    INNER JOIN dbo.Orden o ON o.OrdenId = d.OrdenId
+    ORDER BY d.OrdenDetalleId
+"""
+
+# -----------------------------------------------------------------------
+#    Modo incremental (extract/watermarks.py): filas en (desde, hasta]
+# -----------------------------------------------------------------------
+
+query_max_ids = """
+    SELECT
+        (SELECT MAX(ClienteId) FROM dbo.Cliente) AS Cliente,
+        (SELECT MAX(OrdenId) FROM dbo.Orden) AS Orden,
+        (SELECT MAX(OrdenDetalleId) FROM dbo.OrdenDetalle) AS OrdenDetalle
+"""
+
+query_clientes_incremental = """
+    SELECT
+        ClienteId,
+        Nombre,
+        Email,
+        Genero,
+        Pais,
+        FechaRegistro
+    FROM dbo.Cliente
+    WHERE ClienteId > :desde_cliente AND ClienteId <= :hasta_cliente
+    ORDER BY ClienteId
+"""
+
+# Órdenes nuevas más las órdenes de los detalles nuevos
+query_ordenes_incremental = """
+    SELECT
+        OrdenId,
+        ClienteId,
+        Fecha,
+        Canal,
+        Moneda,
+        Total
+    FROM dbo.Orden
+    WHERE (OrdenId > :desde_orden AND OrdenId <= :hasta_orden)
+        OR OrdenId IN (
+            SELECT OrdenId
+            FROM dbo.OrdenDetalle
+            WHERE OrdenDetalleId > :desde_detalle AND OrdenDetalleId <= :hasta_detalle
+        )
+    ORDER BY OrdenId
+"""
+
+query_orden_detalles_incremental = """
+    SELECT
+        OrdenDetalleId,
+        OrdenId,
+        ProductoId,
+        Cantidad,
+        PrecioUnit,
+        DescuentoPct
+    FROM dbo.OrdenDetalle
+    WHERE OrdenDetalleId > :desde_detalle AND OrdenDetalleId <= :hasta_detalle
+    ORDER BY OrdenDetalleId
+"""
+
+query_orden_items_incremental = """
+    SELECT
+        d.OrdenDetalleId,
+        d.OrdenId,
+        d.ProductoId,
+        d.Cantidad,
+        d.PrecioUnit,
+        d.DescuentoPct,
+        o.ClienteId,
+        o.Fecha,
+        o.Canal,
+        o.Moneda,
+        o.Total
+    FROM dbo.OrdenDetalle d
+    INNER JOIN dbo.Orden o ON o.OrdenId = d.OrdenId
+    WHERE d.OrdenDetalleId > :desde_detalle AND d.OrdenDetalleId <= :hasta_detalle
+    ORDER BY d.OrdenDetalleId
+"""
 
-    query_ordenes = """
-        SELECT
-            OrdenId,
-            ClienteId,
-            Fecha,
-            Canal,
-            Moneda,
-            Total
-        FROM dbo.Orden
-        ORDER BY OrdenId
+
+def read_max_ids() -> Dict[str, Optional[int]]:
+    """MAX(id) de Cliente, Orden y OrdenDetalle (límite superior de la ventana)."""
+    with engine.connect() as conn:
+        row = conn.execute(text(query_max_ids)).one()
+    return dict(row._mapping)
+
+
+def extract_mssql(
+    stream: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    window: Optional[ExtractWindow] = None,
+):
     """
+    Extrae datos de las tablas Cliente, Producto, Orden y OrdenDetalle
+    de la base de datos DB_SALES en MS SQL Server.
 
-    query_orden_detalles = """
-        SELECT
-            OrdenDetalleId,
-            OrdenId,
-            ProductoId,
-            Cantidad,
-            PrecioUnit,
-            DescuentoPct
-        FROM dbo.OrdenDetalle
-        ORDER BY OrdenDetalleId
+    Args:
+        stream: Si es True, los items no se leen aquí; se devuelve un
+            StreamedQuery sobre query_orden_items que se lee por bloques
+            durante la transformación
+        chunk_size: Filas por bloque en modo streaming
+        window: Ventana de ids de la corrida; si es incremental solo se leen
+            clientes, órdenes y detalles nuevos (los productos siempre completos)
+
+    Returns:
+        tuple: (clientes, productos, ordenes, orden_detalles), o
+            (clientes, productos, orden_items) en modo streaming
     """
+    incremental = window is not None and window.incremental
+    params = window.params() if incremental else {}
+    if incremental:
+        print(f"    {SOURCE}: incremental ({window.describe()})")
+
+    if stream:
+        with engine.connect() as conn:
+            clientes = conn.execute(
+                text(query_clientes_incremental if incremental else query_clientes),
+                params,
+            ).fetchall()
+            productos = conn.execute(text(query_productos)).fetchall()
+
+        print(
+            f"    mssql: {len(clientes)} clients | {len(productos)} products | items streamed"
+        )
+        return (
+            clientes,
+            productos,
+            StreamedQuery(
+                engine,
+                query_orden_items_incremental if incremental else query_orden_items,
+                params=params,
+                chunk_size=chunk_size,
+            ),
+        )
 
     with engine.connect() as conn:
         # Extraer clientes
-        result_clientes = conn.execute(text(query_clientes))
+        result_clientes = conn.execute(
+            text(query_clientes_incremental if incremental else query_clientes),
+            params,
+        )
         clientes = result_clientes.fetchall()
 
         # Extraer productos
@@ -75,11 +230,21 @@ def extract_mssql():
         productos = result_productos.fetchall()
 
         # Extraer órdenes
-        result_ordenes = conn.execute(text(query_ordenes))
+        result_ordenes = conn.execute(
+            text(query_ordenes_incremental if incremental else query_ordenes),
+            params,
+        )
         ordenes = result_ordenes.fetchall()
 
         # Extraer detalles de órdenes
-        result_detalles = conn.execute(text(query_orden_detalles))
+        result_detalles = conn.execute(
+            text(
+                query_orden_detalles_incremental
+                if incremental
+                else query_orden_detalles
+            ),
+            params,
+        )
         orden_detalles = result_detalles.fetchall()
 
     print(
@@ -11,70 +11,222 @@ Heterogeneidades de MySQL:
 - Código Producto: 'codigo_alt' código alterno (no coincide con SKU oficial)
 """
 
+from typing import Dict, Optional
+
 from sqlalchemy import text
 
 from configs.connections import get_mysql_engine
+from extract.streaming import DEFAULT_CHUNK_SIZE, StreamedQuery
+from extract.watermarks import ExtractWindow
+
+SOURCE = "mysql"
 
 engine = get_mysql_engine()
 
 
-def extract_mysql():
+# -----------------------------------------------------------------------
+#            Queries de extracción
+# -----------------------------------------------------------------------
+
+query_clientes = """
+    SELECT
+        id,
+        nombre,
+        correo,
+        genero,
+        pais,
+        created_at
+    FROM Cliente
+    ORDER BY id
+"""
+
+query_productos = """
+    SELECT
+        id,
+        codigo_alt,
+        nombre,
+        categoria
+    FROM Producto
+    ORDER BY id
+"""
+
+query_ordenes = """
+    SELECT
+        id,
+        cliente_id,
+        fecha,
+        canal,
+        moneda,
+        total
+    FROM Orden
+    ORDER BY id
+"""
+
+query_orden_detalles = """
+    SELECT
+        id,
+        orden_id,
+        producto_id,
+        cantidad,
+        precio_unit
+    FROM OrdenDetalle
+    ORDER BY id
+"""
+
+# Modo streaming: cada detalle con las columnas de su orden (una fila sirve
+# como `orden` y como `detalle` en la transformación)
+query_orden_items = """
+    SELECT
+        d.id,
+        d.orden_id,
+        d.producto_id,
+        d.cantidad,
+        d.precio_unit,
+        o.cliente_id,
+        o.fecha,
+        o.canal,
+        o.moneda,
+        o.total
+    FROM OrdenDetalle d
+    INNER JOIN Orden o ON o.id = d.orden_id
+    ORDER BY d.id
+"""
+
+# -----------------------------------------------------------------------
+#    Modo incremental (extract/watermarks.py): filas en (desde, hasta]
+# -----------------------------------------------------------------------
+
+query_max_ids = """
+    SELECT
+        (SELECT MAX(id) FROM Cliente) AS Cliente,
+        (SELECT MAX(id) FROM Orden) AS Orden,
+        (SELECT MAX(id) FROM OrdenDetalle) AS OrdenDetalle
+"""
+
+query_clientes_incremental = """
+    SELECT
+        id,
+        nombre,
+        correo,
+        genero,
+        pais,
+        created_at
+    FROM Cliente
+    WHERE id > :desde_cliente AND id <= :hasta_cliente
+    ORDER BY id
+"""
+
+# Órdenes nuevas más las órdenes de los detalles nuevos
+query_ordenes_incremental = """
+    SELECT
+        id,
+        cliente_id,
+        fecha,
+        canal,
+        moneda,
+        total
+    FROM Orden
+    WHERE (id > :desde_orden AND id <= :hasta_orden)
+        OR id IN (
+            SELECT orden_id
+            FROM OrdenDetalle
+            WHERE id > :desde_detalle AND id <= :hasta_detalle
+        )
+    ORDER BY id
+"""
+
+query_orden_detalles_incremental = """
+    SELECT
+        id,
+        orden_id,
+        producto_id,
+        cantidad,
+        precio_unit
+    FROM OrdenDetalle
+    WHERE id > :desde_detalle AND id <= :hasta_detalle
+    ORDER BY id
+"""
+
+query_orden_items_incremental = """
+    SELECT
+        d.id,
+        d.orden_id,
+        d.producto_id,
+        d.cantidad,
+        d.precio_unit,
+        o.cliente_id,
+        o.fecha,
+        o.canal,
+        o.moneda,
+        o.total
+    FROM OrdenDetalle d
+    INNER JOIN Orden o ON o.id = d.orden_id
+    WHERE d.id > :desde_detalle AND d.id <= :hasta_detalle
+    ORDER BY d.id
+"""
+
+
+def read_max_ids() -> Dict[str, Optional[int]]:
+    """MAX(id) de Cliente, Orden y OrdenDetalle (límite superior de la ventana)."""
+    with engine.connect() as conn:
+        row = conn.execute(text(query_max_ids)).one()
+    return dict(row._mapping)
+
+
+def extract_mysql(
+    stream: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    window: Optional[ExtractWindow] = None,
+):
     """
     Extrae datos de las tablas Cliente, Producto, Orden y OrdenDetalle
     de la base de datos DB_SALES en MySQL.
 
-    Returns:
-        tuple: (clientes, productos, ordenes, orden_detalles)
-    """
-
-    query_clientes = """
-        SELECT
-            id,
-            nombre,
-            correo,
-            genero,
-            pais,
-            created_at
-        FROM Cliente
-        ORDER BY id
-    """
+    Args:
+        stream: Si es True, los items no se leen aquí; se devuelve un
+            StreamedQuery sobre query_orden_items que se lee por bloques
+            (cursor del servidor) durante la transformación
+        chunk_size: Filas por bloque en modo streaming
+        window: Ventana de ids de la corrida; si es incremental solo se leen
+            clientes, órdenes y detalles nuevos (los productos siempre completos)
 
-    query_productos = """
-        SELECT
-            id,
-            codigo_alt,
-            nombre,
-            categoria
-        FROM Producto
-        ORDER BY id
+    Returns:
+        tuple: (clientes, productos, ordenes, orden_detalles), o
+            (clientes, productos, orden_items) en modo streaming
     """
+    incremental = window is not None and window.incremental
+    params = window.params() if incremental else {}
+    if incremental:
+        print(f"    {SOURCE}: incremental ({window.describe()})")
 
-    query_ordenes = """
-        SELECT
-            id,
-            cliente_id,
-            fecha,
-            canal,
-            moneda,
-            total
-        FROM Orden
-        ORDER BY id
-    """
+    if stream:
+        with engine.connect() as conn:
+            clientes = conn.execute(
+                text(query_clientes_incremental if incremental else query_clientes),
+                params,
+            ).fetchall()
+            productos = conn.execute(text(query_productos)).fetchall()
 
-    query_orden_detalles = """
-        SELECT
-            id,
-            orden_id,
-            producto_id,
-            cantidad,
-            precio_unit
-        FROM OrdenDetalle
-        ORDER BY id
-    """
+        print(
+            f"    mysql: {len(clientes)} clients | {len(productos)} products | items streamed"
+        )
+        return (
+            clientes,
+            productos,
+            StreamedQuery(
+                engine,
+                query_orden_items_incremental if incremental else query_orden_items,
+                params=params,
+                chunk_size=chunk_size,
+            ),
+        )
 
     with engine.connect() as conn:
         # Extraer clientes
-        result_clientes = conn.execute(text(query_clientes))
+        result_clientes = conn.execute(
+            text(query_clientes_incremental if incremental else query_clientes),
+            params,
+        )
         clientes = result_clientes.fetchall()
 
         # Extraer productos
@@ -82,11 +234,21 @@ def extract_mysql():
         productos = result_productos.fetchall()
 
         # Extraer órdenes
-        result_ordenes = conn.execute(text(query_ordenes))
+        result_ordenes = conn.execute(
+            text(query_ordenes_incremental if incremental else query_ordenes),
+            params,
+        )
         ordenes = result_ordenes.fetchall()
 
         # Extraer detalles de órdenes
-        result_detalles = conn.execute(text(query_orden_detalles))
+        result_detalles = conn.execute(
+            text(
+                query_orden_detalles_incremental
+                if incremental
+                else query_orden_detalles
+            ),
+            params,
+        )
         orden_detalles = result_detalles.fetchall()
 
     print(
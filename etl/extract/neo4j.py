@@ -1,86 +1,221 @@
-from configs.connections import get_neo4j_driver
+"""
+extract/neo4j.py
+Extracción de Neo4j con una consulta por necesidad de la transformación.
 
+Solo se leen los nodos Cliente y Producto y las relaciones REALIZO
+(Cliente -> Orden) y CONTIENE (Orden -> Producto), y de cada uno solo las
+propiedades que usan transform/neo4j.py y el mapa de equivalencias; los nodos
+de los extremos no se envían completos en cada relación.
 
-def extract_neo4j():
+Las relaciones se leen por páginas de ids internos (`id(r)` en
+[desde, desde + NEO4J_PAGE_SIZE)), que Neo4j resuelve con un seek por id en vez
+de recorrer el grafo completo en una sola consulta. El driver trae los
+registros en lotes de NEO4J_FETCH_SIZE y, con NEO4J_PARALLEL_SESSIONS, cada tipo
+de relación se lee en su propia sesión en paralelo.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from configs.connections import (
+    NEO4J_FETCH_SIZE,
+    NEO4J_PAGE_SIZE,
+    NEO4J_PARALLEL_SESSIONS,
+    get_neo4j_driver,
+)
+
+# -----------------------------------------------------------------------
+#    Nodos: solo las propiedades que se usan
+# -----------------------------------------------------------------------
+query_clientes = """
+    MATCH (c:Cliente)
+    RETURN c {.id, .nombre, .genero, .pais} AS n
+"""
+
+query_productos = """
+    MATCH (p:Producto)
+    RETURN p {.id, .sku, .nombre, .categoria, .codigo_alt, .codigo_mongo} AS n
+"""
+
+# -----------------------------------------------------------------------
+#    Relaciones: límite superior de ids y una página de ids [desde, hasta)
+# -----------------------------------------------------------------------
+query_max_realizo = """
+    MATCH ()-[r:REALIZO]->()
+    RETURN max(id(r)) AS max_id
+"""
+
+query_realizo_page = """
+    MATCH (c:Cliente)-[r:REALIZO]->(o:Orden)
+    WHERE id(r) IN range($desde, $hasta - 1)
+    RETURN c.id AS cliente_id,
+           o.id AS orden_id,
+           o.fecha AS fecha,
+           o.total AS total,
+           o.canal AS canal,
+           o.moneda AS moneda
+"""
+
+query_max_contiene = """
+    MATCH ()-[r:CONTIENE]->()
+    RETURN max(id(r)) AS max_id
+"""
+
+query_contiene_page = """
+    MATCH (o:Orden)-[r:CONTIENE]->(p:Producto)
+    WHERE id(r) IN range($desde, $hasta - 1)
+    RETURN o.id AS orden_id,
+           p.id AS producto_id,
+           p.sku AS sku,
+           r.cantidad AS cantidad,
+           r.precio_unit AS precio_unit
+"""
+
+
+def _sin_nulos(props):
+    """
+    Quita las propiedades nulas. Una proyección (`n {.prop}` o `n.prop`) devuelve
+    null si la propiedad no existe, mientras que el nodo completo simplemente no
+    tenía la llave; así los `.get(prop, default)` de la transformación siguen
+    aplicando su default.
+    """
+    return {k: v for k, v in props.items() if v is not None}
+
+
+def _realizo_row(record):
+    return {
+        "from_label": "Cliente",
+        "from": _sin_nulos({"id": record["cliente_id"]}),
+        "to_label": "Orden",
+        "to": _sin_nulos(
+            {
+                "id": record["orden_id"],
+                "fecha": record["fecha"],
+                "total": record["total"],
+                "canal": record["canal"],
+                "moneda": record["moneda"],
+            }
+        ),
+        "properties": {},
+    }
+
+
+def _contiene_row(record):
+    return {
+        "from_label": "Orden",
+        "from": _sin_nulos({"id": record["orden_id"]}),
+        "to_label": "Producto",
+        "to": _sin_nulos({"id": record["producto_id"], "sku": record["sku"]}),
+        "properties": _sin_nulos(
+            {
+                "cantidad": record["cantidad"],
+                "precio_unit": record["precio_unit"],
+            }
+        ),
+    }
+
+
+# Tipo de relación -> (consulta de max id, consulta de página, fila)
+REL_QUERIES = {
+    "REALIZO": (query_max_realizo, query_realizo_page, _realizo_row),
+    "CONTIENE": (query_max_contiene, query_contiene_page, _contiene_row),
+}
+
+
+def fetch_nodes(driver, fetch_size):
+    """Clientes y productos con sus propiedades proyectadas."""
+    with driver.session(fetch_size=fetch_size) as session:
+        return {
+            "Cliente": [_sin_nulos(n) for n in session.run(query_clientes).value("n")],
+            "Producto": [
+                _sin_nulos(n) for n in session.run(query_productos).value("n")
+            ],
+        }
+
+
+def fetch_relationships(driver, rel_type, page_size, fetch_size):
+    """Todas las relaciones de un tipo, página a página, en una sesión propia."""
+    query_max, query_page, to_row = REL_QUERIES[rel_type]
+    rows = []
+    with driver.session(fetch_size=fetch_size) as session:
+        max_id = session.run(query_max).single()["max_id"]
+        if max_id is None:
+            return rows
+        for desde in range(0, max_id + 1, page_size):
+            result = session.run(query_page, desde=desde, hasta=desde + page_size)
+            rows.extend(to_row(record) for record in result)
+    return rows
+
+
+def extract_neo4j(
+    page_size: int = NEO4J_PAGE_SIZE,
+    fetch_size: int = NEO4J_FETCH_SIZE,
+    parallel: bool = NEO4J_PARALLEL_SESSIONS,
+):
     """
     Extrae nodos y relaciones desde Neo4j.
     Devuelve un diccionario:
     {
         "nodes": {
-            "Label1": [ {...}, {...} ],
-            "Label2": [ {...} ]
+            "Cliente": [ {id, nombre, genero, pais}, ... ],
+            "Producto": [ {id, sku, nombre, categoria, codigo_alt, codigo_mongo}, ... ]
         },
         "relationships": {
-            "REL_TYPE": [
+            "REALIZO": [
+                {
+                    "from_label": "Cliente",
+                    "from": {id},
+                    "to_label": "Orden",
+                    "to": {id, fecha, total, canal, moneda},
+                    "properties": {}
+                }
+            ],
+            "CONTIENE": [
                 {
-                    "from_label": str,
-                    "from": {props},
-                    "to_label": str,
-                    "to": {props},
-                    "properties": {props}
+                    "from_label": "Orden",
+                    "from": {id},
+                    "to_label": "Producto",
+                    "to": {id, sku},
+                    "properties": {cantidad, precio_unit}
                 }
             ]
         }
     }
+
+    Args:
+        page_size: Ancho de cada página de ids internos de relación
+        fetch_size: Registros por lote que el driver trae del servidor
+        parallel: Leer cada tipo de relación en su propia sesión en paralelo
     """
     driver = get_neo4j_driver()
 
-    with driver.session() as session:
-        # ---------------------------------------
-        # 1. EXTRAER NODOS
-        # ---------------------------------------
-        labels = session.run("CALL db.labels()").value()
-        nodes_by_label = {}
-
-        for label in labels:
-            query = f"MATCH (n:{label}) RETURN n"
-            result = session.run(query)
-
-            nodes = []
-            for record in result:
-                node = record["n"]
-                nodes.append(dict(node))
-
-            nodes_by_label[label] = nodes
-
-        # ---------------------------------------
-        # 2. EXTRAER RELACIONES
-        # ---------------------------------------
-        relationships_by_type = {}
-
-        rel_result = session.run("""
-            MATCH (a)-[r]->(b)
-            RETURN labels(a) AS from_labels,
-                   a AS from_node,
-                   type(r) AS rel_type,
-                   r AS rel_props,
-                   labels(b) AS to_labels,
-                   b AS to_node
-        """)
-
-        for record in rel_result:
-            rel_type = record["rel_type"]
-
-            if rel_type not in relationships_by_type:
-                relationships_by_type[rel_type] = []
-
-            relationships_by_type[rel_type].append(
-                {
-                    "from_label": record["from_labels"][0],
-                    "from": dict(record["from_node"]),
-                    "to_label": record["to_labels"][0],
-                    "to": dict(record["to_node"]),
-                    "properties": dict(record["rel_props"]),
+    try:
+        if parallel:
+            # Los nodos se leen mientras las relaciones avanzan en sus sesiones
+            with ThreadPoolExecutor(max_workers=len(REL_QUERIES)) as executor:
+                futures = {
+                    rel_type: executor.submit(
+                        fetch_relationships, driver, rel_type, page_size, fetch_size
+                    )
+                    for rel_type in REL_QUERIES
                 }
-            )
-
-    driver.close()
+                nodes_by_label = fetch_nodes(driver, fetch_size)
+                relationships_by_type = {
+                    rel_type: future.result() for rel_type, future in futures.items()
+                }
+        else:
+            nodes_by_label = fetch_nodes(driver, fetch_size)
+            relationships_by_type = {
+                rel_type: fetch_relationships(driver, rel_type, page_size, fetch_size)
+                for rel_type in REL_QUERIES
+            }
+    finally:
+        driver.close()
 
     # Extract counts for logging
-    clientes = len(nodes_by_label.get("Cliente", []))
-    productos = len(nodes_by_label.get("Producto", []))
-    ordenes = len(nodes_by_label.get("Orden", []))
-    items = len(relationships_by_type.get("CONTIENE", []))
+    clientes = len(nodes_by_label["Cliente"])
+    productos = len(nodes_by_label["Producto"])
+    ordenes = len(relationships_by_type["REALIZO"])
+    items = len(relationships_by_type["CONTIENE"])
 
     print(
         f"    neo4j: {clientes} clients | {productos} products | {ordenes} orders | {items} items"
@@ -0,0 +1,131 @@
+"""
+extract/scheduler.py
+Ejecución concurrente de las extracciones de cada fuente.
+
+Cada extracción corre en su propio hilo (son operaciones de red, así que el GIL
+no es un problema) y el tiempo total pasa a ser el de la fuente más lenta en vez
+de la suma de todas. Cada fuente tiene su propio timeout y un fallo en una no
+interrumpe a las demás; el llamador decide qué hacer con los errores.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+# Timeout por defecto (segundos) para cada fuente
+DEFAULT_TIMEOUT = 900
+
+# Cada cuánto se revisan timeouts e interrupciones mientras se espera
+POLL_INTERVAL = 0.5
+
+
+class ExtractionTimeoutError(Exception):
+    """La extracción de una fuente excedió su timeout."""
+
+    pass
+
+
+@dataclass
+class ExtractionResult:
+    """Resultado de la extracción de una fuente."""
+
+    source: str
+    value: Any = None
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _run_in_thread(fn: Callable[[], Any], future: Future) -> None:
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        future.set_result(fn())
+    except BaseException as e:
+        future.set_exception(e)
+
+
+def run_extractions(
+    tasks: Dict[str, Callable[[], Any]],
+    timeouts: Optional[Dict[str, float]] = None,
+    default_timeout: float = DEFAULT_TIMEOUT,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Dict[str, ExtractionResult]:
+    """
+    Ejecuta las extracciones en paralelo y espera a que todas terminen,
+    fallen o excedan su timeout.
+
+    Se usan hilos daemon en lugar de un ThreadPoolExecutor: una extracción
+    colgada (p. ej. una conexión que nunca responde) no puede cancelarse desde
+    Python, y con hilos daemon al menos no bloquea la salida del proceso.
+
+    Args:
+        tasks: {fuente: función sin argumentos que devuelve los datos extraídos}
+        timeouts: timeout en segundos por fuente (opcional)
+        default_timeout: timeout para las fuentes que no aparecen en `timeouts`
+        should_stop: función que devuelve True si se pidió detener el proceso;
+            en ese caso se deja de esperar y se devuelve lo que haya terminado
+
+    Returns:
+        dict: {fuente: ExtractionResult} en el mismo orden que `tasks`
+    """
+    timeouts = timeouts or {}
+    results: Dict[str, ExtractionResult] = {}
+    futures: Dict[Future, str] = {}
+    started: Dict[str, float] = {}
+
+    for source, fn in tasks.items():
+        future: Future = Future()
+        thread = threading.Thread(
+            target=_run_in_thread,
+            args=(fn, future),
+            name=f"extract-{source}",
+            daemon=True,
+        )
+        started[source] = time.perf_counter()
+        thread.start()
+        futures[future] = source
+
+    pending = set(futures)
+    while pending:
+        done, pending = wait(
+            pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED
+        )
+        now = time.perf_counter()
+
+        for future in done:
+            source = futures[future]
+            elapsed = now - started[source]
+            error = future.exception()
+            if error is None:
+                results[source] = ExtractionResult(
+                    source, value=future.result(), elapsed=elapsed
+                )
+            else:
+                results[source] = ExtractionResult(source, error=error, elapsed=elapsed)
+
+        for future in list(pending):
+            source = futures[future]
+            elapsed = now - started[source]
+            limit = timeouts.get(source, default_timeout)
+            if elapsed > limit:
+                # El hilo sigue corriendo en segundo plano, pero su resultado se descarta
+                future.cancel()
+                pending.discard(future)
+                results[source] = ExtractionResult(
+                    source,
+                    error=ExtractionTimeoutError(
+                        f"{source} extraction exceeded {limit:.0f}s timeout"
+                    ),
+                    elapsed=elapsed,
+                )
+
+        if should_stop is not None and should_stop():
+            break
+
+    return {source: results[source] for source in tasks if source in results}
@@ -0,0 +1,92 @@
+"""
+extract/streaming.py
+Lectura por bloques de consultas grandes de las fuentes SQL.
+
+En modo streaming (`--stream`) las tablas de detalle no se materializan con
+`fetchall()` durante la extracción: se devuelve un `StreamedQuery`, que abre su
+propia conexión y ejecuta la consulta con un cursor del lado del servidor
+(`stream_results` / `yield_per`) recién cuando la transformación lo recorre.
+Cada iteración entrega una lista de filas de `chunk_size`, así que la memoria
+queda acotada por el tamaño del bloque y la transformación empieza con el
+primer bloque en vez de esperar la última fila.
+
+`StreamedAggregation` hace lo mismo con un pipeline de agregación de MongoDB.
+"""
+
+from typing import Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, Row
+
+# Filas por bloque leído del cursor del servidor
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class StreamedQuery:
+    """
+    Bloques de filas de una consulta, leídos bajo demanda.
+
+    Se puede recorrer más de una vez (cada recorrido vuelve a ejecutar la
+    consulta). Uso:
+        for chunk in StreamedQuery(engine, query_orden_items):
+            for row in chunk:
+                ...
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        query: str,
+        params: Optional[dict] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self.engine = engine
+        self.query = query
+        self.params = params or {}
+        self.chunk_size = chunk_size
+        self.rows_read = 0
+
+    def __iter__(self) -> Iterator[List[Row]]:
+        self.rows_read = 0
+        with self.engine.connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, yield_per=self.chunk_size
+            ).execute(text(self.query), self.params)
+            for partition in result.partitions(self.chunk_size):
+                self.rows_read += len(partition)
+                yield partition
+
+
+class StreamedAggregation:
+    """
+    Igual que StreamedQuery, para un pipeline de agregación de MongoDB: cada
+    recorrido ejecuta el pipeline y entrega listas de `chunk_size` documentos.
+    El servidor los envía en lotes de `chunk_size` (batchSize del cursor).
+    """
+
+    def __init__(
+        self,
+        collection,
+        pipeline: List[dict],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self.collection = collection
+        self.pipeline = pipeline
+        self.chunk_size = chunk_size
+        self.rows_read = 0
+
+    def __iter__(self) -> Iterator[List[dict]]:
+        self.rows_read = 0
+        with self.collection.aggregate(
+            self.pipeline, batchSize=self.chunk_size, allowDiskUse=True
+        ) as cursor:
+            chunk = []
+            for doc in cursor:
+                chunk.append(doc)
+                if len(chunk) == self.chunk_size:
+                    self.rows_read += len(chunk)
+                    yield chunk
+                    chunk = []
+            if chunk:
+                self.rows_read += len(chunk)
+                yield chunk
@@ -1,60 +1,240 @@
-from configs.connections import get_supabase_client
+"""
+extract/supabase.py
+Extracción de las tablas de Supabase por la API REST (PostgREST).
 
+Cada tabla se lee con paginación keyset sobre su llave primaria
+(`pk > última llave ORDER BY pk LIMIT n`) en lugar de `.range(offset, ...)`:
+el costo de cada página no crece con la profundidad y una fila insertada o
+borrada durante la extracción no desplaza a las demás (no hay filas saltadas
+ni repetidas). Solo se piden las columnas que usan la transformación y el mapa
+de equivalencias.
 
-# -------------------------------------------
-# Pagination helper for Supabase (default limit is 1000)
-# -------------------------------------------
-def fetch_all_paginated(supabase, table_name: str, page_size: int = 1000) -> list:
+Las llaves son UUID v4 (uniformes), así que el rango de cada tabla se divide en
+particiones contiguas que se recorren en paralelo; todas las páginas de las
+cuatro tablas comparten un cliente httpx asíncrono y un semáforo que limita las
+peticiones en vuelo (SUPABASE_MAX_CONCURRENCY), para respetar el rate limit del
+proyecto. Al final se reportan filas/s por tabla para ajustar SUPABASE_PAGE_SIZE
+y la concurrencia.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from configs.connections import (
+    SUPABASE_MAX_CONCURRENCY,
+    SUPABASE_PAGE_SIZE,
+    get_supabase_rest_client,
+)
+
+# Tabla -> (llave primaria, columnas a extraer)
+TABLES = {
+    "cliente": (
+        "cliente_id",
+        ["cliente_id", "nombre", "email", "genero", "pais", "fecha_registro"],
+    ),
+    "producto": ("producto_id", ["producto_id", "sku", "nombre", "categoria"]),
+    "orden": (
+        "orden_id",
+        ["orden_id", "cliente_id", "fecha", "canal", "moneda", "total"],
+    ),
+    "orden_detalle": (
+        "orden_detalle_id",
+        ["orden_detalle_id", "orden_id", "producto_id", "cantidad", "precio_unit"],
+    ),
+}
+
+# Particiones del espacio de UUID que se recorren en paralelo por tabla
+DEFAULT_PARTITIONS = 4
+
+# Reintentos ante 429 / 5xx (rate limit o errores transitorios del gateway)
+MAX_RETRIES = 4
+RETRY_BACKOFF = 1.0
+
+
+@dataclass
+class TableStats:
+    """Métricas de la extracción de una tabla."""
+
+    table: str
+    rows: int = 0
+    pages: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def uuid_partitions(partitions: int) -> List[Tuple[Optional[str], Optional[str]]]:
     """
-    Fetch all records from a Supabase table using pagination.
-    Supabase has a default limit of 1000 rows per query.
+    Rangos [desde, hasta) que cubren todo el espacio de UUID; None = sin límite.
+    Postgres compara UUID byte a byte, igual que su representación hexadecimal.
     """
-    all_data = []
-    offset = 0
+    partitions = max(1, partitions)
+    bounds = [
+        str(uuid.UUID(int=i * (1 << 128) // partitions)) for i in range(1, partitions)
+    ]
+    return list(zip([None] + bounds, bounds + [None]))
 
-    while True:
-        response = (
-            supabase.table(table_name)
-            .select("*")
-            .range(offset, offset + page_size - 1)
-            .execute()
+
+async def _get_page(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    table_name: str,
+    params: List[Tuple[str, str]],
+) -> list:
+    """Una página; reintenta con espera ante rate limit y errores 5xx."""
+    for attempt in range(MAX_RETRIES + 1):
+        async with semaphore:
+            response = await client.get(f"/{table_name}", params=params)
+        if response.status_code == 429 or response.status_code >= 500:
+            if attempt == MAX_RETRIES:
+                break
+            retry_after = response.headers.get("Retry-After")
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = RETRY_BACKOFF * 2**attempt
+            await asyncio.sleep(delay)
+            continue
+        break
+
+    if response.is_error:
+        raise Exception(
+            f"Error fetching {table_name}: {response.status_code} {response.text}"
         )
+    return response.json()
 
-        if hasattr(response, "error") and response.error:
-            raise Exception(f"Error fetching {table_name}: {response.error}")
 
-        batch = response.data
+async def _fetch_partition(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    table_name: str,
+    desde: Optional[str],
+    hasta: Optional[str],
+    page_size: int,
+    stats: TableStats,
+) -> list:
+    """Recorre [desde, hasta) de una tabla con paginación keyset hasta una
+    página vacía (cuesta una petición extra por partición)."""
+    pk, columns = TABLES[table_name]
+    base_params = [
+        ("select", ",".join(columns)),
+        ("order", f"{pk}.asc"),
+        ("limit", str(page_size)),
+    ]
+    if hasta is not None:
+        base_params.append((pk, f"lt.{hasta}"))
+
+    data = []
+    after = None
+    while True:
+        params = list(base_params)
+        if after is not None:
+            params.append((pk, f"gt.{after}"))
+        elif desde is not None:
+            params.append((pk, f"gte.{desde}"))
+
+        batch = await _get_page(client, semaphore, table_name, params)
+        stats.pages += 1
         if not batch:
             break
 
-        all_data.extend(batch)
+        data.extend(batch)
+        stats.rows += len(batch)
 
-        # If we got fewer records than page_size, we've reached the end
-        if len(batch) < page_size:
-            break
+        # Una página corta no indica el final: PostgREST recorta `limit` a su
+        # max-rows, así que solo una página vacía termina la partición
+        after = batch[-1][pk]
 
-        offset += page_size
+    return data
 
-    return all_data
+
+async def fetch_all_paginated(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    table_name: str,
+    page_size: int = SUPABASE_PAGE_SIZE,
+    partitions: int = DEFAULT_PARTITIONS,
+) -> Tuple[list, TableStats]:
+    """
+    Todas las filas de una tabla (columnas de TABLES), ordenadas por llave.
+
+    Las particiones se leen en paralelo; el semáforo compartido limita cuántas
+    páginas hay en vuelo en total.
+    """
+    stats = TableStats(table_name)
+    inicio = time.perf_counter()
+    chunks = await asyncio.gather(
+        *(
+            _fetch_partition(
+                client, semaphore, table_name, desde, hasta, page_size, stats
+            )
+            for desde, hasta in uuid_partitions(partitions)
+        )
+    )
+    stats.elapsed = time.perf_counter() - inicio
+    return [row for chunk in chunks for row in chunk], stats
+
+
+async def extract_supabase_async(
+    page_size: int = SUPABASE_PAGE_SIZE,
+    max_concurrency: int = SUPABASE_MAX_CONCURRENCY,
+    partitions: int = DEFAULT_PARTITIONS,
+) -> Tuple[Dict[str, list], Dict[str, TableStats]]:
+    """Extrae las tablas de TABLES en paralelo. Devuelve (datos, métricas) por tabla."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    async with get_supabase_rest_client(max_concurrency) as client:
+        results = await asyncio.gather(
+            *(
+                fetch_all_paginated(client, semaphore, table, page_size, partitions)
+                for table in TABLES
+            )
+        )
+    data = {table: rows for table, (rows, _) in zip(TABLES, results)}
+    stats = {table: table_stats for table, (_, table_stats) in zip(TABLES, results)}
+    return data, stats
 
 
 # -------------------------------------------
 # 1. Crear función extract_supabase
 # -------------------------------------------
-def extract_supabase():
+def extract_supabase(
+    page_size: int = SUPABASE_PAGE_SIZE,
+    max_concurrency: int = SUPABASE_MAX_CONCURRENCY,
+    partitions: int = DEFAULT_PARTITIONS,
+):
     """
     Extrae los registros de múltiples tablas en Supabase.
 
+    Args:
+        page_size: Filas pedidas por página (PostgREST devuelve a lo sumo max-rows)
+        max_concurrency: Peticiones en vuelo a la vez entre todas las tablas
+        partitions: Rangos de llave recorridos en paralelo por tabla
+
     Returns:
         tuple: (clientes, productos, ordenes, orden_detalles)
     """
-    supabase = get_supabase_client()
+    # Corre en el hilo de extracción del scheduler, con su propio event loop
+    data, stats = asyncio.run(
+        extract_supabase_async(page_size, max_concurrency, partitions)
+    )
+
+    for table_stats in stats.values():
+        print(
+            f"    supab.{table_stats.table}: {table_stats.rows} rows | {table_stats.pages} pages | "
+            f"{table_stats.elapsed:.1f}s | {table_stats.rows_per_sec:.0f} rows/s"
+        )
 
-    # Fetch all records using pagination
-    clientes = fetch_all_paginated(supabase, "cliente")
-    productos = fetch_all_paginated(supabase, "producto")
-    ordenes = fetch_all_paginated(supabase, "orden")
-    orden_detalles = fetch_all_paginated(supabase, "orden_detalle")
+    clientes = data["cliente"]
+    productos = data["producto"]
+    ordenes = data["orden"]
+    orden_detalles = data["orden_detalle"]
 
     print(
         f"    supab: {len(clientes)} clients | {len(productos)} products | {len(ordenes)} orders | {len(orden_detalles)} items"
@@ -0,0 +1,153 @@
+"""
+extract/watermarks.py
+Per-source, per-table extraction watermarks for the SQL sources.
+
+Every run used to re-read all of Cliente, Orden and OrdenDetalle and let the
+staging MERGE discard what was already there. The highest id staged for each
+(source, table) is now kept in stg.etl_watermark. An extraction reads
+MAX(id) of each table first and, in incremental mode, only the rows in
+(last staged id, MAX(id)]. The new marks are written only when the source's
+transform reports that every row of the window reached staging (no skipped
+details, conversion errors or rejected MERGE rows); otherwise, or if the run
+fails, the next run simply re-reads the same window.
+
+Ids are identities in both sources, so this picks up new rows; the sources
+have no modification timestamp, so changes to existing rows are only picked up
+by a full run (`--full`). Full runs record watermarks as well, so a backfill
+can be followed directly by incremental runs. Producto is always read in full
+(it is small and every run needs it for the equivalence map).
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import text
+
+from configs.connections import get_dw_engine
+
+# Tables read incrementally and the suffix of their window parameters
+# (:desde_cliente / :hasta_cliente, ...)
+WATERMARK_TABLES = {
+    "Cliente": "cliente",
+    "Orden": "orden",
+    "OrdenDetalle": "detalle",
+}
+
+query_select_watermarks = """
+    SELECT table_name, last_id
+    FROM stg.etl_watermark
+    WHERE source_system = :source_system
+"""
+
+query_merge_watermark = """
+    MERGE INTO stg.etl_watermark AS target
+    USING (SELECT
+        :source_system AS source_system,
+        :table_name AS table_name,
+        :last_id AS last_id,
+        :extracted_at AS extracted_at
+    ) AS source
+    ON target.source_system = source.source_system
+        AND target.table_name = source.table_name
+    WHEN MATCHED THEN
+        UPDATE SET
+            last_id = source.last_id,
+            extracted_at = source.extracted_at,
+            updated_at = SYSDATETIME()
+    WHEN NOT MATCHED THEN
+        INSERT (source_system, table_name, last_id, extracted_at)
+        VALUES (source.source_system, source.table_name, source.last_id, source.extracted_at);
+"""
+
+
+@dataclass
+class ExtractWindow:
+    """
+    Id range (desde, hasta] read from each table of a source in one run.
+
+    `desde` is the last id already staged (0 reads from the start) and `hasta`
+    the MAX(id) observed when the extraction started.
+    """
+
+    source_system: str
+    incremental: bool
+    desde: Dict[str, int] = field(default_factory=dict)
+    hasta: Dict[str, int] = field(default_factory=dict)
+    extracted_at: datetime = field(default_factory=datetime.now)
+
+    def params(self) -> dict:
+        """Bind parameters for the *_incremental queries."""
+        params = {}
+        for table, suffix in WATERMARK_TABLES.items():
+            params[f"desde_{suffix}"] = self.desde.get(table, 0)
+            params[f"hasta_{suffix}"] = self.hasta.get(table, 0)
+        return params
+
+    def describe(self) -> str:
+        """'Cliente 120→130, Orden 5000→5040, ...' for the progress output."""
+        return ", ".join(
+            f"{table} {self.desde.get(table, 0)}→{self.hasta.get(table, 0)}"
+            for table in WATERMARK_TABLES
+        )
+
+
+class WatermarkStore:
+    """
+    Reads and writes stg.etl_watermark.
+
+    Usage:
+        store = WatermarkStore()
+        window = store.open_window("mysql", max_ids, incremental=True)
+        ... extract with window.params(), stage ...
+        store.save(window)
+    """
+
+    def __init__(self, engine=None):
+        self._engine = engine or get_dw_engine()
+
+    def load(self, source_system: str) -> Dict[str, int]:
+        """Last staged id per table of the source (missing tables -> absent)."""
+        with self._engine.connect() as conn:
+            rows = conn.execute(
+                text(query_select_watermarks), {"source_system": source_system}
+            ).fetchall()
+        return {row.table_name: int(row.last_id) for row in rows}
+
+    def open_window(
+        self, source_system: str, max_ids: Dict[str, int], incremental: bool
+    ) -> ExtractWindow:
+        """
+        Window for this run. `max_ids` is MAX(id) per table read from the
+        source (None for empty tables).
+        """
+        desde = self.load(source_system) if incremental else {}
+        window = ExtractWindow(source_system, incremental)
+        for table in WATERMARK_TABLES:
+            last = desde.get(table, 0)
+            current = max_ids.get(table)
+            if current is None:
+                current = last
+            elif current < last:
+                # Source reloaded or ids reset: read the table from the start
+                print(
+                    f"    ⚠️ {source_system}.{table}: MAX(id) {current} < watermark {last}, reading from the start"
+                )
+                last = 0
+            window.desde[table] = last
+            window.hasta[table] = current
+        return window
+
+    def save(self, window: ExtractWindow) -> None:
+        """Record `hasta` as staged (call only after the source was staged)."""
+        with self._engine.begin() as conn:
+            for table in WATERMARK_TABLES:
+                conn.execute(
+                    text(query_merge_watermark),
+                    {
+                        "source_system": window.source_system,
+                        "table_name": table,
+                        "last_id": window.hasta.get(table, 0),
+                        "extracted_at": window.extracted_at,
+                    },
+                )
@@ -60,7 +60,29 @@ query_sync_exchange_rates = """
        OR dt.TC_USD_CRC != COALESCE(tc_usd.tasa, dt.TC_USD_CRC);
 """
 
-query_insert_dimCliente_dw = """
+# Carga set-based de DimCliente: una sola sentencia para todos los clientes nuevos.
+# Si un cliente aparece varias veces en staging se toma la fila más reciente.
+# Devuelve, por fuente, los candidatos y los efectivamente cargados.
+query_load_dimCliente = """
+    SET NOCOUNT ON;
+    DECLARE @cargados TABLE (SourceSystem NVARCHAR(32));
+
+    WITH candidatos AS (
+        SELECT
+            C.source_system,
+            C.source_code,
+            C.cliente_email,
+            C.cliente_nombre,
+            C.genero_norm,
+            C.pais_raw,
+            C.fecha_creado_dt,
+            ROW_NUMBER() OVER (
+                PARTITION BY C.source_system, C.source_code
+                ORDER BY C.load_ts DESC, C.stg_id DESC
+            ) AS rn
+        FROM stg.clientes AS C
+        WHERE C.load_ts > :last_load_ts
+    )
     INSERT INTO dw.DimCliente (
         SourceSystem,
         SourceKey,
@@ -71,28 +93,33 @@ query_insert_dimCliente_dw = """
         FechaCreacionID,
         LoadTS
     )
+    OUTPUT inserted.SourceSystem INTO @cargados
     SELECT
-        :sourceSystem,
-        :sourceKey,
-        :Email,
-        :Nombre,
-        :Genero,
-        :Pais,
-        TiempoID,
+        c.source_system,
+        c.source_code,
+        c.cliente_email,
+        c.cliente_nombre,
+        c.genero_norm,
+        c.pais_raw,
+        dt.TiempoID,
         GETDATE() AS LoadTS
-    FROM dw.DimTiempo
-    WHERE Fecha = :FechaCreacion
+    FROM candidatos AS c
+    INNER JOIN dw.DimTiempo AS dt
+        ON dt.Fecha = c.fecha_creado_dt
+    WHERE c.rn = 1
         AND NOT EXISTS (
-            SELECT 1 FROM dw.DimCliente dc 
-            WHERE dc.SourceSystem = :sourceSystem 
-            AND dc.SourceKey = :sourceKey
+            SELECT 1 FROM dw.DimCliente dc
+            WHERE dc.SourceSystem = c.source_system
+            AND dc.SourceKey = c.source_code
         );
-"""
 
-query_check_existing_cliente = """
-    SELECT COUNT(*) 
-    FROM dw.DimCliente 
-    WHERE SourceSystem = :SourceSystem AND SourceKey = :SourceKey
+    SELECT
+        C.source_system AS SourceSystem,
+        COUNT(*) AS Candidatos,
+        (SELECT COUNT(*) FROM @cargados k WHERE k.SourceSystem = C.source_system) AS Cargados
+    FROM stg.clientes AS C
+    WHERE C.load_ts > :last_load_ts
+    GROUP BY C.source_system;
 """
 
 query_select_clientes_stg = """
@@ -109,45 +136,42 @@ query_select_clientes_stg = """
     WHERE C.load_ts > :last_load_ts
 """
 
-query_select_map_producto = """
-    SELECT
-        P.source_system AS SourceSystem,
-        P.source_code AS SourceKey,
-        P.nombre_norm AS Nombre,
-        P.categoria_norm AS Categoria,
-        P.es_servicio AS EsServicio,
-        P.sku_oficial AS SKU
-    FROM stg.map_producto AS P
-"""
-
-query_select_map_producto_new = """
-    SELECT
-        P.source_system AS SourceSystem,
-        P.source_code AS SourceKey,
-        P.nombre_norm AS Nombre,
-        P.categoria_norm AS Categoria,
-        P.es_servicio AS EsServicio,
-        P.sku_oficial AS SKU
-    FROM stg.map_producto AS P
-    WHERE NOT EXISTS (
-        SELECT 1 FROM dw.DimProducto dp 
-        WHERE dp.SourceSystem = P.source_system 
-        AND dp.SourceKey = P.source_code
+# Carga set-based de DimProducto. Por cada SKU se carga un solo producto, el de
+# la fuente con mayor prioridad (MSSQL tiene el SKU "oficial"), y solo si el SKU
+# y el par (SourceSystem, SourceKey) aún no existen en el DW.
+# Devuelve los productos cargados por fuente.
+query_load_dimProducto = """
+    SET NOCOUNT ON;
+    DECLARE @cargados TABLE (SourceSystem NVARCHAR(32));
+
+    WITH candidatos AS (
+        SELECT
+            P.source_system,
+            P.source_code,
+            P.nombre_norm,
+            P.categoria_norm,
+            P.es_servicio,
+            P.sku_oficial,
+            ROW_NUMBER() OVER (
+                PARTITION BY P.sku_oficial
+                ORDER BY
+                    CASE P.source_system
+                        WHEN 'mssql' THEN 1
+                        WHEN 'neo4j' THEN 2
+                        WHEN 'mysql' THEN 3
+                        WHEN 'supabase' THEN 4
+                        WHEN 'mongo' THEN 5
+                        ELSE 6
+                    END,
+                    P.map_id
+            ) AS rn
+        FROM stg.map_producto AS P
+        WHERE NOT EXISTS (
+            SELECT 1 FROM dw.DimProducto dp
+            WHERE dp.SourceSystem = P.source_system
+            AND dp.SourceKey = P.source_code
+        )
     )
-    -- Order by source priority: MSSQL has "official" SKU, so it should be loaded first
-    ORDER BY 
-        CASE P.source_system
-            WHEN 'mssql' THEN 1
-            WHEN 'neo4j' THEN 2
-            WHEN 'mysql' THEN 3
-            WHEN 'supabase' THEN 4
-            WHEN 'mongo' THEN 5
-            ELSE 6
-        END,
-        P.sku_oficial
-"""
-
-query_insert_dimProducto_dw = """
     INSERT INTO dw.DimProducto (
         SKU,
         Nombre,
@@ -157,15 +181,25 @@ query_insert_dimProducto_dw = """
         SourceKey,
         LoadTS
     )
-    VALUES (
-        :SKU,
-        :Nombre,
-        :Categoria,
-        :EsServicio,
-        :SourceSystem,
-        :SourceKey,
+    OUTPUT inserted.SourceSystem INTO @cargados
+    SELECT
+        c.sku_oficial,
+        c.nombre_norm,
+        c.categoria_norm,
+        c.es_servicio,
+        c.source_system,
+        c.source_code,
         GETDATE()
-    )
+    FROM candidatos AS c
+    WHERE c.rn = 1
+        AND NOT EXISTS (
+            SELECT 1 FROM dw.DimProducto dp
+            WHERE dp.SKU = c.sku_oficial
+        );
+
+    SELECT SourceSystem, COUNT(*) AS Cargados
+    FROM @cargados
+    GROUP BY SourceSystem;
 """
 
 query_insert_factVentas = """
@@ -205,9 +239,20 @@ query_insert_factVentas = """
         O.moneda,
         O.precio_unit_num,
         O.total_num,
-        O.source_key_orden + '-' + O.source_key_item,
+        O.fact_source_key,
         GETDATE() AS LoadTS
-    FROM stg.orden_items AS O
+    FROM (
+        -- One row per natural key (UX_FactVentas_Fuente_SourceKey)
+        SELECT
+            S.*,
+            ROW_NUMBER() OVER (
+                PARTITION BY S.source_system, S.fact_source_key
+                ORDER BY S.stg_id DESC
+            ) AS rn
+        FROM stg.orden_items AS S
+        WHERE S.load_ts > :last_load_ts
+            AND S.fact_source_key IS NOT NULL
+    ) AS O
     INNER JOIN dw.DimTiempo AS T
         ON T.Fecha = O.fecha_dt
     INNER JOIN dw.DimCliente AS C
@@ -219,11 +264,12 @@ query_insert_factVentas = """
         AND O.source_system = M.source_system
     INNER JOIN dw.DimProducto AS P
         ON M.sku_oficial = P.SKU
-    WHERE O.load_ts > :last_load_ts
+    WHERE O.rn = 1
+        -- Seek on UX_FactVentas_Fuente_SourceKey
         AND NOT EXISTS (
             SELECT 1 FROM dw.FactVentas fv
-            WHERE fv.SourceKey = O.source_key_orden + '-' + O.source_key_item
-            AND fv.Fuente = O.source_system
+            WHERE fv.Fuente = O.source_system
+            AND fv.SourceKey = O.fact_source_key
         )
         -- Exclude CRC sales without exchange rate (must have official rate)
         AND (O.moneda != 'CRC' OR T.TC_CRC_USD IS NOT NULL)
@@ -235,18 +281,6 @@ query_select_new_orders = """
     WHERE load_ts > :last_load_ts
 """
 
-query_check_existing_product = """
-    SELECT COUNT(*) 
-    FROM dw.DimProducto 
-    WHERE SourceSystem = :SourceSystem AND SourceKey = :SourceKey
-"""
-
-query_check_existing_sku = """
-    SELECT COUNT(*) 
-    FROM dw.DimProducto 
-    WHERE SKU = :SKU
-"""
-
 """ -----------------------------------------------------------------------
             Funciones auxiliares para cargar el DataWarehouse
     ----------------------------------------------------------------------- """
@@ -311,58 +345,6 @@ def should_run_process(conn):
     return False, "No hay datos nuevos para procesar"
 
 
-def get_clientes_stg(conn, last_load_ts):
-    """Obtiene clientes nuevos desde el staging"""
-    result = conn.execute(
-        text(query_select_clientes_stg), {"last_load_ts": last_load_ts}
-    )
-    clientes_stg = result.fetchall()
-    return clientes_stg
-
-
-def get_map_productos(conn):
-    """Obtiene todos los productos desde el staging (sin load_ts)"""
-    result = conn.execute(text(query_select_map_producto))
-    productos_stg = result.fetchall()
-    return productos_stg
-
-
-def get_new_map_productos(conn):
-    """Obtiene solo productos nuevos que no existen en el DW"""
-    result = conn.execute(text(query_select_map_producto_new))
-    productos_stg = result.fetchall()
-    return productos_stg
-
-
-def product_exists(conn, source_system, source_key):
-    """Verifica si un producto ya existe en el DW por SourceSystem/SourceKey"""
-    result = conn.execute(
-        text(query_check_existing_product),
-        {"SourceSystem": source_system, "SourceKey": source_key},
-    )
-    return result.fetchone()[0] > 0
-
-
-def sku_exists(conn, sku):
-    """Verifica si un SKU ya existe en el DW"""
-    if not sku:
-        return False
-    result = conn.execute(
-        text(query_check_existing_sku),
-        {"SKU": sku},
-    )
-    return result.fetchone()[0] > 0
-
-
-def cliente_exists(conn, source_system, source_key):
-    """Verifica si un cliente ya existe en el DW"""
-    result = conn.execute(
-        text(query_check_existing_cliente),
-        {"SourceSystem": source_system, "SourceKey": source_key},
-    )
-    return result.fetchone()[0] > 0
-
-
 def load_dim_tiempo(conn):
     """Load DimTiempo and sync exchange rates from stg.tipo_cambio"""
     # Check if we have dates up to today
@@ -391,116 +373,39 @@ def load_dim_tiempo(conn):
 
 
 def load_dim_cliente(conn):
-    """Carga solo clientes nuevos, evitando duplicados"""
+    """Carga solo clientes nuevos (set-based), evitando duplicados"""
     last_load_ts = get_last_load_timestamp(conn, "dw.DimCliente")
-    clientes_stg = get_clientes_stg(conn, last_load_ts)
-
-    if not clientes_stg:
-        return 0, 0, {}
+    result = conn.execute(text(query_load_dimCliente), {"last_load_ts": last_load_ts})
 
     loaded_count = 0
     skipped_count = 0
     by_source = {}
 
-    for cliente in clientes_stg:
-        source = cliente.sourceSystem
-        if source not in by_source:
-            by_source[source] = 0
-
-        # Double check to avoid duplicates
-        if not cliente_exists(conn, cliente.sourceSystem, cliente.sourceCode):
-            conn.execute(
-                text(query_insert_dimCliente_dw),
-                {
-                    "sourceSystem": cliente.sourceSystem,
-                    "sourceKey": cliente.sourceCode,
-                    "Email": cliente.Email,
-                    "Nombre": cliente.Nombre,
-                    "Genero": cliente.Genero,
-                    "Pais": cliente.Pais,
-                    "FechaCreacion": cliente.FechaCreacion,
-                },
-            )
-            loaded_count += 1
-            by_source[source] += 1
-        else:
-            skipped_count += 1
+    for row in result.fetchall():
+        by_source[row.SourceSystem] = row.Cargados
+        loaded_count += row.Cargados
+        skipped_count += row.Candidatos - row.Cargados
 
     return loaded_count, skipped_count, by_source
 
 
 def load_dim_producto(conn):
-    """Carga productos - maneja la falta de load_ts en map_producto"""
-
-    # Load only new products (recommended for production)
-    productos_stg = get_new_map_productos(conn)
-
-    if not productos_stg:
-        return 0, {}
+    """Carga productos nuevos (set-based) - map_producto no tiene load_ts"""
+    result = conn.execute(text(query_load_dimProducto))
 
     loaded_count = 0
-    skipped_count = 0
     by_source = {}
 
-    for producto in productos_stg:
-        source = producto.SourceSystem
-        if source not in by_source:
-            by_source[source] = 0
-
-        # Check by (SourceSystem, SourceKey) AND by SKU to avoid duplicates
-        if product_exists(conn, producto.SourceSystem, producto.SourceKey):
-            skipped_count += 1
-            continue
-        if sku_exists(conn, producto.SKU):
-            # SKU already exists from another source, skip
-            skipped_count += 1
-            continue
-
-        conn.execute(
-            text(query_insert_dimProducto_dw),
-            {
-                "SourceSystem": producto.SourceSystem,
-                "SourceKey": producto.SourceKey,
-                "SKU": producto.SKU,
-                "Nombre": producto.Nombre,
-                "Categoria": producto.Categoria,
-                "EsServicio": producto.EsServicio,
-            },
-        )
-        loaded_count += 1
-        by_source[source] += 1
+    for row in result.fetchall():
+        by_source[row.SourceSystem] = row.Cargados
+        loaded_count += row.Cargados
 
     return loaded_count, by_source
 
 
 def load_dim_producto_initial(conn):
     """Carga inicial de todos los productos (usar solo primera vez)"""
-    productos_stg = get_map_productos(conn)
-
-    if not productos_stg:
-        return 0
-
-    loaded_count = 0
-    for producto in productos_stg:
-        # Check by (SourceSystem, SourceKey) AND by SKU to avoid duplicates
-        if product_exists(conn, producto.SourceSystem, producto.SourceKey):
-            continue
-        if sku_exists(conn, producto.SKU):
-            continue
-
-        conn.execute(
-            text(query_insert_dimProducto_dw),
-            {
-                "SourceSystem": producto.SourceSystem,
-                "SourceKey": producto.SourceKey,
-                "SKU": producto.SKU,
-                "Nombre": producto.Nombre,
-                "Categoria": producto.Categoria,
-                "EsServicio": producto.EsServicio,
-            },
-        )
-        loaded_count += 1
-
+    loaded_count, _ = load_dim_producto(conn)
     return loaded_count
 
 
@@ -572,8 +477,8 @@ def load_fact_ventas(conn):
         WHERE O.load_ts > :last_load_ts
             AND EXISTS (
                 SELECT 1 FROM dw.FactVentas fv
-                WHERE fv.SourceKey = O.source_key_orden + '-' + O.source_key_item
-                AND fv.Fuente = O.source_system
+                WHERE fv.Fuente = O.source_system
+                AND fv.SourceKey = O.fact_source_key
             )
         UNION ALL
         SELECT 
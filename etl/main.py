@@ -1,21 +1,32 @@
 import argparse
+import functools
 import signal
 import sys
+import time
 import warnings
 
-from extract.mssql import extract_mssql
-from extract.mysql import extract_mysql
+from extract.mssql import extract_mssql, read_max_ids as read_max_ids_mssql
+from extract.mysql import extract_mysql, read_max_ids as read_max_ids_mysql
 from extract.supabase import extract_supabase
 from extract.mongo import extract_mongo
 from extract.neo4j import extract_neo4j
+from extract.scheduler import DEFAULT_TIMEOUT, run_extractions
+from extract.streaming import DEFAULT_CHUNK_SIZE
+from extract.watermarks import WatermarkStore
 from equivalences import build_equivalence_map
-from transform.mssql import transform_mssql
-from transform.mysql import transform_mysql
+from map_producto_index import MapProductoIndex
+from sku_sequence import SkuSequence
+from transform.mssql import transform_mssql, transform_mssql_stream
+from transform.mysql import transform_mysql, transform_mysql_stream
 from transform.supabase import transform_supabase
-from transform.mongo import transform_mongo
+from transform.mongo import transform_mongo, transform_mongo_stream
 from transform.neo4j import transform_Neo4j
 from load.general import load_datawarehouse
-from association_rules.load_rules import carga_reglas_asociacion
+from association_rules.load_rules import (
+    MOTOR_FPGROWTH,
+    MOTORES,
+    carga_reglas_asociacion,
+)
 
 # Suppress SQLAlchemy SAWarning about unrecognized SQL Server versions
 warnings.filterwarnings("ignore", message=".*Unrecognized server version info.*")
@@ -24,6 +35,13 @@ warnings.filterwarnings("ignore", category=DeprecationWarning, module="supabase"
 
 SUPPORTED_DBS = {"mssql", "mysql", "supabase", "mongo", "neo4j"}
 DEFAULT_DBS = ["mssql", "mysql", "supabase", "mongo", "neo4j"]
+SOURCE_NAMES = {
+    "mssql": "MSSQL",
+    "mysql": "MySQL",
+    "supabase": "Supabase",
+    "mongo": "MongoDB",
+    "neo4j": "Neo4j",
+}
 
 # Global variable to control interruptions
 interrupted = False
@@ -74,33 +92,47 @@ def verificar_tipos_cambio():
         return -1
 
 
-def get_max_existing_sku():
-    """Get the highest SKU number already in stg.map_producto."""
-    from sqlalchemy import text
-    from configs.connections import get_dw_engine
+def _extraction_value(results, db):
+    """Return the extracted objects for a source, or None if it was not selected."""
+    result = results.get(db)
+    return result.value if result is not None else None
+
+
+def _windowed_extractor(db, extract_fn, read_max_ids, store, incremental, windows):
+    """
+    Wrap a SQL source extractor so that it first opens its watermark window
+    (inside the extraction thread) and extracts only that window.
+    The window is kept in `windows[db]` to be saved after staging.
+    """
+
+    def run():
+        window = store.open_window(db, read_max_ids(), incremental)
+        windows[db] = window
+        return extract_fn(window=window)
 
+    return run
+
+
+def _save_watermark(store, windows, db, unstaged):
+    """
+    Record the source's window as staged, but only if every row of it reached
+    staging (`unstaged` = rows the transform skipped or the writer rejected).
+    Otherwise the previous mark is kept and the next run re-reads the window.
+    A failure to save only costs a re-read.
+    """
+    window = windows.get(db)
+    if window is None:
+        return
+    if unstaged:
+        print(
+            f"    ⚠️ {SOURCE_NAMES[db]}: {unstaged} rows not staged, watermarks kept "
+            "(the window will be re-read on the next run)"
+        )
+        return
     try:
-        engine = get_dw_engine()
-        with engine.connect() as conn:
-            result = conn.execute(
-                text("""
-                SELECT MAX(
-                    CAST(
-                        CASE 
-                            WHEN SUBSTRING(sku_oficial, 4, 1) = '-' 
-                                THEN SUBSTRING(sku_oficial, 5, LEN(sku_oficial))
-                            ELSE SUBSTRING(sku_oficial, 4, LEN(sku_oficial))
-                        END
-                    AS INT)
-                )
-                FROM stg.map_producto
-                WHERE sku_oficial LIKE 'SKU%'
-            """)
-            )
-            max_num = result.fetchone()[0]
-            return max_num if max_num else 0
-    except Exception:
-        return 0
+        store.save(window)
+    except Exception as e:
+        print(f"    ⚠️ Could not save {SOURCE_NAMES[db]} watermarks: {e}")
 
 
 def parse_db_filters(raw_filters):
@@ -143,6 +175,52 @@ def build_arg_parser():
         default="info",
         help="Log level: 'info' (default) or 'debug' for verbose output.",
     )
+    parser.add_argument(
+        "--extract-timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Timeout in seconds for each source extraction (default {DEFAULT_TIMEOUT}).",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Read MSSQL/MySQL/MongoDB order items in chunks with server-side "
+            "cursors during transformation instead of loading them all at "
+            "extraction (MongoDB items are flattened by an aggregation pipeline)."
+        ),
+    )
+    parser.add_argument(
+        "--stream-chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Rows per chunk in --stream mode (default {DEFAULT_CHUNK_SIZE}).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Read only MSSQL/MySQL clients, orders and order items added since "
+            "the last staged run (watermarks in stg.etl_watermark)."
+        ),
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help=(
+            "Read MSSQL/MySQL in full (default; overrides --incremental) and "
+            "reset the watermarks to the current MAX(id)."
+        ),
+    )
+    parser.add_argument(
+        "--rules-engine",
+        choices=sorted(MOTORES),
+        default=MOTOR_FPGROWTH,
+        help=(
+            "Association rule engine: 'fpgrowth' (default) or 'cooccurrence' "
+            "(pairwise/triple rules from a sparse co-occurrence matrix)."
+        ),
+    )
     return parser
 
 
@@ -169,89 +247,72 @@ if __name__ == "__main__":
             print(f"    {count} records OK")
         check_interrupt()
 
-        objetos_mssql = None
-        objetos_mysql = None
-        objetos_supabase = None
-        objetos_mongo = None
-        objetos_neo4j = None
-
         # ========== EXTRACTION ==========
+        # Sources are extracted concurrently; each one has its own timeout
+        # and a failure in one source does not stop the others.
         print("\n[2] Extraction")
 
-        if "mssql" in selected_dbs:
-            try:
-                objetos_mssql = extract_mssql()
-                check_interrupt()
-            except InterruptedError:
-                raise
-            except Exception as e:
-                if interrupted:
-                    raise InterruptedError("MSSQL extraction interrupted")
-                print(f"    Error extracting from MSSQL: {e}")
-                import traceback
-
-                traceback.print_exc()
-                sys.exit(1)
-
-        if "mysql" in selected_dbs:
-            try:
-                objetos_mysql = extract_mysql()
-                check_interrupt()
-            except InterruptedError:
-                raise
-            except Exception as e:
-                if interrupted:
-                    raise InterruptedError("MySQL extraction interrupted")
-                print(f"    Error extracting from MySQL: {e}")
-                import traceback
-
-                traceback.print_exc()
-                sys.exit(1)
-
-        if "supabase" in selected_dbs:
-            try:
-                objetos_supabase = extract_supabase()
-                check_interrupt()
-            except InterruptedError:
-                raise
-            except Exception as e:
-                if interrupted:
-                    raise InterruptedError("Supabase extraction interrupted")
-                print(f"    Error extracting from Supabase: {e}")
-                import traceback
+        stream_extract_options = (
+            {"stream": True, "chunk_size": cli_args.stream_chunk_size}
+            if cli_args.stream
+            else {}
+        )
+        incremental = cli_args.incremental and not cli_args.full
+        watermark_store = WatermarkStore()
+        extract_windows = {}
+        extractors = {
+            "mssql": _windowed_extractor(
+                "mssql",
+                functools.partial(extract_mssql, **stream_extract_options),
+                read_max_ids_mssql,
+                watermark_store,
+                incremental,
+                extract_windows,
+            ),
+            "mysql": _windowed_extractor(
+                "mysql",
+                functools.partial(extract_mysql, **stream_extract_options),
+                read_max_ids_mysql,
+                watermark_store,
+                incremental,
+                extract_windows,
+            ),
+            "supabase": extract_supabase,
+            "mongo": functools.partial(extract_mongo, **stream_extract_options),
+            "neo4j": extract_neo4j,
+        }
+        extraction_start = time.perf_counter()
+        extraction_results = run_extractions(
+            {db: extractors[db] for db in selected_dbs},
+            default_timeout=cli_args.extract_timeout,
+            should_stop=lambda: interrupted,
+        )
+        check_interrupt()
 
-                traceback.print_exc()
-                sys.exit(1)
+        failed_sources = []
+        for db, result in extraction_results.items():
+            if result.ok:
+                if debug_mode:
+                    print(f"    {db}: extracted in {result.elapsed:.1f}s")
+                continue
+            failed_sources.append(db)
+            print(f"    Error extracting from {SOURCE_NAMES[db]}: {result.error}")
+            import traceback
 
-        if "mongo" in selected_dbs:
-            try:
-                objetos_mongo = extract_mongo()
-                check_interrupt()
-            except InterruptedError:
-                raise
-            except Exception as e:
-                if interrupted:
-                    raise InterruptedError("MongoDB extraction interrupted")
-                print(f"    Error extracting from MongoDB: {e}")
-                import traceback
+            traceback.print_exception(result.error)
 
-                traceback.print_exc()
-                sys.exit(1)
+        if failed_sources:
+            sys.exit(1)
 
-        if "neo4j" in selected_dbs:
-            try:
-                objetos_neo4j = extract_neo4j()
-                check_interrupt()
-            except InterruptedError:
-                raise
-            except Exception as e:
-                if interrupted:
-                    raise InterruptedError("Neo4j extraction interrupted")
-                print(f"    Error extracting from Neo4j: {e}")
-                import traceback
+        print(
+            f"    Extraction finished in {time.perf_counter() - extraction_start:.1f}s"
+        )
 
-                traceback.print_exc()
-                sys.exit(1)
+        objetos_mssql = _extraction_value(extraction_results, "mssql")
+        objetos_mysql = _extraction_value(extraction_results, "mysql")
+        objetos_supabase = _extraction_value(extraction_results, "supabase")
+        objetos_mongo = _extraction_value(extraction_results, "mongo")
+        objetos_neo4j = _extraction_value(extraction_results, "neo4j")
 
         # ========== EQUIVALENCES ==========
         # Build product equivalence map from ALL sources BEFORE transformation.
@@ -259,8 +320,12 @@ if __name__ == "__main__":
         print("\n[3] Building product equivalences")
 
         try:
-            # Get the highest existing SKU to avoid duplicates
-            max_sku = get_max_existing_sku()
+            # Snapshot of stg.map_producto for the transforms' SKU fallbacks.
+            # New SKUs (equivalences and fallbacks) come from one shared DW
+            # sequence, always above the highest SKU already registered.
+            sku_sequence = SkuSequence()
+            map_index = MapProductoIndex.load(sku_sequence=sku_sequence)
+            sku_sequence.advance_to(map_index.max_sku_number)
 
             # Extract product lists from each source
             productos_mssql = objetos_mssql[1] if objetos_mssql else None
@@ -280,7 +345,7 @@ if __name__ == "__main__":
                 productos_supabase=productos_supabase,
                 productos_mongo=productos_mongo,
                 productos_neo4j=productos_neo4j,
-                existing_max_sku=max_sku,
+                sku_sequence=sku_sequence,
                 debug=debug_mode,
             )
 
@@ -291,6 +356,11 @@ if __name__ == "__main__":
                 f"Mongo={stats['sku_from']['mongo']}, Neo4j={stats['sku_from']['neo4j']}, Generated={stats['sku_from']['generated']}"
             )
 
+            # SKUs taken from the sources are reserved so that fallback
+            # generation never reuses them
+            map_index.reserve_skus(eq.sku_oficial for eq in eq_map)
+            print(f"    {len(map_index)} map_producto rows indexed")
+
             check_interrupt()
         except InterruptedError:
             raise
@@ -308,13 +378,24 @@ if __name__ == "__main__":
         # All transforms now use the equivalence map for SKU resolution
         if "mssql" in selected_dbs and objetos_mssql:
             try:
-                transform_mssql(
-                    objetos_mssql[0],
-                    objetos_mssql[1],
-                    objetos_mssql[2],
-                    objetos_mssql[3],
-                    eq_map,
-                )
+                if cli_args.stream:
+                    unstaged = transform_mssql_stream(
+                        objetos_mssql[0],
+                        objetos_mssql[1],
+                        objetos_mssql[2],
+                        eq_map,
+                        map_index,
+                    )
+                else:
+                    unstaged = transform_mssql(
+                        objetos_mssql[0],
+                        objetos_mssql[1],
+                        objetos_mssql[2],
+                        objetos_mssql[3],
+                        eq_map,
+                        map_index,
+                    )
+                _save_watermark(watermark_store, extract_windows, "mssql", unstaged)
                 check_interrupt()
             except InterruptedError:
                 raise
@@ -329,13 +410,24 @@ if __name__ == "__main__":
 
         if "mysql" in selected_dbs and objetos_mysql:
             try:
-                transform_mysql(
-                    objetos_mysql[0],
-                    objetos_mysql[1],
-                    objetos_mysql[2],
-                    objetos_mysql[3],
-                    eq_map,
-                )
+                if cli_args.stream:
+                    unstaged = transform_mysql_stream(
+                        objetos_mysql[0],
+                        objetos_mysql[1],
+                        objetos_mysql[2],
+                        eq_map,
+                        map_index,
+                    )
+                else:
+                    unstaged = transform_mysql(
+                        objetos_mysql[0],
+                        objetos_mysql[1],
+                        objetos_mysql[2],
+                        objetos_mysql[3],
+                        eq_map,
+                        map_index,
+                    )
+                _save_watermark(watermark_store, extract_windows, "mysql", unstaged)
                 check_interrupt()
             except InterruptedError:
                 raise
@@ -356,6 +448,7 @@ if __name__ == "__main__":
                     objetos_supabase[2],
                     objetos_supabase[3],
                     eq_map,
+                    map_index,
                 )
                 check_interrupt()
             except InterruptedError:
@@ -371,12 +464,22 @@ if __name__ == "__main__":
 
         if "mongo" in selected_dbs and objetos_mongo:
             try:
-                transform_mongo(
-                    objetos_mongo[0],
-                    objetos_mongo[1],
-                    objetos_mongo[2],
-                    eq_map,
-                )
+                if cli_args.stream:
+                    transform_mongo_stream(
+                        objetos_mongo[0],
+                        objetos_mongo[1],
+                        objetos_mongo[2],
+                        eq_map,
+                        map_index,
+                    )
+                else:
+                    transform_mongo(
+                        objetos_mongo[0],
+                        objetos_mongo[1],
+                        objetos_mongo[2],
+                        eq_map,
+                        map_index,
+                    )
                 check_interrupt()
             except InterruptedError:
                 raise
@@ -399,6 +502,7 @@ if __name__ == "__main__":
                     rels.get("REALIZO", []),
                     rels.get("CONTIENE", []),
                     eq_map,
+                    map_index,
                 )
                 check_interrupt()
             except InterruptedError:
@@ -420,7 +524,7 @@ if __name__ == "__main__":
         # ========== ASSOCIATION RULES ==========
         print("\n[6] Association Rules (Apriori/FP-Growth)")
         try:
-            carga_reglas_asociacion()
+            carga_reglas_asociacion(motor=cli_args.rules_engine)
         except Exception as e:
             print(f"    Warning: Could not generate association rules: {e}")
 
@@ -0,0 +1,182 @@
+"""
+map_producto_index.py
+In-memory index of stg.map_producto, loaded once per ETL run.
+
+The transforms fall back to stg.map_producto when the equivalence map does not
+know a product. Doing that with one query per product (and with LOWER() in the
+predicate, which rules out any index) is slow, so the table is read with a
+single scan at the start of the transformation stage and every fallback is
+answered from memory.
+
+Lookups supported (same semantics as the per-row queries they replace):
+- by (source_system, source_code)
+- by sku_oficial (does the SKU already exist?)
+- by normalized (nombre, categoria), honoring the source priority
+  mssql > supabase > others, and the most recent row within the same priority
+
+Rows staged during the run are registered in the index (see StagingWriter),
+so later transforms see them exactly as they would have seen them in the table.
+
+New SKUs come from the shared SkuSequence, always above the highest SKU number
+the index knows about.
+"""
+
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+
+from configs.connections import get_dw_engine
+from sku_sequence import SkuSequence
+
+query_select_map_producto = """
+    SELECT map_id, source_system, source_code, sku_oficial, nombre_norm, categoria_norm
+    FROM stg.map_producto
+    ORDER BY map_id
+"""
+
+# Priority for name+category matches (lower is better)
+SOURCE_PRIORITY = {"mssql": 1, "supabase": 2}
+DEFAULT_PRIORITY = 3
+
+_SKU_NUMBER = re.compile(r"^SKU-?(\d+)$", re.IGNORECASE)
+
+
+def _normalize_key(nombre: Optional[str], categoria: Optional[str]) -> tuple:
+    """Normalize name and category for matching (same as EquivalenceMap)."""
+    return ((nombre or "").strip().lower(), (categoria or "").strip().lower())
+
+
+def sku_number(sku: Optional[str]) -> Optional[int]:
+    """Numeric part of a SKU ('SKU-0042' or 'SKU0042' -> 42), or None."""
+    if not sku:
+        return None
+    match = _SKU_NUMBER.match(sku.strip())
+    return int(match.group(1)) if match else None
+
+
+class MapProductoIndex:
+    """
+    In-memory view of stg.map_producto.
+
+    Usage:
+        map_index = MapProductoIndex.load()
+        sku = map_index.get_sku_by_source("mysql", "ALT-AB12")
+        sku = map_index.get_sku_by_name("Televisor LED 32", "Electrónica")
+        if map_index.sku_exists("SKU-0042"): ...
+    """
+
+    def __init__(self, sku_sequence: Optional[SkuSequence] = None):
+        # (source_system, source_code) -> sku_oficial
+        self._by_source: Dict[Tuple[str, str], str] = {}
+        # set of known sku_oficial values
+        self._skus: set = set()
+        # (nombre_lower, categoria_lower) -> (priority, -seq, sku_oficial)
+        self._by_name_cat: Dict[tuple, Tuple[int, int, str]] = {}
+        # Monotonic counter so that later rows win ties (like map_id DESC)
+        self._seq = 0
+        self._max_sku_num = 0
+        self._sku_sequence = sku_sequence
+
+    @classmethod
+    def load(
+        cls, engine=None, sku_sequence: Optional[SkuSequence] = None
+    ) -> "MapProductoIndex":
+        """Build the index with a single scan of stg.map_producto."""
+        engine = engine or get_dw_engine()
+        index = cls(sku_sequence or SkuSequence(engine))
+        with engine.connect() as conn:
+            result = conn.execute(text(query_select_map_producto))
+            for row in result:
+                index._add(
+                    row.source_system,
+                    row.source_code,
+                    row.sku_oficial,
+                    row.nombre_norm,
+                    row.categoria_norm,
+                )
+        return index
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def register(self, params: dict) -> None:
+        """Register a stg.map_producto row staged during this run."""
+        self._add(
+            params.get("source_system"),
+            params.get("source_code"),
+            params.get("sku_oficial"),
+            params.get("nombre_norm"),
+            params.get("categoria_norm"),
+        )
+
+    def reserve_skus(self, skus: Iterable[str]) -> None:
+        """
+        Mark SKUs as taken without adding rows (e.g. SKUs already assigned by
+        the equivalence map to products that have not been staged yet), so
+        next_sku() never hands them out.
+        """
+        for sku in skus:
+            self._track_sku_number(sku)
+
+    def _add(self, source_system, source_code, sku, nombre, categoria) -> None:
+        self._seq += 1
+        if source_system is not None and source_code is not None:
+            self._by_source[(source_system, source_code)] = sku
+
+        if not sku:
+            return
+
+        self._skus.add(sku)
+        self._track_sku_number(sku)
+
+        key = _normalize_key(nombre, categoria)
+        candidate = (
+            SOURCE_PRIORITY.get(source_system, DEFAULT_PRIORITY),
+            -self._seq,
+            sku,
+        )
+        current = self._by_name_cat.get(key)
+        if current is None or candidate < current:
+            self._by_name_cat[key] = candidate
+
+    def _track_sku_number(self, sku: Optional[str]) -> None:
+        number = sku_number(sku)
+        if number is not None and number > self._max_sku_num:
+            self._max_sku_num = number
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get_sku_by_source(self, source_system: str, source_code: str) -> Optional[str]:
+        """SKU registered for a (source_system, source_code) pair."""
+        return self._by_source.get((source_system, source_code)) or None
+
+    def sku_exists(self, sku: Optional[str]) -> bool:
+        """True if the SKU is already used by some row of stg.map_producto."""
+        return bool(sku) and sku in self._skus
+
+    def get_sku_by_name(self, nombre: str, categoria: str) -> Optional[str]:
+        """Best SKU for a (nombre, categoria) pair, by source priority."""
+        match = self._by_name_cat.get(_normalize_key(nombre, categoria))
+        return match[2] if match else None
+
+    @property
+    def max_sku_number(self) -> int:
+        """Highest SKU number known to the index (0 if none)."""
+        return self._max_sku_num
+
+    def next_sku(self) -> str:
+        """Next free SKU from the sequence, above every SKU the index knows."""
+        if self._sku_sequence is None:
+            self._max_sku_num += 1
+            return f"SKU-{self._max_sku_num:04d}"
+        self._sku_sequence.advance_to(self._max_sku_num)
+        sku = self._sku_sequence.next_sku()
+        self._track_sku_number(sku)
+        return sku
+
+    def __len__(self) -> int:
+        return len(self._by_source)
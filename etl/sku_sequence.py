@@ -0,0 +1,102 @@
+"""
+sku_sequence.py
+Block-allocated sequence for the SKUs generated by the ETL.
+
+New SKUs used to be computed as MAX(sku_oficial) + 1 with a string-parsing
+full scan of stg.map_producto, once per run and once per unmatched product,
+and two concurrent runs could hand out the same number. The counter now lives
+in stg.secuencia_sku: each run reserves a block of numbers with a single atomic
+UPDATE ... OUTPUT and hands them out from memory, so there are no scans and no
+two runs ever get the same number. Unused numbers of a block are simply lost
+(gaps in SKU numbering are harmless).
+"""
+
+from typing import Optional
+
+from sqlalchemy import text
+
+from configs.connections import get_dw_engine
+
+# Numbers reserved per round trip to the DW
+SKU_BLOCK_SIZE = 100
+
+SEQUENCE_NAME = "sku"
+
+# Reserve `cantidad` numbers above max(ultimo_numero, minimo); the UPDATE takes
+# a row lock, so concurrent reservations are serialized.
+query_reserve_sku_block = """
+    UPDATE stg.secuencia_sku
+    SET ultimo_numero = (
+            CASE WHEN ultimo_numero < :minimo THEN :minimo ELSE ultimo_numero END
+        ) + :cantidad,
+        actualizado_ts = SYSDATETIME()
+    OUTPUT inserted.ultimo_numero
+    WHERE nombre = :nombre
+"""
+
+
+def format_sku(number: int) -> str:
+    """Canonical SKU format (42 -> 'SKU-0042')."""
+    return f"SKU-{number:04d}"
+
+
+class SkuSequence:
+    """
+    Hands out SKU numbers from blocks reserved in stg.secuencia_sku.
+
+    Usage:
+        sequence = SkuSequence()
+        sequence.advance_to(450)      # never return numbers <= 450
+        sku = sequence.next_sku()     # 'SKU-0451' (or higher)
+    """
+
+    def __init__(self, engine=None, block_size: int = SKU_BLOCK_SIZE):
+        self._engine = engine or get_dw_engine()
+        self._block_size = block_size
+        # Current block: numbers in (_next - 1, _last] are still available
+        self._next = 1
+        self._last = 0
+        # Lowest number the sequence may return minus one
+        self._floor = 0
+        self.blocks_reserved = 0
+
+    def advance_to(self, number: Optional[int]) -> None:
+        """Never hand out numbers <= `number` (e.g. highest SKU already in use)."""
+        if number is not None and number > self._floor:
+            self._floor = number
+
+    def next_number(self) -> int:
+        """Next number of the sequence, reserving a new block when needed."""
+        if self._next <= self._floor:
+            self._next = self._floor + 1
+        if self._next > self._last:
+            self._reserve_block()
+        number = self._next
+        self._next += 1
+        return number
+
+    def next_sku(self) -> str:
+        """Next SKU of the sequence ('SKU-xxxx')."""
+        return format_sku(self.next_number())
+
+    def _reserve_block(self) -> None:
+        with self._engine.connect() as conn:
+            result = conn.execute(
+                text(query_reserve_sku_block),
+                {
+                    "minimo": self._floor,
+                    "cantidad": self._block_size,
+                    "nombre": SEQUENCE_NAME,
+                },
+            )
+            row = result.fetchone()
+            conn.commit()
+
+        if row is None:
+            raise RuntimeError(
+                f"SKU sequence '{SEQUENCE_NAME}' not found in stg.secuencia_sku"
+            )
+
+        self._last = row[0]
+        self._next = self._last - self._block_size + 1
+        self.blocks_reserved += 1
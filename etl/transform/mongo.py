@@ -1,226 +1,27 @@
-import pandas as pd
-from bson import ObjectId
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import text
-
-from configs.connections import get_dw_engine, get_mongo_database
+from configs.connections import get_dw_engine
+from map_producto_index import MapProductoIndex
+from transform.staging import StagingWriter
 
 if TYPE_CHECKING:
     from equivalences import EquivalenceMap
 
-db = get_mongo_database()
-products_collection = db["productos"]
-
 engine = get_dw_engine()
 
-# Query to find SKU from map_producto by source_code (for mongo source)
-query_find_sku_by_source_code = """
-    SELECT TOP 1 sku_oficial
-    FROM stg.map_producto
-    WHERE source_system = :source_system AND source_code = :source_code
-"""
-
-# Query to find existing SKU by matching SKU value (for equivalencias.sku)
-query_find_sku_by_sku = """
-    SELECT TOP 1 sku_oficial
-    FROM stg.map_producto
-    WHERE sku_oficial = :sku
-      AND sku_oficial IS NOT NULL
-      AND sku_oficial != ''
-"""
-
-# Query to find SKU by name and category (case-insensitive, priority to mssql)
-query_find_sku_by_name_category = """
-    SELECT TOP 1 sku_oficial
-    FROM stg.map_producto
-    WHERE LOWER(nombre_norm) = LOWER(:nombre_norm)
-      AND LOWER(categoria_norm) = LOWER(:categoria_norm)
-      AND sku_oficial IS NOT NULL
-      AND sku_oficial != ''
-    ORDER BY
-        CASE source_system
-            WHEN 'mssql' THEN 1
-            WHEN 'supabase' THEN 2
-            ELSE 3
-        END,
-        map_id DESC
-"""
-
-
-def find_sku_from_map_producto(codigo_mongo: str) -> str | None:
-    """
-    Find SKU from map_producto table by source_code.
-    Used as first attempt for previously registered products.
-    """
-    with engine.connect() as conn:
-        result = conn.execute(
-            text(query_find_sku_by_source_code),
-            {"source_system": "mongo", "source_code": codigo_mongo},
-        )
-        row = result.fetchone()
-        if row:
-            return row[0]
-    return None
-
-
-def find_sku_by_sku_value(sku: str) -> str | None:
-    """
-    Find if a SKU already exists in map_producto.
-    MongoDB has equivalencias.sku which may contain the canonical SKU.
-    """
-    if not sku:
-        return None
-    with engine.connect() as conn:
-        result = conn.execute(text(query_find_sku_by_sku), {"sku": sku})
-        row = result.fetchone()
-        if row:
-            return row[0]
-    return None
-
-
-def find_sku_by_name_category(nombre: str, categoria: str) -> str | None:
-    """
-    Find SKU from map_producto by matching name and category.
-    Prioritizes MSSQL (canonical source) and Supabase (uses SKU directly).
-    This is the fallback when no direct code mapping exists.
-    """
-    with engine.connect() as conn:
-        result = conn.execute(
-            text(query_find_sku_by_name_category),
-            {"nombre_norm": nombre, "categoria_norm": categoria},
-        )
-        row = result.fetchone()
-        if row:
-            return row[0]
-    return None
-
-
-""" -----------------------------------------------------------------------
-            Queries de SQL para transformación de datos de MongoDB
-    ----------------------------------------------------------------------- """
-
-query_insert_map_producto = """
-    MERGE INTO stg.map_producto AS target
-    USING (SELECT
-        :source_system AS source_system,
-        :source_code AS source_code,
-        :sku_oficial AS sku_oficial,
-        :nombre_norm AS nombre_norm,
-        :categoria_norm AS categoria_norm,
-        :es_servicio AS es_servicio
-    ) AS source
-    ON target.source_system = source.source_system
-        AND target.source_code = source.source_code
-    WHEN MATCHED THEN
-        UPDATE SET
-            sku_oficial = source.sku_oficial,
-            nombre_norm = source.nombre_norm,
-            categoria_norm = source.categoria_norm,
-            es_servicio = source.es_servicio
-    WHEN NOT MATCHED THEN
-        INSERT (source_system, source_code, sku_oficial, nombre_norm, categoria_norm, es_servicio)
-        VALUES (source.source_system, source.source_code, source.sku_oficial,
-                source.nombre_norm, source.categoria_norm, source.es_servicio);
-"""
-
-query_select_map_producto_sku = """
-    SELECT TOP 1
-        sku_oficial AS SKU
-    FROM
-        stg.map_producto
-    ORDER BY
-        map_id DESC
-"""
-
-query_insert_orden_item_stg = """
-    MERGE INTO stg.orden_items AS target
-    USING (SELECT
-        :source_system AS source_system,
-        :source_key_orden AS source_key_orden,
-        :source_key_item AS source_key_item,
-        :source_code_prod AS source_code_prod,
-        :cliente_key AS cliente_key,
-        :fecha_raw AS fecha_raw,
-        :canal_raw AS canal_raw,
-        :moneda AS moneda,
-        :cantidad_raw AS cantidad_raw,
-        :precio_unit_raw AS precio_unit_raw,
-        :total_raw AS total_raw,
-        :fecha_dt AS fecha_dt,
-        :cantidad_num AS cantidad_num,
-        :precio_unit_num AS precio_unit_num,
-        :total_num AS total_num
-    ) AS source
-    ON target.source_system = source.source_system
-        AND target.source_key_orden = source.source_key_orden
-        AND target.source_key_item = source.source_key_item
-    WHEN NOT MATCHED THEN
-        INSERT (source_system, source_key_orden, source_key_item, source_code_prod,
-                cliente_key, fecha_raw, canal_raw, moneda, cantidad_raw, precio_unit_raw,
-                total_raw, fecha_dt, cantidad_num, precio_unit_num, total_num)
-        VALUES (source.source_system, source.source_key_orden, source.source_key_item,
-                source.source_code_prod, source.cliente_key, source.fecha_raw, source.canal_raw,
-                source.moneda, source.cantidad_raw, source.precio_unit_raw, source.total_raw,
-                source.fecha_dt, source.cantidad_num, source.precio_unit_num, source.total_num);
-"""
-
-query_insert_clientes_stg = """
-    MERGE INTO stg.clientes AS target
-    USING (SELECT
-        :source_system AS source_system,
-        :source_code AS source_code,
-        :cliente_email AS cliente_email,
-        :cliente_nombre AS cliente_nombre,
-        :genero_raw AS genero_raw,
-        :pais_raw AS pais_raw,
-        :fecha_creado_raw AS fecha_creado_raw,
-        :fecha_creado_dt AS fecha_creado_dt,
-        :genero_norm AS genero_norm
-    ) AS source
-    ON target.source_system = source.source_system
-        AND target.source_code = source.source_code
-    WHEN MATCHED THEN
-        UPDATE SET
-            cliente_email = COALESCE(source.cliente_email, target.cliente_email),
-            cliente_nombre = COALESCE(source.cliente_nombre, target.cliente_nombre),
-            genero_raw = COALESCE(source.genero_raw, target.genero_raw),
-            pais_raw = COALESCE(source.pais_raw, target.pais_raw),
-            fecha_creado_raw = COALESCE(source.fecha_creado_raw, target.fecha_creado_raw),
-            fecha_creado_dt = COALESCE(source.fecha_creado_dt, target.fecha_creado_dt),
-            genero_norm = COALESCE(source.genero_norm, target.genero_norm)
-    WHEN NOT MATCHED THEN
-        INSERT (source_system, source_code, cliente_email, cliente_nombre, genero_raw,
-                pais_raw, fecha_creado_raw, fecha_creado_dt, genero_norm)
-        VALUES (source.source_system, source.source_code, source.cliente_email,
-                source.cliente_nombre, source.genero_raw, source.pais_raw,
-                COALESCE(source.fecha_creado_raw, '1900-01-01'),
-                source.fecha_creado_dt, source.genero_norm);
-"""
-
 """ -----------------------------------------------------------------------
             Funciones de preparacion de datos para staging de MongoDB
     ----------------------------------------------------------------------- """
 
 
-def find_sku():
-    result = (pd.read_sql(query_select_map_producto_sku, engine))["SKU"].iloc[
-        0
-    ]  # convertir a dataframe y obtener valor de SKU
-    # Extraer parte numérica del SKU (puede ser SKU-0000 o SKU0000)
-    sku_str = result.replace("-", "") if result else "SKU0000"
-    sku = int(sku_str.split("SKU")[1]) + 1  # obtener siguiente numero de SKU
-    sku = "SKU-" + str(sku).zfill(4)  # Cambiar formato a SKU-xxxx
-
-    return sku
-
-
 def insert_map_producto(
     codigo_original,
     sku_equivalencias,
     nombre,
     categoria,
-    eq_map: "EquivalenceMap" = None,
+    eq_map: Optional["EquivalenceMap"],
+    writer: StagingWriter,
+    map_index: MapProductoIndex,
 ):
     """
     Inserta un producto en la tabla stg.map_producto.
@@ -233,6 +34,8 @@ def insert_map_producto(
         nombre: nombre del producto
         categoria: categoria del producto
         eq_map: Mapa de equivalencias de productos
+        writer: StagingWriter de la transformación en curso
+        map_index: Índice en memoria de stg.map_producto del transform (fallback sin consultas)
     """
     sku_oficial = None
 
@@ -246,49 +49,43 @@ def insert_map_producto(
         if sku_norm.upper().startswith("SKU") and "-" not in sku_norm:
             sku_norm = f"SKU-{sku_norm[3:]}"
 
-        existing = find_sku_by_sku_value(sku_norm)
-        if existing:
-            sku_oficial = existing
-        else:
-            sku_oficial = sku_norm
+        # Válido tanto si ya existe en map_producto como si es nuevo
+        sku_oficial = sku_norm
 
     # Fallback: Buscar por source_code (codigo_mongo) en registros previos
     if not sku_oficial and codigo_original:
-        sku_from_map = find_sku_from_map_producto(codigo_original)
-        if sku_from_map:
-            sku_oficial = sku_from_map
+        sku_oficial = map_index.get_sku_by_source("mongo", codigo_original)
 
-    # Fallback: Buscar por nombre+categoria en DB
+    # Fallback: Buscar por nombre+categoria en map_producto
     if not sku_oficial:
-        sku_by_name = find_sku_by_name_category(nombre, categoria)
-        if sku_by_name:
-            sku_oficial = sku_by_name
+        sku_oficial = map_index.get_sku_by_name(nombre, categoria)
 
     # Last resort: generate new SKU
     if not sku_oficial:
-        sku_oficial = find_sku()
+        sku_oficial = map_index.next_sku()
 
     # Ensure source_code is never empty
     if not codigo_original:
         codigo_original = "Sin código"
 
-    with engine.connect() as conn:
-        conn.execute(
-            text(query_insert_map_producto),
-            {
-                "source_system": "mongo",
-                "source_code": codigo_original,
-                "sku_oficial": sku_oficial,
-                "nombre_norm": nombre,
-                "categoria_norm": categoria,
-                "es_servicio": False,
-            },
-        )
-
-        conn.commit()
+    writer.add(
+        "map_producto",
+        {
+            "source_system": "mongo",
+            "source_code": codigo_original,
+            "sku_oficial": sku_oficial,
+            "nombre_norm": nombre,
+            "categoria_norm": categoria,
+            "es_servicio": False,
+        },
+    )
 
 
-def flatten_items(orden, items_flat):
+def flatten_items(orden, items_flat, codigos_mongo):
+    """
+    Aplana los items de una orden con los mismos campos que
+    extract.mongo.pipeline_orden_items; codigos_mongo: {producto _id: codigo_mongo}.
+    """
     id_orden = str(orden.get("_id"))  # ObjectId → string
     cliente_id = str(orden.get("cliente_id"))  # ObjectId → string
     fecha_orden = orden.get("fecha")
@@ -296,7 +93,6 @@ def flatten_items(orden, items_flat):
     moneda = orden.get("moneda")
     total = orden.get("total")
     items = orden.get("items", [])
-    metadatos = orden.get("metadatos", {})
 
     for i in items:  # estableciendo relación 1 a N de ordenes con items separados
         items_flat.append(
@@ -310,169 +106,157 @@ def flatten_items(orden, items_flat):
                 "producto_id": str(i.get("producto_id")),  # ObjectId → string
                 "cantidad": i.get("cantidad"),
                 "precio_unitario": i.get("precio_unit"),
-                "metadatos": metadatos,
+                "codigo_mongo": codigos_mongo.get(i.get("producto_id")),
             }
         )
 
 
-def insert_orden_items_stg(items_flat, clientes_count, productos_count):
+def insert_orden_items_stg(
+    writer, items_chunks, total_items, clientes_count, productos_count
+):
     """Insert order items with progress display.
-    OPTIMIZED: Pre-loads product codes and uses single connection with batch commits."""
-    total_items = len(items_flat)
+    items_chunks: bloques de items aplanados (flatten_items o
+    pipeline_orden_items), cada uno con su codigo_mongo ya resuelto;
+    total_items es None cuando no se conoce (streaming).
+    Rows are queued on the StagingWriter (bulk writes)."""
+    total_str = f"/{total_items}" if total_items is not None else ""
     procesados = 0
     errores = 0
     BATCH_SIZE = 500
 
-    # Pre-load all product codes from MongoDB (much faster than individual queries)
-    product_ids = list(
-        set(i.get("producto_id") for i in items_flat if i.get("producto_id"))
-    )
-    productos_map = {}
-    try:
-        for prod in products_collection.find(
-            {"_id": {"$in": [ObjectId(pid) for pid in product_ids]}},
-            {"codigo_mongo": 1},
-        ):
-            productos_map[str(prod["_id"])] = prod.get("codigo_mongo")
-    except Exception:
-        pass  # Will fall back to individual lookups if needed
-
-    with engine.connect() as conn:
-        for i in items_flat:
-            # Validar y convertir fecha
-            fecha_raw = i.get("fecha")
-            if fecha_raw and hasattr(fecha_raw, "date"):
-                fecha_dt = fecha_raw.date()
-            else:
-                errores += 1
-                continue
+    for i in (item for chunk in items_chunks for item in chunk):
+        # Validar y convertir fecha
+        fecha_raw = i.get("fecha")
+        if fecha_raw and hasattr(fecha_raw, "date"):
+            fecha_dt = fecha_raw.date()
+        else:
+            errores += 1
+            continue
 
-            # Validar cantidad
-            try:
-                cantidad_num = float(i.get("cantidad", 0))
-                if cantidad_num <= 0:
-                    errores += 1
-                    continue
-            except (ValueError, TypeError):
+        # Validar cantidad
+        try:
+            cantidad_num = float(i.get("cantidad", 0))
+            if cantidad_num <= 0:
                 errores += 1
                 continue
+        except (ValueError, TypeError):
+            errores += 1
+            continue
 
-            # Validar precio unitario y total
-            try:
-                precio_unit_num = float(i.get("precio_unitario", 0))
-                total_num = float(i.get("total_orden", 0))
-            except (ValueError, TypeError):
-                errores += 1
-                continue
+        # Validar precio unitario y total
+        try:
+            precio_unit_num = float(i.get("precio_unitario", 0))
+            total_num = float(i.get("total_orden", 0))
+        except (ValueError, TypeError):
+            errores += 1
+            continue
 
-            # Get codigo_mongo from pre-loaded map
-            producto_id = i.get("producto_id")
-            if not producto_id:
-                errores += 1
-                continue
+        producto_id = i.get("producto_id")
+        if not producto_id:
+            errores += 1
+            continue
 
-            codigo_mongo = productos_map.get(producto_id)
-            if not codigo_mongo:
-                errores += 1
-                continue
+        codigo_mongo = i.get("codigo_mongo")
+        if not codigo_mongo:
+            errores += 1
+            continue
 
-            conn.execute(
-                text(query_insert_orden_item_stg),
-                {
-                    "source_system": "mongo",
-                    "source_key_orden": i.get("orden_id"),
-                    "source_key_item": i.get("producto_id"),
-                    "source_code_prod": codigo_mongo,
-                    "cliente_key": i.get("cliente_id"),
-                    "fecha_raw": str(i.get("fecha")),
-                    "canal_raw": i.get("canal"),
-                    "moneda": i.get("moneda"),
-                    "cantidad_raw": str(i.get("cantidad")),
-                    "precio_unit_raw": str(i.get("precio_unitario")),
-                    "total_raw": str(i.get("total_orden")),
-                    "fecha_dt": fecha_dt,
-                    "cantidad_num": cantidad_num,
-                    "precio_unit_num": precio_unit_num,
-                    "total_num": total_num,
-                },
-            )
+        writer.add(
+            "orden_items",
+            {
+                "source_system": "mongo",
+                "source_key_orden": i.get("orden_id"),
+                "source_key_item": i.get("producto_id"),
+                "source_code_prod": codigo_mongo,
+                "cliente_key": i.get("cliente_id"),
+                "fecha_raw": str(i.get("fecha")),
+                "canal_raw": i.get("canal"),
+                "moneda": i.get("moneda"),
+                "cantidad_raw": str(i.get("cantidad")),
+                "precio_unit_raw": str(i.get("precio_unitario")),
+                "total_raw": str(i.get("total_orden")),
+                "fecha_dt": fecha_dt,
+                "cantidad_num": cantidad_num,
+                "precio_unit_num": precio_unit_num,
+                "total_num": total_num,
+            },
+        )
 
-            procesados += 1
-            if procesados % BATCH_SIZE == 0:
-                conn.commit()
-                print(
-                    f"\r    mongo: {clientes_count} clients | {productos_count} products | {procesados}/{total_items} items...",
-                    end="",
-                    flush=True,
-                )
+        procesados += 1
+        if procesados % BATCH_SIZE == 0:
+            print(
+                f"\r    mongo: {clientes_count} clients | {productos_count} products | {procesados}{total_str} items...",
+                end="",
+                flush=True,
+            )
 
-        conn.commit()  # Final commit
+    writer.flush("orden_items")
 
     return procesados, errores
 
 
-def insert_clientes_stg(clientes):
+def insert_clientes_stg(writer, clientes):
     """Insert clients with progress display.
-    OPTIMIZED: Uses single connection and batch commits."""
+    Rows are queued on the StagingWriter and written in bulk."""
     total_clientes = len(clientes)
     procesados = 0
     errores = 0
     BATCH_SIZE = 500
 
-    with engine.connect() as conn:
-        for cliente in clientes:
-            source_code = str(cliente.get("_id"))  # ObjectId → string
-
-            # Validar y convertir fecha de creación
-            fecha_creado_raw = cliente.get("creado")
-            if fecha_creado_raw:
-                if hasattr(fecha_creado_raw, "date"):
-                    fecha_creado_dt = fecha_creado_raw.date()
-                    fecha_creado_raw_str = str(fecha_creado_raw)
-                else:
-                    fecha_creado_dt = None
-                    fecha_creado_raw_str = str(fecha_creado_raw)
+    for cliente in clientes:
+        source_code = str(cliente.get("_id"))  # ObjectId → string
+
+        # Validar y convertir fecha de creación
+        fecha_creado_raw = cliente.get("creado")
+        if fecha_creado_raw:
+            if hasattr(fecha_creado_raw, "date"):
+                fecha_creado_dt = fecha_creado_raw.date()
+                fecha_creado_raw_str = str(fecha_creado_raw)
             else:
                 fecha_creado_dt = None
-                fecha_creado_raw_str = "1900-01-01"
-
-            # Validar género
-            genero_raw = cliente.get("genero")
-            if genero_raw == "Otro":
-                genero_nuevo = "No especificado"
-            elif genero_raw in ("Masculino", "Femenino"):
-                genero_nuevo = genero_raw
-            else:
-                genero_nuevo = "No especificado"
+                fecha_creado_raw_str = str(fecha_creado_raw)
+        else:
+            fecha_creado_dt = None
+            fecha_creado_raw_str = "1900-01-01"
+
+        # Validar género
+        genero_raw = cliente.get("genero")
+        if genero_raw == "Otro":
+            genero_nuevo = "No especificado"
+        elif genero_raw in ("Masculino", "Femenino"):
+            genero_nuevo = genero_raw
+        else:
+            genero_nuevo = "No especificado"
 
-            try:
-                conn.execute(
-                    text(query_insert_clientes_stg),
-                    {
-                        "source_system": "mongo",
-                        "source_code": source_code,
-                        "cliente_email": cliente.get("email"),
-                        "cliente_nombre": cliente.get("nombre", "Sin nombre"),
-                        "genero_raw": genero_raw if genero_raw else "No especificado",
-                        "pais_raw": cliente.get("pais", "CR"),
-                        "fecha_creado_raw": fecha_creado_raw_str,
-                        "fecha_creado_dt": fecha_creado_dt,
-                        "genero_norm": genero_nuevo,
-                    },
+        try:
+            writer.add(
+                "clientes",
+                {
+                    "source_system": "mongo",
+                    "source_code": source_code,
+                    "cliente_email": cliente.get("email"),
+                    "cliente_nombre": cliente.get("nombre", "Sin nombre"),
+                    "genero_raw": genero_raw if genero_raw else "No especificado",
+                    "pais_raw": cliente.get("pais", "CR"),
+                    "fecha_creado_raw": fecha_creado_raw_str,
+                    "fecha_creado_dt": fecha_creado_dt,
+                    "genero_norm": genero_nuevo,
+                },
+            )
+            procesados += 1
+            if procesados % BATCH_SIZE == 0:
+                print(
+                    f"\r    mongo: {procesados}/{total_clientes} clients...",
+                    end="",
+                    flush=True,
                 )
-                procesados += 1
-                if procesados % BATCH_SIZE == 0:
-                    conn.commit()
-                    print(
-                        f"\r    mongo: {procesados}/{total_clientes} clients...",
-                        end="",
-                        flush=True,
-                    )
-            except Exception:
-                errores += 1
-                continue
+        except Exception:
+            errores += 1
+            continue
 
-        conn.commit()  # Final commit
+    writer.flush("clientes")
+    procesados -= writer.errors("clientes")
+    errores += writer.errors("clientes")
 
     return procesados, errores
 
@@ -482,62 +266,124 @@ def insert_clientes_stg(clientes):
     ----------------------------------------------------------------------- """
 
 
-def transform_mongo(productos, clientes, ordenes, eq_map: "EquivalenceMap" = None):
+def transform_mongo(
+    productos,
+    clientes,
+    ordenes,
+    eq_map: "EquivalenceMap" = None,
+    map_index: MapProductoIndex = None,
+):
     """
     Transforma y carga datos de MongoDB a staging.
 
+    Versión con documentos completos: aplana los items en Python y toma el
+    codigo_mongo de los productos ya extraídos.
+
     Args:
         productos: Lista de productos extraídos
         clientes: Lista de clientes extraídos
         ordenes: Lista de órdenes extraídas
         eq_map: Mapa de equivalencias de productos (construido previamente)
+        map_index: Índice de stg.map_producto compartido por todas las fuentes
     """
-    total_productos = len(productos)
-
-    # 1. Process clients
-    clientes_procesados, clientes_errores = insert_clientes_stg(clientes)
-
-    # 2. Process products - using equivalence map for SKU resolution
-    productos_procesados = 0
-    productos_errores = 0
-    for producto in productos:
-        try:
-            codigo_original = producto.get("codigo_mongo")
-            sku_nueva = producto.get("equivalencias", {}).get("sku")
-            nombre = producto.get("nombre")
-            categoria = producto.get("categoria")
-
-            insert_map_producto(codigo_original, sku_nueva, nombre, categoria, eq_map)
-            productos_procesados += 1
-        except Exception:
-            productos_errores += 1
-            continue
-
-        if (productos_procesados + productos_errores) % 50 == 0 or (
-            productos_procesados + productos_errores
-        ) == total_productos:
-            print(
-                f"\r    mongo: {clientes_procesados} clients | {productos_procesados}/{total_productos} products...",
-                end="",
-                flush=True,
-            )
-
-    # 3. Flatten items from orders
+    codigos_mongo = {p.get("_id"): p.get("codigo_mongo") for p in productos}
     items_flat = []
     for orden in ordenes:
         try:
-            flatten_items(orden, items_flat)
+            flatten_items(orden, items_flat, codigos_mongo)
         except Exception:
             continue
 
-    # 4. Load order items to staging
-    items_procesados, items_errores = insert_orden_items_stg(
-        items_flat, clientes_procesados, productos_procesados
+    _transform_mongo(
+        productos, clientes, [items_flat], len(items_flat), eq_map, map_index
     )
 
+
+def transform_mongo_stream(
+    productos,
+    clientes,
+    orden_items,
+    eq_map: "EquivalenceMap" = None,
+    map_index: MapProductoIndex = None,
+):
+    """
+    Igual que transform_mongo, pero los items llegan ya aplanados por el
+    servidor, por bloques, y se escriben a staging a medida que se leen.
+
+    Args:
+        productos: Lista de productos extraídos
+        clientes: Lista de clientes extraídos
+        orden_items: Bloques de pipeline_orden_items (StreamedAggregation de
+            extract_mongo(stream=True))
+        eq_map: Mapa de equivalencias de productos (construido previamente)
+        map_index: Índice de stg.map_producto compartido por todas las fuentes
+    """
+    _transform_mongo(productos, clientes, orden_items, None, eq_map, map_index)
+
+
+def _transform_mongo(productos, clientes, items_chunks, total_items, eq_map, map_index):
+    total_productos = len(productos)
+
+    if map_index is None:
+        map_index = MapProductoIndex.load(engine)
+
+    with engine.connect() as conn, StagingWriter(conn, map_index=map_index) as writer:
+        # 1. Process clients
+        clientes_procesados, clientes_errores = insert_clientes_stg(writer, clientes)
+
+        # 2. Process products - using equivalence map for SKU resolution
+        productos_procesados = 0
+        productos_errores = 0
+        for producto in productos:
+            try:
+                codigo_original = producto.get("codigo_mongo")
+                sku_nueva = producto.get("equivalencias", {}).get("sku")
+                nombre = producto.get("nombre")
+                categoria = producto.get("categoria")
+
+                insert_map_producto(
+                    codigo_original,
+                    sku_nueva,
+                    nombre,
+                    categoria,
+                    eq_map,
+                    writer,
+                    map_index,
+                )
+                productos_procesados += 1
+            except Exception:
+                productos_errores += 1
+                continue
+
+            if (productos_procesados + productos_errores) % 50 == 0 or (
+                productos_procesados + productos_errores
+            ) == total_productos:
+                print(
+                    f"\r    mongo: {clientes_procesados} clients | {productos_procesados}/{total_productos} products...",
+                    end="",
+                    flush=True,
+                )
+        writer.flush("map_producto")
+        productos_procesados -= writer.errors("map_producto")
+        productos_errores += writer.errors("map_producto")
+
+        # 3. Load order items to staging
+        items_procesados, items_errores = insert_orden_items_stg(
+            writer,
+            items_chunks,
+            total_items,
+            clientes_procesados,
+            productos_procesados,
+        )
+
+    # Rows rejected by the database are reported by the writer
+    items_procesados -= writer.errors("orden_items")
+    items_errores += writer.errors("orden_items")
+
     # Final line
     output = f"\r    mongo: {clientes_procesados} clients | {productos_procesados} products | {items_procesados} items"
     total_errores = clientes_errores + productos_errores + items_errores
     if total_errores > 0:
         output += f" | {total_errores} errors"
     print(output + " " * 20)  # Extra spaces to clear progress indicators
+    print(writer.format_stats("mongo"))
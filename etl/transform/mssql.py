@@ -20,6 +20,8 @@ from typing import TYPE_CHECKING
 from sqlalchemy import text
 
 from configs.connections import get_dw_engine
+from map_producto_index import MapProductoIndex
+from transform.staging import StagingWriter
 
 if TYPE_CHECKING:
     from equivalences import EquivalenceMap
@@ -353,11 +355,19 @@ def _prepare_orden_item_params(orden, detalle):
 
 
 def transform_mssql(
-    clientes, productos, ordenes, orden_detalles, eq_map: "EquivalenceMap" = None
+    clientes,
+    productos,
+    ordenes,
+    orden_detalles,
+    eq_map: "EquivalenceMap" = None,
+    map_index: MapProductoIndex = None,
 ):
     """
     Transforma y carga los datos de MS SQL Server en las tablas de staging.
-    OPTIMIZED: Uses single connection and batch commits for 10x+ speed improvement.
+    Las filas se escriben por lotes con StagingWriter (un MERGE set-based por lote).
+
+    Versión con listas completas: cruza cada detalle con su orden y usa el
+    mismo recorrido por bloques que transform_mssql_stream.
 
     Args:
         clientes: Lista de clientes extraídos
@@ -365,61 +375,108 @@ def transform_mssql(
         ordenes: Lista de órdenes extraídas
         orden_detalles: Lista de detalles de órdenes extraídos
         eq_map: Mapa de equivalencias de productos (construido previamente)
+        map_index: Índice de stg.map_producto; los productos cargados se registran
+            en él para que las fuentes siguientes los vean sin consultar la tabla
+
+    Returns:
+        int: Filas que no llegaron a staging (errores y detalles sin orden);
+            0 si la ventana de extracción quedó completa
     """
-    total_items = len(orden_detalles)
-    BATCH_SIZE = 500  # Commit every N records
+    ordenes_dict = {orden.OrdenId: orden for orden in ordenes}
+    pares = ((ordenes_dict.get(detalle.OrdenId), detalle) for detalle in orden_detalles)
+    return _transform_mssql(
+        clientes, productos, [pares], len(orden_detalles), eq_map, map_index
+    )
 
-    # Use single connection for entire transform
-    with engine.connect() as conn:
+
+def transform_mssql_stream(
+    clientes,
+    productos,
+    orden_items,
+    eq_map: "EquivalenceMap" = None,
+    map_index: MapProductoIndex = None,
+):
+    """
+    Igual que transform_mssql, pero los items llegan por bloques y se escriben
+    a staging a medida que se leen.
+
+    Args:
+        clientes: Lista de clientes extraídos
+        productos: Lista de productos extraídos
+        orden_items: Bloques de filas de query_orden_items (StreamedQuery de
+            extract_mssql(stream=True)); cada fila trae el detalle y su orden
+        eq_map: Mapa de equivalencias de productos (construido previamente)
+        map_index: Índice de stg.map_producto compartido por todas las fuentes
+
+    Returns:
+        int: Igual que transform_mssql
+    """
+    pares = ([(row, row) for row in chunk] for chunk in orden_items)
+    return _transform_mssql(clientes, productos, pares, None, eq_map, map_index)
+
+
+def _transform_mssql(clientes, productos, pares, total_items, eq_map, map_index):
+    """
+    pares: bloques de tuplas (orden, detalle); orden es None si el detalle no
+    tiene orden. total_items es None cuando no se conoce (streaming).
+    Devuelve las filas que no llegaron a staging.
+    """
+    BATCH_SIZE = 500  # Progress update every N records
+    total_str = f"/{total_items}" if total_items is not None else ""
+
+    # Use single connection for entire transform; rows are written in bulk
+    with engine.connect() as conn, StagingWriter(conn, map_index=map_index) as writer:
         # 1. Process clients (batch)
         for i, cliente in enumerate(clientes):
-            params = _prepare_cliente_params(cliente)
-            conn.execute(text(query_insert_clientes_stg), params)
+            writer.add("clientes", _prepare_cliente_params(cliente))
             if (i + 1) % BATCH_SIZE == 0:
-                conn.commit()
                 print(
                     f"\r    mssql: {i + 1}/{len(clientes)} clients...",
                     end="",
                     flush=True,
                 )
-        conn.commit()
+        writer.flush("clientes")
 
         # 2. Process products (batch) - using equivalence map for SKU resolution
         productos_dict = {}
         for i, producto in enumerate(productos):
-            params = _prepare_producto_params(producto, eq_map)
-            conn.execute(text(query_insert_map_producto), params)
+            writer.add("map_producto", _prepare_producto_params(producto, eq_map))
             productos_dict[producto.ProductoId] = producto.SKU
             if (i + 1) % BATCH_SIZE == 0:
-                conn.commit()
                 print(
                     f"\r    mssql: {len(clientes)} clients | {i + 1}/{len(productos)} products...",
                     end="",
                     flush=True,
                 )
-        conn.commit()
+        writer.flush("map_producto")
 
-        # 3. Process order items (batch)
-        ordenes_dict = {orden.OrdenId: orden for orden in ordenes}
+        # 3. Process order items (batch), chunk by chunk
         items_procesados = 0
-
-        for detalle in orden_detalles:
-            orden = ordenes_dict.get(detalle.OrdenId)
-            if orden:
-                params = _prepare_orden_item_params(orden, detalle)
-                conn.execute(text(query_insert_orden_item_stg), params)
+        sin_orden = 0
+
+        for chunk in pares:
+            for orden, detalle in chunk:
+                if orden is None:
+                    sin_orden += 1
+                    continue
+                writer.add("orden_items", _prepare_orden_item_params(orden, detalle))
                 items_procesados += 1
                 if items_procesados % BATCH_SIZE == 0:
-                    conn.commit()
                     print(
-                        f"\r    mssql: {len(clientes)} clients | {len(productos)} products | {items_procesados}/{total_items} items...",
+                        f"\r    mssql: {len(clientes)} clients | {len(productos)} products | {items_procesados}{total_str} items...",
                         end="",
                         flush=True,
                     )
-        conn.commit()
+
+    # Rows rejected by the database are reported by the writer
+    items_procesados -= writer.errors("orden_items")
+    errores = sum(s.errors for s in writer.stats.values()) + sin_orden
 
     # Final line
-    print(
-        f"\r    mssql: {len(clientes)} clients | {len(productos)} products | {items_procesados} items"
-        + " " * 20
-    )
+    output = f"\r    mssql: {len(clientes)} clients | {len(productos)} products | {items_procesados} items"
+    if errores > 0:
+        output += f" | {errores} errors"
+    print(output + " " * 20)
+    print(writer.format_stats("mssql"))
+
+    return errores
@@ -13,208 +13,23 @@ Heterogeneidades de MySQL:
 NOTA: Se utilizan sentencias MERGE para garantizar idempotencia del ETL.
       Si se ejecuta varias veces, no duplicará datos.
 
-SKU Resolution: Uses the equivalence map built from all sources.
+SKU Resolution: Uses the equivalence map built from all sources, with the
+in-memory MapProductoIndex (stg.map_producto) as fallback.
 """
 
 from datetime import datetime
 import re
-from typing import TYPE_CHECKING
-
-from sqlalchemy import text
+from typing import TYPE_CHECKING, Optional
 
 from configs.connections import get_dw_engine
+from map_producto_index import MapProductoIndex
+from transform.staging import StagingWriter
 
 if TYPE_CHECKING:
     from equivalences import EquivalenceMap
 
 engine = get_dw_engine()
 
-# Query to find SKU from map_producto by source_code (for mysql source)
-query_find_sku_by_source_code = """
-    SELECT TOP 1 sku_oficial
-    FROM stg.map_producto
-    WHERE source_system = :source_system AND source_code = :source_code
-"""
-
-# Query to find SKU by name and category (case-insensitive, priority to mssql)
-query_find_sku_by_name_category = """
-    SELECT TOP 1 sku_oficial
-    FROM stg.map_producto
-    WHERE LOWER(nombre_norm) = LOWER(:nombre_norm)
-      AND LOWER(categoria_norm) = LOWER(:categoria_norm)
-      AND sku_oficial IS NOT NULL
-      AND sku_oficial != ''
-    ORDER BY
-        CASE source_system
-            WHEN 'mssql' THEN 1
-            WHEN 'supabase' THEN 2
-            ELSE 3
-        END,
-        map_id DESC
-"""
-
-
-def find_sku_from_map_producto(source_code: str) -> str | None:
-    """
-    Find SKU from map_producto table by source_code.
-    Used as first attempt before falling back to name+category match.
-    """
-    with engine.connect() as conn:
-        result = conn.execute(
-            text(query_find_sku_by_source_code),
-            {"source_system": "mysql", "source_code": source_code},
-        )
-        row = result.fetchone()
-        if row:
-            return row[0]
-    return None
-
-
-def find_sku_by_name_category(nombre: str, categoria: str) -> str | None:
-    """
-    Find SKU from map_producto by matching name and category.
-    Prioritizes MSSQL (canonical source) and Supabase (uses SKU directly).
-    This is the fallback when no direct code mapping exists.
-    """
-    with engine.connect() as conn:
-        result = conn.execute(
-            text(query_find_sku_by_name_category),
-            {"nombre_norm": nombre, "categoria_norm": categoria},
-        )
-        row = result.fetchone()
-        if row:
-            return row[0]
-    return None
-
-
-# -----------------------------------------------------------------------
-#            Queries de SQL para transformación de datos de MySQL
-#            Usando MERGE para evitar duplicados (idempotente)
-# -----------------------------------------------------------------------
-
-query_insert_map_producto = """
-    MERGE INTO stg.map_producto AS target
-    USING (SELECT
-        :source_system AS source_system,
-        :source_code AS source_code,
-        :sku_oficial AS sku_oficial,
-        :nombre_norm AS nombre_norm,
-        :categoria_norm AS categoria_norm,
-        :es_servicio AS es_servicio
-    ) AS source
-    ON target.source_system = source.source_system
-        AND target.source_code = source.source_code
-    WHEN MATCHED THEN
-        UPDATE SET
-            sku_oficial = source.sku_oficial,
-            nombre_norm = source.nombre_norm,
-            categoria_norm = source.categoria_norm,
-            es_servicio = source.es_servicio
-    WHEN NOT MATCHED THEN
-        INSERT (source_system, source_code, sku_oficial, nombre_norm, categoria_norm, es_servicio)
-        VALUES (source.source_system, source.source_code, source.sku_oficial,
-                source.nombre_norm, source.categoria_norm, source.es_servicio);
-"""
-
-query_insert_clientes_stg = """
-    MERGE INTO stg.clientes AS target
-    USING (SELECT
-        :source_system AS source_system,
-        :source_code AS source_code,
-        :cliente_email AS cliente_email,
-        :cliente_nombre AS cliente_nombre,
-        :genero_raw AS genero_raw,
-        :pais_raw AS pais_raw,
-        :fecha_creado_raw AS fecha_creado_raw,
-        :fecha_creado_dt AS fecha_creado_dt,
-        :genero_norm AS genero_norm
-    ) AS source
-    ON target.source_system = source.source_system
-        AND target.source_code = source.source_code
-    WHEN MATCHED THEN
-        UPDATE SET
-            cliente_email = COALESCE(source.cliente_email, target.cliente_email),
-            cliente_nombre = COALESCE(source.cliente_nombre, target.cliente_nombre),
-            genero_raw = COALESCE(source.genero_raw, target.genero_raw),
-            pais_raw = COALESCE(source.pais_raw, target.pais_raw),
-            fecha_creado_raw = COALESCE(source.fecha_creado_raw, target.fecha_creado_raw),
-            fecha_creado_dt = COALESCE(source.fecha_creado_dt, target.fecha_creado_dt),
-            genero_norm = COALESCE(source.genero_norm, target.genero_norm)
-    WHEN NOT MATCHED THEN
-        INSERT (source_system, source_code, cliente_email, cliente_nombre, genero_raw,
-                pais_raw, fecha_creado_raw, fecha_creado_dt, genero_norm)
-        VALUES (source.source_system, source.source_code, source.cliente_email,
-                source.cliente_nombre, source.genero_raw, source.pais_raw,
-                COALESCE(source.fecha_creado_raw, '1900-01-01'),
-                source.fecha_creado_dt, source.genero_norm);
-"""
-
-query_insert_orden_item_stg = """
-    MERGE INTO stg.orden_items AS target
-    USING (SELECT
-        :source_system AS source_system,
-        :source_key_orden AS source_key_orden,
-        :source_key_item AS source_key_item,
-        :source_code_prod AS source_code_prod,
-        :cliente_key AS cliente_key,
-        :fecha_raw AS fecha_raw,
-        :canal_raw AS canal_raw,
-        :moneda AS moneda,
-        :cantidad_raw AS cantidad_raw,
-        :precio_unit_raw AS precio_unit_raw,
-        :total_raw AS total_raw,
-        :fecha_dt AS fecha_dt,
-        :cantidad_num AS cantidad_num,
-        :precio_unit_num AS precio_unit_num,
-        :total_num AS total_num
-    ) AS source
-    ON target.source_system = source.source_system
-        AND target.source_key_orden = source.source_key_orden
-        AND target.source_key_item = source.source_key_item
-    WHEN NOT MATCHED THEN
-        INSERT (source_system, source_key_orden, source_key_item, source_code_prod,
-                cliente_key, fecha_raw, canal_raw, moneda, cantidad_raw, precio_unit_raw,
-                total_raw, fecha_dt, cantidad_num, precio_unit_num, total_num)
-        VALUES (source.source_system, source.source_key_orden, source.source_key_item,
-                source.source_code_prod, source.cliente_key, source.fecha_raw, source.canal_raw,
-                source.moneda, source.cantidad_raw, source.precio_unit_raw, source.total_raw,
-                source.fecha_dt, source.cantidad_num, source.precio_unit_num, source.total_num);
-"""
-
-# Query para obtener el siguiente SKU disponible
-query_select_max_sku = """
-    SELECT 
-        'SKU-' +
-        RIGHT('0000' + CAST(
-            COALESCE(MAX(CAST(
-                CASE 
-                    WHEN SUBSTRING(sku_oficial, 4, 1) = '-' 
-                        THEN SUBSTRING(sku_oficial, 5, LEN(sku_oficial))  -- SKU-0001
-                    ELSE SUBSTRING(sku_oficial, 4, LEN(sku_oficial))      -- SKU0001
-                END
-            AS INT)), 0) + 1
-        AS VARCHAR(10)), 4) AS NextSKU
-    FROM stg.map_producto
-    WHERE sku_oficial LIKE 'SKU%';
-"""
-
-# Query para buscar SKU por codigo_alt
-query_find_sku_by_codigo_alt = """
-    SELECT TOP 1 sku_oficial 
-    FROM stg.map_producto 
-    WHERE source_system = 'mssql' 
-        AND source_code IN (
-            SELECT CAST(p.ProductoId AS NVARCHAR(128))
-            FROM DB_SALES.dbo.Producto p
-            WHERE p.SKU IN (
-                SELECT mp2.sku_oficial 
-                FROM stg.map_producto mp2 
-                WHERE mp2.source_system = 'mysql' 
-                    AND mp2.source_code = :codigo_alt
-            )
-        );
-"""
-
 # -----------------------------------------------------------------------
 #     Funciones auxiliares para limpieza de datos de MySQL
 # -----------------------------------------------------------------------
@@ -355,60 +170,29 @@ def parsear_monto(monto_str):
             return 0.0
 
 
-def get_next_sku():
-    """
-    Obtiene el siguiente SKU disponible de la secuencia.
-
-    Returns:
-        str: SKU en formato 'SKU-xxxx'
-    """
-    with engine.connect() as conn:
-        result = conn.execute(text(query_select_max_sku))
-        row = result.fetchone()
-        if row and row[0]:
-            return row[0]
-        return "SKU-0001"
-
-
 # -----------------------------------------------------------------------
 #     Funciones de preparación de datos para staging de MySQL
 # -----------------------------------------------------------------------
 
 
-def insert_map_producto(producto, sku_mapping):
-    """
-    Inserta un producto en la tabla stg.map_producto.
-    Para MySQL, el source_code es el codigo_alt.
-
-    Neo4j ya pobló las equivalencias en map_producto, así que primero
-    buscamos ahí. Si no existe, generamos un nuevo SKU.
-
-    Args:
-        producto: Row con datos del producto (id, codigo_alt, nombre, categoria)
-        sku_mapping: Dict para rastrear SKUs asignados (cache local)
-
-    Returns:
-        str: SKU asignado al producto
-    """
-    with engine.connect() as conn:
-        result = insert_map_producto_batch(conn, producto, sku_mapping)
-        conn.commit()
-    return result
-
-
 def insert_map_producto_batch(
-    conn, producto, sku_mapping, eq_map: "EquivalenceMap" = None
+    writer: StagingWriter,
+    producto,
+    sku_mapping,
+    eq_map: Optional["EquivalenceMap"],
+    map_index: MapProductoIndex,
 ):
     """
-    Batch version: Inserta un producto usando conexión existente (no commit).
+    Agrega el producto al lote de stg.map_producto del writer.
 
     Uses the equivalence map (built from ALL sources) to get the correct SKU.
 
     Args:
-        conn: Conexión activa de SQLAlchemy
+        writer: StagingWriter de la transformación en curso
         producto: Row con datos del producto
         sku_mapping: Dict para rastrear SKUs asignados (cache local)
         eq_map: Mapa de equivalencias de productos
+        map_index: Índice en memoria de stg.map_producto (fallback sin consultas)
 
     Returns:
         str: SKU asignado al producto
@@ -430,24 +214,20 @@ def insert_map_producto_batch(
 
         # Fallback: Try to find in map_producto (for previously registered products)
         if not sku_oficial:
-            sku_from_map = find_sku_from_map_producto(codigo_alt)
-            if sku_from_map:
-                sku_oficial = sku_from_map
+            sku_oficial = map_index.get_sku_by_source("mysql", codigo_alt)
 
-        # Last resort: Try by name+category in database
+        # Last resort: Try by name+category in map_producto
         if not sku_oficial:
-            sku_by_name = find_sku_by_name_category(nombre, categoria)
-            if sku_by_name:
-                sku_oficial = sku_by_name
+            sku_oficial = map_index.get_sku_by_name(nombre, categoria)
 
         # Generate new if nothing found
         if not sku_oficial:
-            sku_oficial = get_next_sku()
+            sku_oficial = map_index.next_sku()
 
         sku_mapping[codigo_alt] = sku_oficial
 
-    conn.execute(
-        text(query_insert_map_producto),
+    writer.add(
+        "map_producto",
         {
             "source_system": "mysql",
             "source_code": source_code,
@@ -461,100 +241,6 @@ def insert_map_producto_batch(
     return sku_oficial
 
 
-def insert_clientes_stg(cliente):
-    """
-    Inserta un cliente en la tabla stg.clientes aplicando normalización.
-
-    Args:
-        cliente: Row con datos del cliente (id, nombre, correo, genero, pais, created_at)
-    """
-    source_code = str(cliente.id)
-    genero_raw = cliente.genero
-
-    # Normalización de género (MySQL usa M/F/X)
-    genero_norm = normalizar_genero(genero_raw)
-
-    # Parsear fecha de creación (viene como VARCHAR en MySQL)
-    fecha_creado_raw = cliente.created_at
-    fecha_creado_dt = parsear_fecha(fecha_creado_raw)
-
-    with engine.connect() as conn:
-        conn.execute(
-            text(query_insert_clientes_stg),
-            {
-                "source_system": "mysql",
-                "source_code": source_code,
-                "cliente_email": cliente.correo,
-                "cliente_nombre": cliente.nombre,
-                "genero_raw": genero_raw,
-                "pais_raw": cliente.pais,
-                "fecha_creado_raw": str(fecha_creado_raw)
-                if fecha_creado_raw
-                else "1900-01-01",
-                "fecha_creado_dt": fecha_creado_dt,
-                "genero_norm": genero_norm,
-            },
-        )
-        conn.commit()
-
-
-def insert_orden_items_stg(orden, detalle, productos_dict):
-    """
-    Inserta un item de orden en la tabla stg.orden_items.
-
-    Args:
-        orden: Row con datos de la orden
-        detalle: Row con datos del detalle de orden
-        productos_dict: Diccionario {producto_id: codigo_alt} para mapeo rápido
-    """
-    # Obtener codigo_alt del producto
-    codigo_alt = productos_dict.get(detalle.producto_id, f"PROD-{detalle.producto_id}")
-
-    # Parsear fecha (viene como VARCHAR en MySQL)
-    fecha_raw = orden.fecha
-    fecha_dt = parsear_fecha(fecha_raw)
-
-    if fecha_dt is None:
-        # Si no se puede parsear la fecha, usar fecha por defecto
-        fecha_dt = datetime.now().date()
-
-    # Normalizar canal
-    canal_raw = normalizar_canal(orden.canal)
-
-    # Parsear montos (vienen como VARCHAR en MySQL)
-    cantidad_num = float(detalle.cantidad) if detalle.cantidad else 0.0
-    precio_unit_num = parsear_monto(detalle.precio_unit)
-
-    # Calcular total del item
-    total_item = cantidad_num * precio_unit_num
-
-    # La moneda puede ser USD o CRC
-    moneda = orden.moneda if orden.moneda else "USD"
-
-    with engine.connect() as conn:
-        conn.execute(
-            text(query_insert_orden_item_stg),
-            {
-                "source_system": "mysql",
-                "source_key_orden": str(orden.id),
-                "source_key_item": str(detalle.id),
-                "source_code_prod": codigo_alt,
-                "cliente_key": str(orden.cliente_id),
-                "fecha_raw": str(fecha_raw),
-                "canal_raw": canal_raw,
-                "moneda": moneda,
-                "cantidad_raw": str(detalle.cantidad),
-                "precio_unit_raw": str(detalle.precio_unit),
-                "total_raw": str(total_item),
-                "fecha_dt": fecha_dt,
-                "cantidad_num": cantidad_num,
-                "precio_unit_num": precio_unit_num,
-                "total_num": total_item,
-            },
-        )
-        conn.commit()
-
-
 # -----------------------------------------------------------------------
 #    BATCH helper functions for optimized processing
 # -----------------------------------------------------------------------
@@ -597,7 +283,9 @@ def _prepare_orden_item_params(orden, detalle, productos_dict):
 
     return {
         "source_system": "mysql",
-        "source_key_orden": str(orden.id),
+        # orden_id del detalle (= orden.id) para que una fila de
+        # query_orden_items sirva como orden y como detalle
+        "source_key_orden": str(detalle.orden_id),
         "source_key_item": str(detalle.id),
         "source_code_prod": codigo_alt,
         "cliente_key": str(orden.cliente_id),
@@ -620,11 +308,19 @@ def _prepare_orden_item_params(orden, detalle, productos_dict):
 
 
 def transform_mysql(
-    clientes, productos, ordenes, orden_detalles, eq_map: "EquivalenceMap" = None
+    clientes,
+    productos,
+    ordenes,
+    orden_detalles,
+    eq_map: "EquivalenceMap" = None,
+    map_index: MapProductoIndex = None,
 ):
     """
     Transforma y carga los datos de MySQL en las tablas de staging.
-    OPTIMIZED: Uses single connection and batch commits for 10x+ speed improvement.
+    Las filas se escriben por lotes con StagingWriter (un MERGE set-based por lote).
+
+    Versión con listas completas: cruza cada detalle con su orden y usa el
+    mismo recorrido por bloques que transform_mysql_stream.
 
     Args:
         clientes: Lista de clientes extraídos
@@ -632,67 +328,122 @@ def transform_mysql(
         ordenes: Lista de órdenes extraídas
         orden_detalles: Lista de detalles de órdenes extraídos
         eq_map: Mapa de equivalencias de productos (construido previamente)
+        map_index: Índice de stg.map_producto compartido por todas las fuentes
+
+    Returns:
+        int: Filas que no llegaron a staging (errores y detalles sin orden);
+            0 si la ventana de extracción quedó completa
+    """
+    ordenes_dict = {orden.id: orden for orden in ordenes}
+    pares = (
+        (ordenes_dict.get(detalle.orden_id), detalle) for detalle in orden_detalles
+    )
+    return _transform_mysql(
+        clientes, productos, [pares], len(orden_detalles), eq_map, map_index
+    )
+
+
+def transform_mysql_stream(
+    clientes,
+    productos,
+    orden_items,
+    eq_map: "EquivalenceMap" = None,
+    map_index: MapProductoIndex = None,
+):
+    """
+    Igual que transform_mysql, pero los items llegan por bloques y se escriben
+    a staging a medida que se leen.
+
+    Args:
+        clientes: Lista de clientes extraídos
+        productos: Lista de productos extraídos
+        orden_items: Bloques de filas de query_orden_items (StreamedQuery de
+            extract_mysql(stream=True)); cada fila trae el detalle y su orden
+        eq_map: Mapa de equivalencias de productos (construido previamente)
+        map_index: Índice de stg.map_producto compartido por todas las fuentes
+
+    Returns:
+        int: Igual que transform_mysql
     """
-    total_items = len(orden_detalles)
-    BATCH_SIZE = 500
+    pares = ([(row, row) for row in chunk] for chunk in orden_items)
+    return _transform_mysql(clientes, productos, pares, None, eq_map, map_index)
+
+
+def _transform_mysql(clientes, productos, pares, total_items, eq_map, map_index):
+    """
+    pares: bloques de tuplas (orden, detalle); orden es None si el detalle no
+    tiene orden. total_items es None cuando no se conoce (streaming).
+    Devuelve las filas que no llegaron a staging.
+    """
+    BATCH_SIZE = 500  # Progress update every N records
+    total_str = f"/{total_items}" if total_items is not None else ""
 
     # Dictionary to track assigned SKUs
     sku_mapping = {}
 
-    # Use single connection for entire transform
-    with engine.connect() as conn:
+    if map_index is None:
+        map_index = MapProductoIndex.load(engine)
+
+    # Use single connection for entire transform; rows are written in bulk
+    with engine.connect() as conn, StagingWriter(conn, map_index=map_index) as writer:
         # 1. Process clients (batch)
         for i, cliente in enumerate(clientes):
-            params = _prepare_cliente_params(cliente)
-            conn.execute(text(query_insert_clientes_stg), params)
+            writer.add("clientes", _prepare_cliente_params(cliente))
             if (i + 1) % BATCH_SIZE == 0:
-                conn.commit()
                 print(
                     f"\r    mysql: {i + 1}/{len(clientes)} clients...",
                     end="",
                     flush=True,
                 )
-        conn.commit()
+        writer.flush("clientes")
 
         # 2. Process products (batch) - using equivalence map for SKU resolution
         productos_dict = {}
         for i, producto in enumerate(productos):
-            insert_map_producto_batch(conn, producto, sku_mapping, eq_map)
+            insert_map_producto_batch(writer, producto, sku_mapping, eq_map, map_index)
             productos_dict[producto.id] = producto.codigo_alt
             if (i + 1) % BATCH_SIZE == 0:
-                conn.commit()
                 print(
                     f"\r    mysql: {len(clientes)} clients | {i + 1}/{len(productos)} products...",
                     end="",
                     flush=True,
                 )
-        conn.commit()
+        writer.flush("map_producto")
 
-        # 3. Process order items (batch)
-        ordenes_dict = {orden.id: orden for orden in ordenes}
+        # 3. Process order items (batch), chunk by chunk
         items_procesados = 0
         errores = 0
+        sin_orden = 0
 
-        for detalle in orden_detalles:
-            orden = ordenes_dict.get(detalle.orden_id)
-            if orden:
+        for chunk in pares:
+            for orden, detalle in chunk:
+                if orden is None:
+                    sin_orden += 1
+                    continue
                 try:
                     params = _prepare_orden_item_params(orden, detalle, productos_dict)
-                    conn.execute(text(query_insert_orden_item_stg), params)
-                    items_procesados += 1
-                    if items_procesados % BATCH_SIZE == 0:
-                        conn.commit()
-                        print(
-                            f"\r    mysql: {len(clientes)} clients | {len(productos)} products | {items_procesados}/{total_items} items...",
-                            end="",
-                            flush=True,
-                        )
                 except Exception:
                     errores += 1
-        conn.commit()
+                    continue
+                writer.add("orden_items", params)
+                items_procesados += 1
+                if items_procesados % BATCH_SIZE == 0:
+                    print(
+                        f"\r    mysql: {len(clientes)} clients | {len(productos)} products | {items_procesados}{total_str} items...",
+                        end="",
+                        flush=True,
+                    )
+
+    # Rows rejected by the database are reported by the writer
+    items_procesados -= writer.errors("orden_items")
+    errores += sum(s.errors for s in writer.stats.values())
+    errores += sin_orden
 
     # Final line
     output = f"\r    mysql: {len(clientes)} clients | {len(productos)} products | {items_procesados} items"
     if errores > 0:
         output += f" | {errores} errors"
     print(output + " " * 20)
+    print(writer.format_stats("mysql"))
+
+    return errores
@@ -1,9 +1,11 @@
 import pandas as pd
 import pycountry
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from sqlalchemy import text
 from configs.connections import get_dw_engine, get_neo4j_driver
+from map_producto_index import MapProductoIndex
+from transform.staging import StagingWriter
 from datetime import datetime
 
 if TYPE_CHECKING:
@@ -12,216 +14,11 @@ if TYPE_CHECKING:
 engine = get_dw_engine()
 driver = get_neo4j_driver()
 
-""" -----------------------------------------------------------------------
-            Queries de SQL para transformación de datos de Neo4j
-    ----------------------------------------------------------------------- """
-
-query_insert_map_producto = """
-    MERGE INTO stg.map_producto AS target
-    USING (SELECT
-        :source_system AS source_system,
-        :source_code AS source_code,
-        :sku_oficial AS sku_oficial,
-        :nombre_norm AS nombre_norm,
-        :categoria_norm AS categoria_norm,
-        :es_servicio AS es_servicio
-    ) AS source
-    ON target.source_system = source.source_system
-        AND target.source_code = source.source_code
-    WHEN MATCHED THEN
-        UPDATE SET
-            sku_oficial = source.sku_oficial,
-            nombre_norm = source.nombre_norm,
-            categoria_norm = source.categoria_norm,
-            es_servicio = source.es_servicio
-    WHEN NOT MATCHED THEN
-        INSERT (source_system, source_code, sku_oficial, nombre_norm, categoria_norm, es_servicio)
-        VALUES (source.source_system, source.source_code, source.sku_oficial,
-                source.nombre_norm, source.categoria_norm, source.es_servicio);
-"""
-
-# Para obtener el ultimo sku
-query_select_map_producto_sku = """
-    SELECT 
-        'SKU' +
-        RIGHT(
-            '0000' + CAST(
-                MAX(
-                    CAST(
-                        CASE 
-                            WHEN SUBSTRING(sku_oficial, 4, 1) = '-' 
-                                THEN SUBSTRING(sku_oficial, 5, LEN(sku_oficial))  -- SKU-0001
-                            ELSE SUBSTRING(sku_oficial, 4, LEN(sku_oficial))      -- SKU0001
-                        END
-                    AS INT)
-                ) 
-            AS VARCHAR(10)
-        ), 4
-    ) AS UltimoSKU
-    FROM stg.map_producto;
-"""
-
-# Query to find SKU by name and category (case-insensitive, priority to mssql)
-query_select_map_producto_sku_exist = """
-    SELECT TOP 1
-        sku_oficial AS SKU
-    FROM
-        stg.map_producto AS target
-    WHERE
-        LOWER(target.nombre_norm) = LOWER(:nombre_norm)
-        AND LOWER(target.categoria_norm) = LOWER(:categoria_norm)
-        AND target.sku_oficial IS NOT NULL
-        AND target.sku_oficial != ''
-    ORDER BY
-        CASE target.source_system
-            WHEN 'mssql' THEN 1
-            WHEN 'supabase' THEN 2
-            ELSE 3
-        END,
-        target.map_id DESC;
-"""
-
-# Query to verify if a SKU already exists in map_producto
-query_find_sku_exists = """
-    SELECT TOP 1 sku_oficial
-    FROM stg.map_producto
-    WHERE sku_oficial = :sku
-      AND sku_oficial IS NOT NULL
-      AND sku_oficial != ''
-"""
-
-query_insert_orden_item_stg = """
-    MERGE INTO stg.orden_items AS target
-    USING (SELECT
-        :source_system AS source_system,
-        :source_key_orden AS source_key_orden,
-        :source_key_item AS source_key_item,
-        :source_code_prod AS source_code_prod,
-        :cliente_key AS cliente_key,
-        :fecha_raw AS fecha_raw,
-        :canal_raw AS canal_raw,
-        :moneda AS moneda,
-        :cantidad_raw AS cantidad_raw,
-        :precio_unit_raw AS precio_unit_raw,
-        :total_raw AS total_raw,
-        :fecha_dt AS fecha_dt,
-        :cantidad_num AS cantidad_num,
-        :precio_unit_num AS precio_unit_num,
-        :total_num AS total_num
-    ) AS source
-    ON target.source_system = source.source_system
-        AND target.source_key_orden = source.source_key_orden
-        AND target.source_key_item = source.source_key_item
-    WHEN NOT MATCHED THEN
-        INSERT (source_system, source_key_orden, source_key_item, source_code_prod,
-                cliente_key, fecha_raw, canal_raw, moneda, cantidad_raw, precio_unit_raw,
-                total_raw, fecha_dt, cantidad_num, precio_unit_num, total_num)
-        VALUES (source.source_system, source.source_key_orden, source.source_key_item,
-                source.source_code_prod, source.cliente_key, source.fecha_raw, source.canal_raw,
-                source.moneda, source.cantidad_raw, source.precio_unit_raw, source.total_raw,
-                source.fecha_dt, source.cantidad_num, source.precio_unit_num, source.total_num);
-"""
-
-query_insert_clientes_stg = """
-    MERGE INTO stg.clientes AS target
-    USING (SELECT
-        :source_system AS source_system,
-        :source_code AS source_code,
-        :cliente_email AS cliente_email,
-        :cliente_nombre AS cliente_nombre,
-        :genero_raw AS genero_raw,
-        :pais_raw AS pais_raw,
-        :fecha_creado_raw AS fecha_creado_raw,
-        :fecha_creado_dt AS fecha_creado_dt,
-        :genero_norm AS genero_norm
-    ) AS source
-    ON target.source_system = source.source_system
-        AND target.source_code = source.source_code
-    WHEN MATCHED THEN
-        UPDATE SET
-            cliente_email = COALESCE(source.cliente_email, target.cliente_email),
-            cliente_nombre = COALESCE(source.cliente_nombre, target.cliente_nombre),
-            genero_raw = COALESCE(source.genero_raw, target.genero_raw),
-            pais_raw = COALESCE(source.pais_raw, target.pais_raw),
-            fecha_creado_raw = COALESCE(source.fecha_creado_raw, target.fecha_creado_raw),
-            fecha_creado_dt = COALESCE(source.fecha_creado_dt, target.fecha_creado_dt),
-            genero_norm = COALESCE(source.genero_norm, target.genero_norm)
-    WHEN NOT MATCHED THEN
-        INSERT (source_system, source_code, cliente_email, cliente_nombre, genero_raw,
-                pais_raw, fecha_creado_raw, fecha_creado_dt, genero_norm)
-        VALUES (source.source_system, source.source_code, source.cliente_email,
-                source.cliente_nombre, source.genero_raw, source.pais_raw,
-                COALESCE(source.fecha_creado_raw, '1900-01-01'),
-                source.fecha_creado_dt, source.genero_norm);
-"""
-
 """ -----------------------------------------------------------------------
             Funciones de preparacion de datos para staging de Neo4j
     ----------------------------------------------------------------------- """
 
 
-def find_sku():
-    engine = get_dw_engine()
-    result = pd.read_sql(query_select_map_producto_sku, engine)
-
-    if result.empty:
-        return "SKU-0001"
-
-    colname = result.columns[0]
-    raw_sku = result[colname].iloc[0]
-
-    # Si viene vacío o NULL
-    if raw_sku is None or pd.isna(raw_sku) or raw_sku.strip() == "":
-        return "SKU-0001"
-
-    sku = raw_sku.strip()
-
-    # ----- Extraer parte numérica -----
-    # SKU0001  -> número empieza en 3
-    # SKU-0001 -> número empieza en 4
-    if sku.startswith("SKU-"):
-        parte_numerica = sku[4:]  # Desde después del guion
-    else:
-        parte_numerica = sku[3:]  # Desde después de "SKU"
-
-    try:
-        numero = int(parte_numerica)
-    except Exception:
-        raise ValueError(f"No se pudo extraer el número del SKU: '{sku}'")
-
-    # ----- Construir siguiente SKU -----
-    nuevo_num = numero + 1
-    nuevo_sku = f"SKU-{nuevo_num:04d}"
-
-    return nuevo_sku
-
-
-"""
-Busca un SKU existente en stg.map_producto que coincida por Nombre y Categoria.
-Devuelve el SKU oficial si existe; de lo contrario, devuelve string vacío "".
-"""
-
-
-def obtener_sku_existente(nombre_norm, categoria_norm):
-    try:
-        engine = get_dw_engine()
-
-        result = pd.read_sql(
-            query_select_map_producto_sku_exist,
-            engine,
-            params={"nombre_norm": nombre_norm, "categoria_norm": categoria_norm},
-        )
-
-        if result.empty:
-            return ""  # no hay coincidencia
-
-        sku = result["SKU"].iloc[0]
-        return sku
-
-    except Exception:
-        return ""  # fallback seguro
-
-
 def validar_producto_en_stg(sku: str, nombre: str, categoria: str) -> bool:
     """
     Valida si un SKU existe en stg.map_producto y si coinciden Nombre y Categoria.
@@ -260,48 +57,13 @@ def validar_producto_en_stg(sku: str, nombre: str, categoria: str) -> bool:
         return False
 
 
-def insert_map_producto(codigo_original, sku_nueva, nombre, categoria):
-    """Insert map_producto entry for neo4j source."""
-    # SKU puede estar vacío, obtener uno existente si es así
-    if not sku_nueva:
-        sku_nueva = find_sku()
-    # Ensure source_code is never empty (must match source_code_prod in orden_items)
-    if not codigo_original:
-        codigo_original = "Sin código"
-
-    with engine.connect() as conn:
-        conn.execute(
-            text(query_insert_map_producto),
-            {
-                "source_system": "neo4j",
-                "source_code": codigo_original,
-                "sku_oficial": sku_nueva,
-                "nombre_norm": nombre,
-                "categoria_norm": categoria,
-                "es_servicio": False,
-            },
-        )
-
-        conn.commit()
-
-
-def verificar_sku_existe(sku: str) -> str | None:
-    """
-    Verify if a SKU already exists in map_producto.
-    Returns the SKU if found, None otherwise.
-    """
-    if not sku:
-        return None
-    with engine.connect() as conn:
-        result = conn.execute(text(query_find_sku_exists), {"sku": sku})
-        row = result.fetchone()
-        if row:
-            return row[0]
-    return None
-
-
 def insert_producto_neo4j(
-    producto: dict, nombre: str, categoria: str, eq_map: "EquivalenceMap" = None
+    producto: dict,
+    nombre: str,
+    categoria: str,
+    eq_map: Optional["EquivalenceMap"],
+    writer: StagingWriter,
+    map_index: MapProductoIndex,
 ):
     """
     Inserta un producto de Neo4j en map_producto.
@@ -313,6 +75,8 @@ def insert_producto_neo4j(
         nombre: Nombre del producto
         categoria: Categoría del producto
         eq_map: Mapa de equivalencias de productos
+        writer: StagingWriter de la transformación en curso
+        map_index: Índice en memoria de stg.map_producto del transform (fallback sin consultas)
 
     Returns:
         str: SKU oficial asignado
@@ -327,38 +91,31 @@ def insert_producto_neo4j(
     # Fallback: Si tiene SKU, verificar formato y existencia
     if not sku_oficial and sku:
         sku_norm = convertir_sku(sku)
-        existing = verificar_sku_existe(sku_norm)
-        if existing:
-            sku_oficial = existing
-        elif sku_norm.startswith("SKU-"):
+        if map_index.sku_exists(sku_norm) or sku_norm.startswith("SKU-"):
             sku_oficial = sku_norm
 
-    # Fallback: Buscar por nombre+categoria en DB
+    # Fallback: Buscar por nombre+categoria en map_producto
     if not sku_oficial:
-        sku_existente = obtener_sku_existente(nombre, categoria)
-        if sku_existente:
-            sku_oficial = sku_existente
+        sku_oficial = map_index.get_sku_by_name(nombre, categoria)
 
     # Last resort: generate new SKU
     if not sku_oficial:
-        sku_oficial = find_sku()
+        sku_oficial = map_index.next_sku()
 
     # Use SKU as source_code for Neo4j
     source_code = sku if sku else "Sin código"
 
-    with engine.connect() as conn:
-        conn.execute(
-            text(query_insert_map_producto),
-            {
-                "source_system": "neo4j",
-                "source_code": source_code,
-                "sku_oficial": sku_oficial,
-                "nombre_norm": nombre,
-                "categoria_norm": categoria,
-                "es_servicio": False,
-            },
-        )
-        conn.commit()
+    writer.add(
+        "map_producto",
+        {
+            "source_system": "neo4j",
+            "source_code": source_code,
+            "sku_oficial": sku_oficial,
+            "nombre_norm": nombre,
+            "categoria_norm": categoria,
+            "es_servicio": False,
+        },
+    )
 
     return sku_oficial
 
@@ -403,101 +160,99 @@ def unir_relaciones_por_orden(rel_realizo, rel_contiente):
     return resultado
 
 
-def insert_orden_items_stg(orden_completa, clientes_count, productos_count):
+def insert_orden_items_stg(writer, orden_completa, clientes_count, productos_count):
     """Insert order items with progress display.
-    OPTIMIZED: Uses single connection and batch commits."""
+    Rows are queued on the StagingWriter and written in bulk."""
     total_items = len(orden_completa)
     procesados = 0
     errores = 0
     BATCH_SIZE = 500
 
-    with engine.connect() as conn:
-        for i in orden_completa:
-            # ----------------------------------------------
-            # 1. Extraer datos del registro
-            # ----------------------------------------------
+    for i in orden_completa:
+        # ----------------------------------------------
+        # 1. Extraer datos del registro
+        # ----------------------------------------------
+        try:
+            cliente = i["cliente"]
+            orden = i["orden"]
+            producto = i["producto"]
+            detalle = i["detalle"]
+        except KeyError:
+            errores += 1
+            continue
+
+        # -----------------------------
+        # 2. Validar y convertir fecha
+        # -----------------------------
+        fecha_raw = orden.get("fecha")
+        if fecha_raw:
             try:
-                cliente = i["cliente"]
-                orden = i["orden"]
-                producto = i["producto"]
-                detalle = i["detalle"]
-            except KeyError:
+                fecha_native = fecha_raw.to_native()
+                fecha_dt = fecha_native.date()
+                fecha_str = fecha_raw.isoformat()
+            except Exception:
                 errores += 1
                 continue
+        else:
+            errores += 1
+            continue
 
-            # -----------------------------
-            # 2. Validar y convertir fecha
-            # -----------------------------
-            fecha_raw = orden.get("fecha")
-            if fecha_raw:
-                try:
-                    fecha_native = fecha_raw.to_native()
-                    fecha_dt = fecha_native.date()
-                    fecha_str = fecha_raw.isoformat()
-                except Exception:
-                    errores += 1
-                    continue
-            else:
+        # Validar cantidad
+        try:
+            cantidad_num = float(detalle.get("cantidad", 0))
+            if cantidad_num <= 0:
                 errores += 1
                 continue
+        except (ValueError, TypeError):
+            errores += 1
+            continue
 
-            # Validar cantidad
-            try:
-                cantidad_num = float(detalle.get("cantidad", 0))
-                if cantidad_num <= 0:
-                    errores += 1
-                    continue
-            except (ValueError, TypeError):
-                errores += 1
-                continue
+        # Validar precio unitario y total
+        try:
+            precio_unit_num = float(detalle.get("precio_unit", 0))
+            total_num = float(orden.get("total", 0))
+        except (ValueError, TypeError):
+            errores += 1
+            continue
 
-            # Validar precio unitario y total
-            try:
-                precio_unit_num = float(detalle.get("precio_unit", 0))
-                total_num = float(orden.get("total", 0))
-            except (ValueError, TypeError):
-                errores += 1
-                continue
+        # Mapeo de ProductoID para obtener sku
+        producto_id = producto.get("id")
+        sku = producto.get("sku")
 
-            # Mapeo de ProductoID para obtener sku
-            producto_id = producto.get("id")
-            sku = producto.get("sku")
+        if not producto_id or not sku:
+            errores += 1
+            continue
 
-            if not producto_id or not sku:
-                errores += 1
-                continue
+        writer.add(
+            "orden_items",
+            {
+                "source_system": "neo4j",
+                "source_key_orden": str(orden.get("id")),
+                "source_key_item": str(producto_id),
+                "source_code_prod": sku or "Sin código",
+                "cliente_key": str(cliente.get("id")),
+                "fecha_raw": fecha_str,
+                "canal_raw": orden.get("canal"),
+                "moneda": orden.get("moneda"),
+                "cantidad_raw": str(detalle.get("cantidad")),
+                "precio_unit_raw": str(detalle.get("precio_unit")),
+                "total_raw": str(orden.get("total")),
+                "fecha_dt": fecha_dt,
+                "cantidad_num": cantidad_num,
+                "precio_unit_num": precio_unit_num,
+                "total_num": total_num,
+            },
+        )
 
-            conn.execute(
-                text(query_insert_orden_item_stg),
-                {
-                    "source_system": "neo4j",
-                    "source_key_orden": str(orden.get("id")),
-                    "source_key_item": str(producto_id),
-                    "source_code_prod": sku or "Sin código",
-                    "cliente_key": str(cliente.get("id")),
-                    "fecha_raw": fecha_str,
-                    "canal_raw": orden.get("canal"),
-                    "moneda": orden.get("moneda"),
-                    "cantidad_raw": str(detalle.get("cantidad")),
-                    "precio_unit_raw": str(detalle.get("precio_unit")),
-                    "total_raw": str(orden.get("total")),
-                    "fecha_dt": fecha_dt,
-                    "cantidad_num": cantidad_num,
-                    "precio_unit_num": precio_unit_num,
-                    "total_num": total_num,
-                },
+        procesados += 1
+        if procesados % BATCH_SIZE == 0:
+            print(
+                f"\r    neo4j: {clientes_count} clients | {productos_count} products | {procesados}/{total_items} items...",
+                end="",
+                flush=True,
             )
 
-            procesados += 1
-            if procesados % BATCH_SIZE == 0:
-                conn.commit()
-                print(
-                    f"\r    neo4j: {clientes_count} clients | {productos_count} products | {procesados}/{total_items} items...",
-                    end="",
-                    flush=True,
-                )
-
-        conn.commit()  # Final commit
+    writer.flush("orden_items")
 
     return procesados, errores
 
@@ -526,73 +281,73 @@ def pais_a_codigo(pais_nombre):
     return ""
 
 
-def insert_clientes_stg(clientes):
+def insert_clientes_stg(writer, clientes):
     """Insert clients with progress display.
-    OPTIMIZED: Uses single connection and batch commits."""
+    Rows are queued on the StagingWriter and written in bulk."""
     total_clientes = len(clientes)
     procesados = 0
     errores = 0
     BATCH_SIZE = 500
 
-    with engine.connect() as conn:
-        for cliente in clientes:
-            source_code = str(cliente.get("id"))
-
-            # Neo4j nodes don't have creation date in the generated data.
-            # Use a fixed date within the order date range (mid-point of ~2 years of data)
-            # This ensures DimTiempo has this date for the FK relationship.
-            fecha_creado_dt = datetime(2024, 6, 1).date()
-            fecha_creado_raw_str = "2024-06-01"
-
-            # Validar género
-            genero_raw = cliente.get("genero")
-            if genero_raw == "M":
-                genero_nuevo = "Masculino"
-            elif genero_raw == "F":
-                genero_nuevo = "Femenino"
-            elif genero_raw == "Otro":
-                genero_nuevo = "No especificado"
-            elif genero_raw in ("Masculino", "Femenino"):
-                genero_nuevo = genero_raw
-            else:
-                genero_nuevo = "No especificado"
-
-            # Transformar nombre pais
-            pais_nombre = cliente.get("pais")
-            pais_codigo = pais_a_codigo(pais_nombre)
-            if pais_codigo != "":
-                pais = pais_codigo
-            else:
-                pais = pais_nombre
+    for cliente in clientes:
+        source_code = str(cliente.get("id"))
+
+        # Neo4j nodes don't have creation date in the generated data.
+        # Use a fixed date within the order date range (mid-point of ~2 years of data)
+        # This ensures DimTiempo has this date for the FK relationship.
+        fecha_creado_dt = datetime(2024, 6, 1).date()
+        fecha_creado_raw_str = "2024-06-01"
+
+        # Validar género
+        genero_raw = cliente.get("genero")
+        if genero_raw == "M":
+            genero_nuevo = "Masculino"
+        elif genero_raw == "F":
+            genero_nuevo = "Femenino"
+        elif genero_raw == "Otro":
+            genero_nuevo = "No especificado"
+        elif genero_raw in ("Masculino", "Femenino"):
+            genero_nuevo = genero_raw
+        else:
+            genero_nuevo = "No especificado"
+
+        # Transformar nombre pais
+        pais_nombre = cliente.get("pais")
+        pais_codigo = pais_a_codigo(pais_nombre)
+        if pais_codigo != "":
+            pais = pais_codigo
+        else:
+            pais = pais_nombre
 
-            try:
-                conn.execute(
-                    text(query_insert_clientes_stg),
-                    {
-                        "source_system": "neo4j",
-                        "source_code": source_code,
-                        "cliente_email": "Sin correo",
-                        "cliente_nombre": cliente.get("nombre", "Sin nombre"),
-                        "genero_raw": genero_raw if genero_raw else "No especificado",
-                        "pais_raw": pais if pais else "CR",
-                        "fecha_creado_raw": fecha_creado_raw_str,
-                        "fecha_creado_dt": fecha_creado_dt,
-                        "genero_norm": genero_nuevo,
-                    },
+        try:
+            writer.add(
+                "clientes",
+                {
+                    "source_system": "neo4j",
+                    "source_code": source_code,
+                    "cliente_email": "Sin correo",
+                    "cliente_nombre": cliente.get("nombre", "Sin nombre"),
+                    "genero_raw": genero_raw if genero_raw else "No especificado",
+                    "pais_raw": pais if pais else "CR",
+                    "fecha_creado_raw": fecha_creado_raw_str,
+                    "fecha_creado_dt": fecha_creado_dt,
+                    "genero_norm": genero_nuevo,
+                },
+            )
+            procesados += 1
+            if procesados % BATCH_SIZE == 0:
+                print(
+                    f"\r    neo4j: {procesados}/{total_clientes} clients...",
+                    end="",
+                    flush=True,
                 )
-                procesados += 1
-                if procesados % BATCH_SIZE == 0:
-                    conn.commit()
-                    print(
-                        f"\r    neo4j: {procesados}/{total_clientes} clients...",
-                        end="",
-                        flush=True,
-                    )
-            except Exception:
-                errores += 1
-                continue
+        except Exception:
+            errores += 1
+            continue
 
-        conn.commit()  # Final commit
+    writer.flush("clientes")
+    procesados -= writer.errors("clientes")
+    errores += writer.errors("clientes")
 
     return procesados, errores
 
@@ -620,7 +375,12 @@ def convertir_sku(sku: str) -> str:
 
 
 def transform_Neo4j(
-    productos, clientes, rel_realizo, rel_contiene, eq_map: "EquivalenceMap" = None
+    productos,
+    clientes,
+    rel_realizo,
+    rel_contiene,
+    eq_map: "EquivalenceMap" = None,
+    map_index: MapProductoIndex = None,
 ):
     """
     Transforma y carga datos de Neo4j a staging.
@@ -631,41 +391,55 @@ def transform_Neo4j(
         rel_realizo: Lista de relaciones REALIZO
         rel_contiene: Lista de relaciones CONTIENE
         eq_map: Mapa de equivalencias de productos (construido previamente)
+        map_index: Índice de stg.map_producto compartido por todas las fuentes
     """
     total_productos = len(productos)
 
-    # 1. Process clients
-    clientes_procesados, clientes_errores = insert_clientes_stg(clientes)
+    if map_index is None:
+        map_index = MapProductoIndex.load(engine)
 
-    # 2. Process products - using equivalence map for SKU resolution
-    productos_procesados = 0
-    productos_errores = 0
-    for producto in productos:
-        try:
-            nombre = producto.get("nombre")
-            categoria = producto.get("categoria")
+    with engine.connect() as conn, StagingWriter(conn, map_index=map_index) as writer:
+        # 1. Process clients
+        clientes_procesados, clientes_errores = insert_clientes_stg(writer, clientes)
 
-            # Use equivalence map for SKU resolution
-            insert_producto_neo4j(producto, nombre, categoria, eq_map)
-            productos_procesados += 1
-        except Exception:
-            productos_errores += 1
-            continue
+        # 2. Process products - using equivalence map for SKU resolution
+        productos_procesados = 0
+        productos_errores = 0
+        for producto in productos:
+            try:
+                nombre = producto.get("nombre")
+                categoria = producto.get("categoria")
 
-        if (productos_procesados + productos_errores) % 50 == 0 or (
-            productos_procesados + productos_errores
-        ) == total_productos:
-            print(
-                f"\r    neo4j: {clientes_procesados} clients | {productos_procesados}/{total_productos} products...",
-                end="",
-                flush=True,
-            )
+                # Use equivalence map for SKU resolution
+                insert_producto_neo4j(
+                    producto, nombre, categoria, eq_map, writer, map_index
+                )
+                productos_procesados += 1
+            except Exception:
+                productos_errores += 1
+                continue
 
-    # 3. Load order items to staging
-    ordenes = unir_relaciones_por_orden(rel_realizo, rel_contiene)
-    items_procesados, items_errores = insert_orden_items_stg(
-        ordenes, clientes_procesados, productos_procesados
-    )
+            if (productos_procesados + productos_errores) % 50 == 0 or (
+                productos_procesados + productos_errores
+            ) == total_productos:
+                print(
+                    f"\r    neo4j: {clientes_procesados} clients | {productos_procesados}/{total_productos} products...",
+                    end="",
+                    flush=True,
+                )
+        writer.flush("map_producto")
+        productos_procesados -= writer.errors("map_producto")
+        productos_errores += writer.errors("map_producto")
+
+        # 3. Load order items to staging
+        ordenes = unir_relaciones_por_orden(rel_realizo, rel_contiene)
+        items_procesados, items_errores = insert_orden_items_stg(
+            writer, ordenes, clientes_procesados, productos_procesados
+        )
+
+    # Rows rejected by the database are reported by the writer
+    items_procesados -= writer.errors("orden_items")
+    items_errores += writer.errors("orden_items")
 
     # Final line
     output = f"\r    neo4j: {clientes_procesados} clients | {productos_procesados} products | {items_procesados} items"
@@ -673,3 +447,4 @@ def transform_Neo4j(
     if total_errores > 0:
         output += f" | {total_errores} errors"
     print(output + " " * 20)  # Extra spaces to clear progress indicators
+    print(writer.format_stats("neo4j"))
@@ -0,0 +1,414 @@
+"""
+transform/staging.py
+Escritura masiva (set-based) a las tablas de staging del Data Warehouse.
+
+En lugar de ejecutar un MERGE por fila, StagingWriter acumula los parámetros
+ya preparados por cada transformación (los dicts de `_prepare_*_params`), los
+envía en bloque a una tabla temporal de sesión con `fast_executemany` de pyodbc
+y luego ejecuta un único MERGE por lote desde la tabla temporal.
+
+La semántica es la misma que la de los MERGE fila a fila:
+- stg.map_producto: MERGE con UPDATE (gana la última fila del lote)
+- stg.clientes: MERGE con UPDATE ... COALESCE; por columna gana el último valor
+  no nulo del lote, como al aplicar los MERGE fila a fila en orden
+- stg.orden_items: solo INSERT de filas nuevas (gana la primera fila del lote)
+
+Si un lote falla (p. ej. un valor que no cabe en la columna), se reintenta fila
+por fila para aislar las filas con error sin perder el resto del lote.
+
+Las filas de stg.map_producto también se registran en el MapProductoIndex de la
+corrida (si se indica), de modo que las búsquedas de SKU posteriores las vean
+sin tener que escribir el lote ni consultar la tabla.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+if TYPE_CHECKING:
+    from map_producto_index import MapProductoIndex
+
+# Filas por lote enviado al servidor
+BULK_BATCH_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class StagingTable:
+    """Definición de una tabla de staging para escritura masiva."""
+
+    name: str
+    temp_table: str
+    columns: Tuple[str, ...]
+    temp_ddl: str
+    merge_sql: str
+
+    @property
+    def insert_sql(self) -> str:
+        cols = ", ".join(self.columns)
+        marks = ", ".join("?" for _ in self.columns)
+        return f"INSERT INTO {self.temp_table} ({cols}) VALUES ({marks})"
+
+
+@dataclass
+class TableStats:
+    """Métricas de escritura de una tabla."""
+
+    rows: int = 0
+    errors: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+""" -----------------------------------------------------------------------
+            Definición de tablas temporales y MERGE set-based
+    ----------------------------------------------------------------------- """
+
+MAP_PRODUCTO = StagingTable(
+    name="map_producto",
+    temp_table="#stg_map_producto",
+    columns=(
+        "source_system",
+        "source_code",
+        "sku_oficial",
+        "nombre_norm",
+        "categoria_norm",
+        "es_servicio",
+    ),
+    temp_ddl="""
+        IF OBJECT_ID('tempdb..#stg_map_producto') IS NULL
+        CREATE TABLE #stg_map_producto (
+            row_seq        INT IDENTITY(1,1) PRIMARY KEY,
+            source_system  NVARCHAR(32)  NULL,
+            source_code    NVARCHAR(128) NULL,
+            sku_oficial    NVARCHAR(64)  NULL,
+            nombre_norm    NVARCHAR(200) NULL,
+            categoria_norm NVARCHAR(120) NULL,
+            es_servicio    BIT           NULL
+        );
+    """,
+    merge_sql="""
+        MERGE INTO stg.map_producto AS target
+        USING (
+            SELECT source_system, source_code, sku_oficial,
+                   nombre_norm, categoria_norm, es_servicio
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY source_system, source_code
+                    ORDER BY row_seq DESC
+                ) AS rn
+                FROM #stg_map_producto
+            ) AS t
+            WHERE rn = 1
+        ) AS source
+        ON target.source_system = source.source_system
+            AND target.source_code = source.source_code
+        WHEN MATCHED THEN
+            UPDATE SET
+                sku_oficial = source.sku_oficial,
+                nombre_norm = source.nombre_norm,
+                categoria_norm = source.categoria_norm,
+                es_servicio = source.es_servicio
+        WHEN NOT MATCHED THEN
+            INSERT (source_system, source_code, sku_oficial, nombre_norm, categoria_norm, es_servicio)
+            VALUES (source.source_system, source.source_code, source.sku_oficial,
+                    source.nombre_norm, source.categoria_norm, source.es_servicio);
+    """,
+)
+
+CLIENTES = StagingTable(
+    name="clientes",
+    temp_table="#stg_clientes",
+    columns=(
+        "source_system",
+        "source_code",
+        "cliente_email",
+        "cliente_nombre",
+        "genero_raw",
+        "pais_raw",
+        "fecha_creado_raw",
+        "fecha_creado_dt",
+        "genero_norm",
+    ),
+    temp_ddl="""
+        IF OBJECT_ID('tempdb..#stg_clientes') IS NULL
+        CREATE TABLE #stg_clientes (
+            row_seq          INT IDENTITY(1,1) PRIMARY KEY,
+            source_system    NVARCHAR(32)  NULL,
+            source_code      NVARCHAR(128) NULL,
+            cliente_email    NVARCHAR(150) NULL,
+            cliente_nombre   NVARCHAR(200) NULL,
+            genero_raw       NVARCHAR(20)  NULL,
+            pais_raw         NVARCHAR(60)  NULL,
+            fecha_creado_raw NVARCHAR(30)  NULL,
+            fecha_creado_dt  DATE          NULL,
+            genero_norm      CHAR(32)      NULL
+        );
+    """,
+    merge_sql="""
+        MERGE INTO stg.clientes AS target
+        USING (
+            -- Por columna, el último valor no nulo del lote: el mismo resultado
+            -- que aplicar en orden los MERGE fila a fila con COALESCE
+            SELECT
+                source_system,
+                source_code,
+                MAX(CASE WHEN row_seq = seq_cliente_email THEN cliente_email END) AS cliente_email,
+                MAX(CASE WHEN row_seq = seq_cliente_nombre THEN cliente_nombre END) AS cliente_nombre,
+                MAX(CASE WHEN row_seq = seq_genero_raw THEN genero_raw END) AS genero_raw,
+                MAX(CASE WHEN row_seq = seq_pais_raw THEN pais_raw END) AS pais_raw,
+                MAX(CASE WHEN row_seq = seq_fecha_creado_raw THEN fecha_creado_raw END) AS fecha_creado_raw,
+                MAX(CASE WHEN row_seq = seq_fecha_creado_dt THEN fecha_creado_dt END) AS fecha_creado_dt,
+                MAX(CASE WHEN row_seq = seq_genero_norm THEN genero_norm END) AS genero_norm
+            FROM (
+                SELECT
+                    *,
+                    MAX(CASE WHEN cliente_email IS NOT NULL THEN row_seq END)
+                        OVER (PARTITION BY source_system, source_code) AS seq_cliente_email,
+                    MAX(CASE WHEN cliente_nombre IS NOT NULL THEN row_seq END)
+                        OVER (PARTITION BY source_system, source_code) AS seq_cliente_nombre,
+                    MAX(CASE WHEN genero_raw IS NOT NULL THEN row_seq END)
+                        OVER (PARTITION BY source_system, source_code) AS seq_genero_raw,
+                    MAX(CASE WHEN pais_raw IS NOT NULL THEN row_seq END)
+                        OVER (PARTITION BY source_system, source_code) AS seq_pais_raw,
+                    MAX(CASE WHEN fecha_creado_raw IS NOT NULL THEN row_seq END)
+                        OVER (PARTITION BY source_system, source_code) AS seq_fecha_creado_raw,
+                    MAX(CASE WHEN fecha_creado_dt IS NOT NULL THEN row_seq END)
+                        OVER (PARTITION BY source_system, source_code) AS seq_fecha_creado_dt,
+                    MAX(CASE WHEN genero_norm IS NOT NULL THEN row_seq END)
+                        OVER (PARTITION BY source_system, source_code) AS seq_genero_norm
+                FROM #stg_clientes
+            ) AS t
+            GROUP BY source_system, source_code
+        ) AS source
+        ON target.source_system = source.source_system
+            AND target.source_code = source.source_code
+        WHEN MATCHED THEN
+            UPDATE SET
+                cliente_email = COALESCE(source.cliente_email, target.cliente_email),
+                cliente_nombre = COALESCE(source.cliente_nombre, target.cliente_nombre),
+                genero_raw = COALESCE(source.genero_raw, target.genero_raw),
+                pais_raw = COALESCE(source.pais_raw, target.pais_raw),
+                fecha_creado_raw = COALESCE(source.fecha_creado_raw, target.fecha_creado_raw),
+                fecha_creado_dt = COALESCE(source.fecha_creado_dt, target.fecha_creado_dt),
+                genero_norm = COALESCE(source.genero_norm, target.genero_norm)
+        WHEN NOT MATCHED THEN
+            INSERT (source_system, source_code, cliente_email, cliente_nombre, genero_raw,
+                    pais_raw, fecha_creado_raw, fecha_creado_dt, genero_norm)
+            VALUES (source.source_system, source.source_code, source.cliente_email,
+                    source.cliente_nombre, source.genero_raw, source.pais_raw,
+                    COALESCE(source.fecha_creado_raw, '1900-01-01'),
+                    source.fecha_creado_dt, source.genero_norm);
+    """,
+)
+
+ORDEN_ITEMS = StagingTable(
+    name="orden_items",
+    temp_table="#stg_orden_items",
+    columns=(
+        "source_system",
+        "source_key_orden",
+        "source_key_item",
+        "source_code_prod",
+        "cliente_key",
+        "fecha_raw",
+        "canal_raw",
+        "moneda",
+        "cantidad_raw",
+        "precio_unit_raw",
+        "total_raw",
+        "fecha_dt",
+        "cantidad_num",
+        "precio_unit_num",
+        "total_num",
+    ),
+    temp_ddl="""
+        IF OBJECT_ID('tempdb..#stg_orden_items') IS NULL
+        CREATE TABLE #stg_orden_items (
+            row_seq          INT IDENTITY(1,1) PRIMARY KEY,
+            source_system    NVARCHAR(32)  NULL,
+            source_key_orden NVARCHAR(128) NULL,
+            source_key_item  NVARCHAR(128) NULL,
+            source_code_prod NVARCHAR(128) NULL,
+            cliente_key      NVARCHAR(128) NULL,
+            fecha_raw        NVARCHAR(50)  NULL,
+            canal_raw        NVARCHAR(32)  NULL,
+            moneda           CHAR(3)       NULL,
+            cantidad_raw     NVARCHAR(32)  NULL,
+            precio_unit_raw  NVARCHAR(32)  NULL,
+            total_raw        NVARCHAR(32)  NULL,
+            fecha_dt         DATE          NULL,
+            cantidad_num     DECIMAL(18,4) NULL,
+            precio_unit_num  DECIMAL(18,6) NULL,
+            total_num        DECIMAL(18,6) NULL
+        );
+    """,
+    merge_sql="""
+        MERGE INTO stg.orden_items AS target
+        USING (
+            SELECT source_system, source_key_orden, source_key_item, source_code_prod,
+                   cliente_key, fecha_raw, canal_raw, moneda, cantidad_raw, precio_unit_raw,
+                   total_raw, fecha_dt, cantidad_num, precio_unit_num, total_num
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY source_system, source_key_orden, source_key_item
+                    ORDER BY row_seq
+                ) AS rn
+                FROM #stg_orden_items
+            ) AS t
+            WHERE rn = 1
+        ) AS source
+        ON target.source_system = source.source_system
+            AND target.source_key_orden = source.source_key_orden
+            AND target.source_key_item = source.source_key_item
+        WHEN NOT MATCHED THEN
+            INSERT (source_system, source_key_orden, source_key_item, source_code_prod,
+                    cliente_key, fecha_raw, canal_raw, moneda, cantidad_raw, precio_unit_raw,
+                    total_raw, fecha_dt, cantidad_num, precio_unit_num, total_num)
+            VALUES (source.source_system, source.source_key_orden, source.source_key_item,
+                    source.source_code_prod, source.cliente_key, source.fecha_raw, source.canal_raw,
+                    source.moneda, source.cantidad_raw, source.precio_unit_raw, source.total_raw,
+                    source.fecha_dt, source.cantidad_num, source.precio_unit_num, source.total_num);
+    """,
+)
+
+STAGING_TABLES: Dict[str, StagingTable] = {
+    t.name: t for t in (MAP_PRODUCTO, CLIENTES, ORDEN_ITEMS)
+}
+
+
+""" -----------------------------------------------------------------------
+            Writer
+    ----------------------------------------------------------------------- """
+
+
+class StagingWriter:
+    """
+    Acumula filas para las tablas de staging y las escribe por lotes.
+
+    Uso:
+        with engine.connect() as conn:
+            with StagingWriter(conn) as writer:
+                writer.add("clientes", _prepare_cliente_params(cliente))
+                ...
+            print(writer.format_stats("mysql"))
+
+    Al salir del bloque `with` se escriben los lotes pendientes.
+    """
+
+    def __init__(
+        self,
+        conn,
+        batch_size: int = BULK_BATCH_SIZE,
+        map_index: Optional["MapProductoIndex"] = None,
+    ):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.map_index = map_index
+        self.stats: Dict[str, TableStats] = {}
+        self._buffers: Dict[str, List[tuple]] = {}
+        self._temp_tables: set = set()
+
+    def __enter__(self) -> "StagingWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.flush()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def add(self, table: str, params: dict) -> None:
+        """Agrega una fila (dict de parámetros) al lote de la tabla."""
+        spec = STAGING_TABLES[table]
+        if spec is MAP_PRODUCTO and self.map_index is not None:
+            self.map_index.register(params)
+        buffer = self._buffers.setdefault(table, [])
+        buffer.append(tuple(params.get(col) for col in spec.columns))
+        if len(buffer) >= self.batch_size:
+            self._flush_table(spec)
+
+    def flush(self, table: Optional[str] = None) -> None:
+        """Escribe los lotes pendientes (de una tabla o de todas)."""
+        names = [table] if table else list(self._buffers)
+        for name in names:
+            if self._buffers.get(name):
+                self._flush_table(STAGING_TABLES[name])
+
+    def errors(self, table: str) -> int:
+        """Cantidad de filas de la tabla que no se pudieron escribir."""
+        stats = self.stats.get(table)
+        return stats.errors if stats else 0
+
+    def format_stats(self, source: str) -> str:
+        """Línea de resumen con filas/seg por tabla, en el formato del ETL."""
+        parts = [
+            f"{name} {s.rows} rows @ {s.rows_per_sec:,.0f} rows/s"
+            for name, s in self.stats.items()
+        ]
+        return f"    {source}: staging " + " | ".join(parts)
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _flush_table(self, spec: StagingTable) -> None:
+        rows = self._buffers.get(spec.name) or []
+        self._buffers[spec.name] = []
+        if not rows:
+            return
+
+        stats = self.stats.setdefault(spec.name, TableStats())
+        start = time.perf_counter()
+        try:
+            self._merge_rows(spec, rows)
+            self.conn.commit()
+            stats.rows += len(rows)
+        except Exception:
+            self.conn.rollback()
+            written, failed = self._merge_row_by_row(spec, rows)
+            stats.rows += written
+            stats.errors += failed
+        stats.batches += 1
+        stats.seconds += time.perf_counter() - start
+
+    def _merge_row_by_row(self, spec: StagingTable, rows: List[tuple]):
+        written = 0
+        failed = 0
+        for row in rows:
+            try:
+                self._merge_rows(spec, [row])
+                self.conn.commit()
+                written += 1
+            except Exception:
+                self.conn.rollback()
+                failed += 1
+        return written, failed
+
+    def _merge_rows(self, spec: StagingTable, rows: List[tuple]) -> None:
+        self._ensure_temp_table(spec)
+        self.conn.execute(text(f"TRUNCATE TABLE {spec.temp_table}"))
+
+        cursor = self.conn.connection.cursor()
+        try:
+            cursor.fast_executemany = True
+            cursor.executemany(spec.insert_sql, rows)
+        finally:
+            cursor.close()
+
+        self.conn.execute(text(spec.merge_sql))
+
+    def _ensure_temp_table(self, spec: StagingTable) -> None:
+        if spec.name in self._temp_tables:
+            return
+        # Se crea y confirma fuera del lote para que un rollback no la elimine
+        self.conn.execute(text(spec.temp_ddl))
+        self.conn.commit()
+        self._temp_tables.add(spec.name)
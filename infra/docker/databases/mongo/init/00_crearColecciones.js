@@ -112,3 +112,6 @@ db.createCollection("ordenes", {
     }
   }
 });
+
+// Listado de órdenes por cursor (fecha, _id): ver services/api-mongo/schemas/pagination.py
+db.ordenes.createIndex({ fecha: -1, _id: -1 }, { name: "ix_ordenes_fecha_id" });
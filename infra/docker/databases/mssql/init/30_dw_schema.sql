@@ -27,7 +27,12 @@ GO
    1.5) Limpieza de tablas existentes (en orden correcto de dependencias)
    ======================================================================= */
 -- Primero: Tablas de hechos y analytics (dependen de dimensiones)
+IF OBJECT_ID('analytics.RuleItems','U') IS NOT NULL DROP TABLE analytics.RuleItems;
+IF OBJECT_ID('analytics.RuleItems_Shadow','U') IS NOT NULL DROP TABLE analytics.RuleItems_Shadow;
+IF OBJECT_ID('analytics.RuleItems_Retired','U') IS NOT NULL DROP TABLE analytics.RuleItems_Retired;
 IF OBJECT_ID('analytics.AssociationRules','U') IS NOT NULL DROP TABLE analytics.AssociationRules;
+IF OBJECT_ID('analytics.AssociationRules_Shadow','U') IS NOT NULL DROP TABLE analytics.AssociationRules_Shadow;
+IF OBJECT_ID('analytics.AssociationRules_Retired','U') IS NOT NULL DROP TABLE analytics.AssociationRules_Retired;
 IF OBJECT_ID('dw.MetasVentas','U') IS NOT NULL DROP TABLE dw.MetasVentas;
 IF OBJECT_ID('dw.FactVentas','U') IS NOT NULL DROP TABLE dw.FactVentas;
 
@@ -43,6 +48,8 @@ IF OBJECT_ID('stg.orden_items','U') IS NOT NULL DROP TABLE stg.orden_items;
 IF OBJECT_ID('stg.clientes','U') IS NOT NULL DROP TABLE stg.clientes;
 IF OBJECT_ID('stg.tipo_cambio','U') IS NOT NULL DROP TABLE stg.tipo_cambio;
 IF OBJECT_ID('stg.map_producto','U') IS NOT NULL DROP TABLE stg.map_producto;
+IF OBJECT_ID('stg.secuencia_sku','U') IS NOT NULL DROP TABLE stg.secuencia_sku;
+IF OBJECT_ID('stg.etl_watermark','U') IS NOT NULL DROP TABLE stg.etl_watermark;
 GO
 
 /* =======================================================================
@@ -71,6 +78,28 @@ CREATE TABLE stg.map_producto (
   es_servicio    BIT           NULL,               -- p.ej. líneas sin SKU en Supabase
   CONSTRAINT UQ_map_producto UNIQUE (source_system, source_code)
 );
+-- Búsqueda del código de origen a partir del SKU (procedimientos de recomendación)
+CREATE INDEX IX_map_producto_sku ON stg.map_producto(sku_oficial, source_system) INCLUDE (source_code);
+
+-- 3.1.1) Secuencia de SKUs generados por el ETL (etl/sku_sequence.py)
+--        Cada corrida reserva bloques con un UPDATE ... OUTPUT atómico, así que
+--        dos corridas concurrentes nunca reciben el mismo número.
+CREATE TABLE stg.secuencia_sku (
+  nombre         NVARCHAR(32) NOT NULL PRIMARY KEY,
+  ultimo_numero  INT          NOT NULL,            -- último número entregado (SKU-0000)
+  actualizado_ts DATETIME2(3) NOT NULL DEFAULT SYSDATETIME()
+);
+INSERT INTO stg.secuencia_sku (nombre, ultimo_numero) VALUES (N'sku', 0);
+
+-- 3.1.2) Marcas de agua de extracción incremental (último id en staging por fuente/tabla)
+CREATE TABLE stg.etl_watermark (
+  source_system  NVARCHAR(32)  NOT NULL,           -- 'mssql' | 'mysql'
+  table_name     NVARCHAR(64)  NOT NULL,           -- 'Cliente' | 'Orden' | 'OrdenDetalle'
+  last_id        BIGINT        NOT NULL,           -- MAX(id) ya escrito en staging
+  extracted_at   DATETIME2(3)  NULL,               -- inicio de la extracción que lo registró
+  updated_at     DATETIME2(3)  NOT NULL DEFAULT SYSDATETIME(),
+  CONSTRAINT PK_etl_watermark PRIMARY KEY (source_system, table_name)
+);
 
 -- 3.2) Tabla de tipos de cambio (para normalizar a USD por fecha de la orden)
 CREATE TABLE stg.tipo_cambio (
@@ -102,10 +131,17 @@ CREATE TABLE stg.orden_items (
   cantidad_num      DECIMAL(18,4) NULL,
   precio_unit_num   DECIMAL(18,6) NULL,
   total_num         DECIMAL(18,6) NULL,
-  load_ts           DATETIME2(3)  NOT NULL DEFAULT SYSDATETIME()
+  load_ts           DATETIME2(3)  NOT NULL DEFAULT SYSDATETIME(),
+  -- Clave natural de la venta en dw.FactVentas (SourceKey), persistida para poder indexarla
+  fact_source_key   AS (source_key_orden + N'-' + source_key_item) PERSISTED
 );
 CREATE INDEX IX_stg_items_fecha ON stg.orden_items(fecha_dt);
 CREATE INDEX IX_stg_items_prod  ON stg.orden_items(source_code_prod);
+-- Clave natural usada por el MERGE set-based del ETL (transform/staging.py)
+CREATE INDEX IX_stg_items_source ON stg.orden_items(source_system, source_key_orden, source_key_item);
+-- Carga incremental de FactVentas: filtro por load_ts y anti-join contra la clave natural
+CREATE INDEX IX_stg_items_load_ts ON stg.orden_items(load_ts) INCLUDE (source_system, fact_source_key);
+CREATE INDEX IX_stg_items_fact_key ON stg.orden_items(source_system, fact_source_key);
 
 -- 3.4) Staging Clientes
 CREATE TABLE stg.clientes (
@@ -123,6 +159,10 @@ CREATE TABLE stg.clientes (
 
   load_ts           DATETIME2(3)  NOT NULL DEFAULT SYSDATETIME()
 );
+CREATE INDEX IX_stg_clientes_source ON stg.clientes(source_system, source_code);
+-- Carga incremental de DimCliente (load/general.py): filtra por load_ts y lee el resto de la fila
+CREATE INDEX IX_stg_clientes_load_ts ON stg.clientes(load_ts)
+  INCLUDE (source_system, source_code, cliente_email, cliente_nombre, genero_norm, pais_raw, fecha_creado_dt);
 
 /* =======================================================================
    4) Dimensiones del DW (dw) — con claves sustitutas e historización simple
@@ -160,6 +200,8 @@ CREATE TABLE dw.DimCliente (
   LoadTS           DATETIME2(3)  NOT NULL DEFAULT SYSDATETIME()
 );
 CREATE INDEX IX_DimCliente_Email ON dw.DimCliente(Email) WHERE Email IS NOT NULL;
+-- Búsqueda por clave de origen (carga set-based del ETL y joins de FactVentas)
+CREATE INDEX IX_DimCliente_Source ON dw.DimCliente(SourceSystem, SourceKey);
 
 -- 4.3) DimProducto (canónica por sku_oficial)
 CREATE TABLE dw.DimProducto (
@@ -176,6 +218,8 @@ CREATE TABLE dw.DimProducto (
 -- Unicidad blanda del SKU cuando está presente
 CREATE UNIQUE INDEX UX_DimProducto_SKU ON dw.DimProducto(SKU) WHERE SKU IS NOT NULL;
 CREATE INDEX IX_DimProducto_Categoria ON dw.DimProducto(Categoria);
+-- Búsqueda por clave de origen (carga set-based del ETL)
+CREATE INDEX IX_DimProducto_Source ON dw.DimProducto(SourceSystem, SourceKey);
 
 /* =======================================================================
    5) Hechos (dw)
@@ -208,6 +252,9 @@ CREATE INDEX IX_FactVentas_Producto  ON dw.FactVentas(ProductoID);
 CREATE INDEX IX_FactVentas_Cliente   ON dw.FactVentas(ClienteID);
 CREATE INDEX IX_FactVentas_Canal     ON dw.FactVentas(Canal);
 CREATE INDEX IX_FactVentas_Fuente    ON dw.FactVentas(Fuente);
+-- Clave natural de la venta: evita duplicados y hace sargable la detección en el ETL
+CREATE UNIQUE INDEX UX_FactVentas_Fuente_SourceKey ON dw.FactVentas(Fuente, SourceKey)
+  WHERE SourceKey IS NOT NULL;
 
 /* =======================================================================
    6) Metas de ventas (documento: MetasVentas conectada a DimCliente/DimProducto)
@@ -231,14 +278,85 @@ CREATE INDEX IX_Metas_AnioMes ON dw.MetasVentas(Anio, Mes);
 
 CREATE TABLE analytics.AssociationRules (
   RuleID        BIGINT IDENTITY(1,1) PRIMARY KEY,
-  Antecedent    NVARCHAR(450) NOT NULL,   -- lista de SKU canónicos
+  Antecedent    NVARCHAR(450) NOT NULL,   -- lista de SKU canónicos, ordenados y separados por ', '
   Consequent    NVARCHAR(450) NOT NULL,   -- lista de SKU canónicos
   Support       DECIMAL(9,6)   NOT NULL,
   Confidence    DECIMAL(9,6)   NOT NULL,
   Lift          DECIMAL(9,6)   NOT NULL,
-  GeneratedAt   DATETIME2(3)   NOT NULL DEFAULT SYSDATETIME()
+  GeneratedAt   DATETIME2(3)   NOT NULL DEFAULT SYSDATETIME(),
+  AntecedentHash AS CAST(HASHBYTES('SHA2_256', Antecedent) AS BINARY(32)) PERSISTED
 );
 CREATE INDEX IX_AR_Consequent ON analytics.AssociationRules(Consequent);
+-- Búsqueda de "reglas cuyo antecedente es exactamente esta canasta"
+CREATE INDEX IX_AR_AntecedentHash ON analytics.AssociationRules(AntecedentHash) INCLUDE (Confidence, Lift);
+-- Versión de las reglas publicadas (MAX(GeneratedAt)); las APIs la consultan
+-- para invalidar su caché de recomendaciones
+CREATE INDEX IX_AR_GeneratedAt ON analytics.AssociationRules(GeneratedAt);
+
+-- 7.0) Ítems de cada regla, normalizados (una fila por SKU y rol).
+--      Se llena al publicar las reglas; los procedimientos de recomendación
+--      expanden los consecuentes con un join por índice en vez de STRING_SPLIT.
+CREATE TABLE analytics.RuleItems (
+  RuleID         BIGINT        NOT NULL,
+  SKU            NVARCHAR(64)  NOT NULL,
+  Role           CHAR(1)       NOT NULL,        -- 'A' antecedente | 'C' consecuente
+  AntecedentSize TINYINT       NOT NULL,        -- nº de SKUs del antecedente de la regla
+  CONSTRAINT PK_RuleItems PRIMARY KEY (RuleID, Role, SKU)
+);
+CREATE INDEX IX_RuleItems_SKU ON analytics.RuleItems(SKU, Role) INCLUDE (AntecedentSize);
+
+-- 7.1) Tablas de publicación de reglas (etl/association_rules/load_rules.py)
+--      El ETL carga las reglas nuevas en _Shadow y las publica con dos
+--      ALTER TABLE ... SWITCH (solo metadatos) dentro de una transacción:
+--      AssociationRules -> _Retired y _Shadow -> AssociationRules
+--      (y lo mismo para RuleItems).
+--      SWITCH exige estructura e índices idénticos: cualquier cambio en
+--      AssociationRules debe replicarse en ambas tablas.
+CREATE TABLE analytics.AssociationRules_Shadow (
+  RuleID        BIGINT IDENTITY(1,1) PRIMARY KEY,
+  Antecedent    NVARCHAR(450) NOT NULL,
+  Consequent    NVARCHAR(450) NOT NULL,
+  Support       DECIMAL(9,6)   NOT NULL,
+  Confidence    DECIMAL(9,6)   NOT NULL,
+  Lift          DECIMAL(9,6)   NOT NULL,
+  GeneratedAt   DATETIME2(3)   NOT NULL DEFAULT SYSDATETIME(),
+  AntecedentHash AS CAST(HASHBYTES('SHA2_256', Antecedent) AS BINARY(32)) PERSISTED
+);
+CREATE INDEX IX_AR_Shadow_Consequent ON analytics.AssociationRules_Shadow(Consequent);
+CREATE INDEX IX_AR_Shadow_AntecedentHash ON analytics.AssociationRules_Shadow(AntecedentHash) INCLUDE (Confidence, Lift);
+CREATE INDEX IX_AR_Shadow_GeneratedAt ON analytics.AssociationRules_Shadow(GeneratedAt);
+
+CREATE TABLE analytics.AssociationRules_Retired (
+  RuleID        BIGINT IDENTITY(1,1) PRIMARY KEY,
+  Antecedent    NVARCHAR(450) NOT NULL,
+  Consequent    NVARCHAR(450) NOT NULL,
+  Support       DECIMAL(9,6)   NOT NULL,
+  Confidence    DECIMAL(9,6)   NOT NULL,
+  Lift          DECIMAL(9,6)   NOT NULL,
+  GeneratedAt   DATETIME2(3)   NOT NULL DEFAULT SYSDATETIME(),
+  AntecedentHash AS CAST(HASHBYTES('SHA2_256', Antecedent) AS BINARY(32)) PERSISTED
+);
+CREATE INDEX IX_AR_Retired_Consequent ON analytics.AssociationRules_Retired(Consequent);
+CREATE INDEX IX_AR_Retired_AntecedentHash ON analytics.AssociationRules_Retired(AntecedentHash) INCLUDE (Confidence, Lift);
+CREATE INDEX IX_AR_Retired_GeneratedAt ON analytics.AssociationRules_Retired(GeneratedAt);
+
+CREATE TABLE analytics.RuleItems_Shadow (
+  RuleID         BIGINT        NOT NULL,
+  SKU            NVARCHAR(64)  NOT NULL,
+  Role           CHAR(1)       NOT NULL,
+  AntecedentSize TINYINT       NOT NULL,
+  CONSTRAINT PK_RuleItems_Shadow PRIMARY KEY (RuleID, Role, SKU)
+);
+CREATE INDEX IX_RuleItems_Shadow_SKU ON analytics.RuleItems_Shadow(SKU, Role) INCLUDE (AntecedentSize);
+
+CREATE TABLE analytics.RuleItems_Retired (
+  RuleID         BIGINT        NOT NULL,
+  SKU            NVARCHAR(64)  NOT NULL,
+  Role           CHAR(1)       NOT NULL,
+  AntecedentSize TINYINT       NOT NULL,
+  CONSTRAINT PK_RuleItems_Retired PRIMARY KEY (RuleID, Role, SKU)
+);
+CREATE INDEX IX_RuleItems_Retired_SKU ON analytics.RuleItems_Retired(SKU, Role) INCLUDE (AntecedentSize);
 
 /* =======================================================================
    8) Vistas de conveniencia (opcionales)
@@ -315,60 +433,52 @@ BEGIN
 
     CREATE TABLE #skus_entrada (sku NVARCHAR(50) PRIMARY KEY);
     
+    -- Forma canónica de cada SKU: UPPER(LTRIM(RTRIM(valor))), la misma que
+    -- aplica el ETL (load_rules.sku_canonico) antes de escribir las reglas;
+    -- el hash del antecedente es exacto, así que 'sku-0001 ' debe llegar como 'SKU-0001'
     INSERT INTO #skus_entrada (sku)
-    SELECT DISTINCT LTRIM(RTRIM(value)) 
+    SELECT DISTINCT UPPER(LTRIM(RTRIM(value)))
     FROM STRING_SPLIT(@lista_skus, ',')
     WHERE LTRIM(RTRIM(value)) <> '';
 
-    WITH ReglasFiltradas AS (
-        SELECT 
-            r.RuleID,
-            r.Antecedent,
-            r.Consequent,
-            r.Support,
-            r.Confidence,
-            r.Lift,
-            (SELECT COUNT(DISTINCT LTRIM(RTRIM(value)))
-             FROM STRING_SPLIT(REPLACE(REPLACE(r.Antecedent, '(', ''), ')', ''), ',') 
-             WHERE LTRIM(RTRIM(value)) <> '') as total_antecedentes,
-            (SELECT COUNT(DISTINCT LTRIM(RTRIM(value)))
-             FROM STRING_SPLIT(REPLACE(REPLACE(r.Antecedent, '(', ''), ')', ''), ',') a
-             INNER JOIN #skus_entrada se ON LTRIM(RTRIM(a.value)) = se.sku
-             WHERE LTRIM(RTRIM(a.value)) <> '') as antecedentes_en_lista,
-            (SELECT COUNT(*) FROM #skus_entrada) as total_en_lista,
-            (SELECT COUNT(*)
-             FROM STRING_SPLIT(REPLACE(REPLACE(r.Consequent, '(', ''), ')', ''), ',') c
-             INNER JOIN #skus_entrada se ON LTRIM(RTRIM(c.value)) = se.sku
-             WHERE LTRIM(RTRIM(c.value)) <> '') as consecuentes_en_lista,
-            -- Incluir SKU, Nombre y CodigoMongo para antecedentes
-            (SELECT dp.SKU, dp.Nombre, mp.source_code AS CodigoMongo
-             FROM dw.DimProducto dp
-             INNER JOIN #skus_entrada se ON dp.SKU = se.sku
-             LEFT JOIN stg.map_producto mp ON dp.SKU = mp.sku_oficial AND mp.source_system = 'mongo'
-             FOR JSON PATH) AS source_keys_antecedentes,
-            -- Incluir SKU, Nombre y CodigoMongo para consecuentes
-            (SELECT DISTINCT dp.SKU, dp.Nombre, mp.source_code AS CodigoMongo
-             FROM STRING_SPLIT(REPLACE(REPLACE(r.Consequent, '(', ''), ')', ''), ',') c
-             INNER JOIN dw.DimProducto dp ON LTRIM(RTRIM(c.value)) = dp.SKU
-             LEFT JOIN stg.map_producto mp ON dp.SKU = mp.sku_oficial AND mp.source_system = 'mongo'
-             WHERE LTRIM(RTRIM(c.value)) <> ''
-             FOR JSON PATH) AS source_keys_consecuentes
-        FROM analytics.AssociationRules r
-    )
+    -- Clave canónica de la canasta: SKUs canónicos ordenados por código (BIN2) y
+    -- separados por ', ', igual que el Antecedent que escribe el ETL (load_rules.clave_canasta)
+    DECLARE @antecedente NVARCHAR(MAX) = (
+        SELECT STRING_AGG(CAST(sku AS NVARCHAR(MAX)), ', ')
+               WITHIN GROUP (ORDER BY sku COLLATE Latin1_General_BIN2)
+        FROM #skus_entrada
+    );
+    DECLARE @hash BINARY(32) = CAST(HASHBYTES('SHA2_256', @antecedente) AS BINARY(32));
+
+    -- Incluir SKU, Nombre y CodigoMongo para antecedentes (iguales para todas las reglas)
+    DECLARE @source_keys_antecedentes NVARCHAR(MAX) = (
+        SELECT dp.SKU, dp.Nombre, mp.source_code AS CodigoMongo
+        FROM dw.DimProducto dp
+        INNER JOIN #skus_entrada se ON dp.SKU = se.sku
+        LEFT JOIN stg.map_producto mp ON dp.SKU = mp.sku_oficial AND mp.source_system = 'mongo'
+        FOR JSON PATH
+    );
+
+    -- Reglas cuyo antecedente es exactamente la canasta (seek por AntecedentHash);
+    -- el consecuente nunca contiene SKUs del antecedente
     SELECT TOP 5
-        Antecedent,
-        Consequent,
-        Support,
-        Confidence,
-        Lift,
-        source_keys_antecedentes AS SourceKeysAntecedentes,
-        source_keys_consecuentes AS SourceKeysConsecuentes
-    FROM ReglasFiltradas
-    WHERE total_antecedentes > 0 
-        AND antecedentes_en_lista = total_antecedentes
-        AND total_en_lista = total_antecedentes
-        AND consecuentes_en_lista = 0
-    ORDER BY Confidence DESC, Lift DESC;
+        r.Antecedent,
+        r.Consequent,
+        r.Support,
+        r.Confidence,
+        r.Lift,
+        @source_keys_antecedentes AS SourceKeysAntecedentes,
+        -- Incluir SKU, Nombre y CodigoMongo para consecuentes
+        (SELECT DISTINCT dp.SKU, dp.Nombre, mp.source_code AS CodigoMongo
+         FROM analytics.RuleItems ri
+         INNER JOIN dw.DimProducto dp ON dp.SKU = ri.SKU
+         LEFT JOIN stg.map_producto mp ON dp.SKU = mp.sku_oficial AND mp.source_system = 'mongo'
+         WHERE ri.RuleID = r.RuleID AND ri.Role = 'C'
+         FOR JSON PATH) AS SourceKeysConsecuentes
+    FROM analytics.AssociationRules r
+    WHERE r.AntecedentHash = @hash
+        AND r.Antecedent = @antecedente
+    ORDER BY r.Confidence DESC, r.Lift DESC;
 
     DROP TABLE #skus_entrada;
 END;
@@ -428,60 +538,52 @@ BEGIN
 
     CREATE TABLE #skus_entrada (sku NVARCHAR(50) PRIMARY KEY);
     
+    -- Forma canónica de cada SKU: UPPER(LTRIM(RTRIM(valor))), la misma que
+    -- aplica el ETL (load_rules.sku_canonico) antes de escribir las reglas;
+    -- el hash del antecedente es exacto, así que 'sku-0001 ' debe llegar como 'SKU-0001'
     INSERT INTO #skus_entrada (sku)
-    SELECT DISTINCT LTRIM(RTRIM(value)) 
+    SELECT DISTINCT UPPER(LTRIM(RTRIM(value)))
     FROM STRING_SPLIT(@lista_skus, ',')
     WHERE LTRIM(RTRIM(value)) <> '';
 
-    WITH ReglasFiltradas AS (
-        SELECT 
-            r.RuleID,
-            r.Antecedent,
-            r.Consequent,
-            r.Support,
-            r.Confidence,
-            r.Lift,
-            (SELECT COUNT(DISTINCT LTRIM(RTRIM(value)))
-             FROM STRING_SPLIT(REPLACE(REPLACE(r.Antecedent, '(', ''), ')', ''), ',') 
-             WHERE LTRIM(RTRIM(value)) <> '') as total_antecedentes,
-            (SELECT COUNT(DISTINCT LTRIM(RTRIM(value)))
-             FROM STRING_SPLIT(REPLACE(REPLACE(r.Antecedent, '(', ''), ')', ''), ',') a
-             INNER JOIN #skus_entrada se ON LTRIM(RTRIM(a.value)) = se.sku
-             WHERE LTRIM(RTRIM(a.value)) <> '') as antecedentes_en_lista,
-            (SELECT COUNT(*) FROM #skus_entrada) as total_en_lista,
-            (SELECT COUNT(*)
-             FROM STRING_SPLIT(REPLACE(REPLACE(r.Consequent, '(', ''), ')', ''), ',') c
-             INNER JOIN #skus_entrada se ON LTRIM(RTRIM(c.value)) = se.sku
-             WHERE LTRIM(RTRIM(c.value)) <> '') as consecuentes_en_lista,
-            -- Incluir SKU, Nombre y CodigoSupa para antecedentes
-            (SELECT dp.SKU, dp.Nombre, mp.source_code AS CodigoSupa
-             FROM dw.DimProducto dp
-             INNER JOIN #skus_entrada se ON dp.SKU = se.sku
-             LEFT JOIN stg.map_producto mp ON dp.SKU = mp.sku_oficial AND mp.source_system = 'supabase'
-             FOR JSON PATH) AS source_keys_antecedentes,
-            -- Incluir SKU, Nombre y CodigoSupa para consecuentes
-            (SELECT DISTINCT dp.SKU, dp.Nombre, mp.source_code AS CodigoSupa
-             FROM STRING_SPLIT(REPLACE(REPLACE(r.Consequent, '(', ''), ')', ''), ',') c
-             INNER JOIN dw.DimProducto dp ON LTRIM(RTRIM(c.value)) = dp.SKU
-             LEFT JOIN stg.map_producto mp ON dp.SKU = mp.sku_oficial AND mp.source_system = 'supabase'
-             WHERE LTRIM(RTRIM(c.value)) <> ''
-             FOR JSON PATH) AS source_keys_consecuentes
-        FROM analytics.AssociationRules r
-    )
+    -- Clave canónica de la canasta: SKUs canónicos ordenados por código (BIN2) y
+    -- separados por ', ', igual que el Antecedent que escribe el ETL (load_rules.clave_canasta)
+    DECLARE @antecedente NVARCHAR(MAX) = (
+        SELECT STRING_AGG(CAST(sku AS NVARCHAR(MAX)), ', ')
+               WITHIN GROUP (ORDER BY sku COLLATE Latin1_General_BIN2)
+        FROM #skus_entrada
+    );
+    DECLARE @hash BINARY(32) = CAST(HASHBYTES('SHA2_256', @antecedente) AS BINARY(32));
+
+    -- Incluir SKU, Nombre y CodigoSupa para antecedentes (iguales para todas las reglas)
+    DECLARE @source_keys_antecedentes NVARCHAR(MAX) = (
+        SELECT dp.SKU, dp.Nombre, mp.source_code AS CodigoSupa
+        FROM dw.DimProducto dp
+        INNER JOIN #skus_entrada se ON dp.SKU = se.sku
+        LEFT JOIN stg.map_producto mp ON dp.SKU = mp.sku_oficial AND mp.source_system = 'supabase'
+        FOR JSON PATH
+    );
+
+    -- Reglas cuyo antecedente es exactamente la canasta (seek por AntecedentHash);
+    -- el consecuente nunca contiene SKUs del antecedente
     SELECT TOP 5
-        Antecedent,
-        Consequent,
-        Support,
-        Confidence,
-        Lift,
-        source_keys_antecedentes AS SourceKeysAntecedentes,
-        source_keys_consecuentes AS SourceKeysConsecuentes
-    FROM ReglasFiltradas
-    WHERE total_antecedentes > 0 
-        AND antecedentes_en_lista = total_antecedentes
-        AND total_en_lista = total_antecedentes
-        AND consecuentes_en_lista = 0
-    ORDER BY Confidence DESC, Lift DESC;
+        r.Antecedent,
+        r.Consequent,
+        r.Support,
+        r.Confidence,
+        r.Lift,
+        @source_keys_antecedentes AS SourceKeysAntecedentes,
+        -- Incluir SKU, Nombre y CodigoSupa para consecuentes
+        (SELECT DISTINCT dp.SKU, dp.Nombre, mp.source_code AS CodigoSupa
+         FROM analytics.RuleItems ri
+         INNER JOIN dw.DimProducto dp ON dp.SKU = ri.SKU
+         LEFT JOIN stg.map_producto mp ON dp.SKU = mp.sku_oficial AND mp.source_system = 'supabase'
+         WHERE ri.RuleID = r.RuleID AND ri.Role = 'C'
+         FOR JSON PATH) AS SourceKeysConsecuentes
+    FROM analytics.AssociationRules r
+    WHERE r.AntecedentHash = @hash
+        AND r.Antecedent = @antecedente
+    ORDER BY r.Confidence DESC, r.Lift DESC;
 
     DROP TABLE #skus_entrada;
 END;
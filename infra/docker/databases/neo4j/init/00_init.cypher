@@ -10,9 +10,12 @@ DETACH DELETE n;
 // Eliminar constraints si existen
 DROP CONSTRAINT cliente_id IF EXISTS;
 DROP CONSTRAINT producto_id IF EXISTS;
+DROP CONSTRAINT secuencia_nombre IF EXISTS;
+DROP CONSTRAINT orden_id IF EXISTS;
 
 // Eliminar índices si existen
 DROP INDEX orden_fecha IF EXISTS;
+DROP INDEX orden_fecha_id IF EXISTS;
 
 // ============================
 // CREACIÓN DE CONSTRAINTS E ÍNDICES
@@ -26,6 +29,23 @@ CREATE CONSTRAINT producto_id IF NOT EXISTS
 FOR (p:Producto)
 REQUIRE p.id IS UNIQUE;
 
+// Ids de orden únicos: respaldo de la secuencia de api-neo4j. Su índice se
+// llama igual que el `INDEX orden_id IF NOT EXISTS` de la carga de datos, que
+// entonces no crea un índice duplicado
+CREATE CONSTRAINT orden_id IF NOT EXISTS
+FOR (o:Orden)
+REQUIRE o.id IS UNIQUE;
+
+// Contadores (ids de orden de api-neo4j); evita dos nodos con el mismo nombre
+CREATE CONSTRAINT secuencia_nombre IF NOT EXISTS
+FOR (s:Secuencia)
+REQUIRE s.nombre IS UNIQUE;
+
 CREATE INDEX orden_fecha IF NOT EXISTS
 FOR (o:Orden)
 ON (o.fecha);
+
+// Listado de órdenes por cursor (fecha, id) en api-neo4j
+CREATE INDEX orden_fecha_id IF NOT EXISTS
+FOR (o:Orden)
+ON (o.fecha, o.id);
@@ -11,6 +11,13 @@ CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 -- =======================
 DROP VIEW IF EXISTS public.orden_completa;
 
+DROP FUNCTION IF EXISTS public.fn_listar_ordenes(
+  integer,
+  integer,
+  timestamptz,
+  uuid,
+  boolean
+);
 DROP FUNCTION IF EXISTS public.fn_eliminar_orden(uuid);
 DROP FUNCTION IF EXISTS public.fn_actualizar_orden_completa(
   uuid,
@@ -70,8 +77,11 @@ CREATE TABLE orden_detalle (
  precio_unit NUMERIC(18,2) NOT NULL
 );
 
-CREATE INDEX ix_orden_fecha ON orden(fecha);
+-- Listado por cursor (fecha, orden_id) DESC en api-supabase
+CREATE INDEX ix_orden_fecha_id ON orden(fecha DESC, orden_id DESC);
 CREATE INDEX ix_detalle_producto ON orden_detalle(producto_id);
+-- Items de cada orden (fn_listar_ordenes, vista orden_completa)
+CREATE INDEX ix_detalle_orden ON orden_detalle(orden_id);
 
 -- =======================
 -- Funciones
@@ -215,6 +225,93 @@ BEGIN
 END;
 $$;
 
+-- Listar órdenes: una página con cliente e items anidados en un solo JSON
+--   {"total": <estimado o null>, "data": [{orden_id, fecha, ..., cliente, items}]}
+-- Orden (fecha, orden_id) DESC; con p_after_fecha/p_after_id la página empieza
+-- justo después de esa orden (rango sobre ix_orden_fecha_id), si no se usa
+-- p_offset. El total se lee de pg_class.reltuples y solo se cuenta de verdad
+-- cuando la tabla es pequeña o no tiene estadísticas.
+CREATE OR REPLACE FUNCTION public.fn_listar_ordenes(
+  p_limit INT DEFAULT 10,
+  p_offset INT DEFAULT 0,
+  p_after_fecha TIMESTAMPTZ DEFAULT NULL,
+  p_after_id UUID DEFAULT NULL,
+  p_con_total BOOLEAN DEFAULT TRUE
+)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  v_ids UUID[];
+  v_total BIGINT;
+  v_data JSON;
+BEGIN
+  -- Dos ramas para que cada una tenga su propio plan sobre el índice
+  IF p_after_fecha IS NULL THEN
+    SELECT array_agg(t.orden_id ORDER BY t.fecha DESC, t.orden_id DESC)
+    INTO v_ids
+    FROM (
+      SELECT o.orden_id, o.fecha
+      FROM public.orden o
+      ORDER BY o.fecha DESC, o.orden_id DESC
+      OFFSET p_offset
+      LIMIT p_limit
+    ) t;
+  ELSE
+    SELECT array_agg(t.orden_id ORDER BY t.fecha DESC, t.orden_id DESC)
+    INTO v_ids
+    FROM (
+      SELECT o.orden_id, o.fecha
+      FROM public.orden o
+      WHERE (o.fecha, o.orden_id) < (p_after_fecha, p_after_id)
+      ORDER BY o.fecha DESC, o.orden_id DESC
+      LIMIT p_limit
+    ) t;
+  END IF;
+
+  SELECT json_agg(
+    json_build_object(
+      'orden_id', o.orden_id,
+      'fecha', o.fecha,
+      'canal', o.canal,
+      'moneda', o.moneda,
+      'total', o.total,
+      'cliente', json_build_object('cliente_id', o.cliente_id, 'nombre', c.nombre),
+      'items', COALESCE((
+        SELECT json_agg(json_build_object(
+          'producto_id', d.producto_id,
+          'cantidad', d.cantidad,
+          'precio_unitario', d.precio_unit,
+          'producto', json_build_object('producto_id', p.producto_id, 'nombre', p.nombre)
+        ))
+        FROM public.orden_detalle d
+        JOIN public.producto p ON p.producto_id = d.producto_id
+        WHERE d.orden_id = o.orden_id
+      ), '[]'::json)
+    )
+    ORDER BY u.pos
+  )
+  INTO v_data
+  FROM unnest(v_ids) WITH ORDINALITY AS u(orden_id, pos)
+  JOIN public.orden o ON o.orden_id = u.orden_id
+  LEFT JOIN public.cliente c ON c.cliente_id = o.cliente_id;
+
+  IF p_con_total THEN
+    SELECT CASE WHEN cl.reltuples >= 0 THEN cl.reltuples::BIGINT END
+    INTO v_total
+    FROM pg_class cl
+    WHERE cl.oid = 'public.orden'::regclass;
+
+    IF v_total IS NULL OR v_total < 10000 THEN
+      SELECT count(*) INTO v_total FROM public.orden;
+    END IF;
+  END IF;
+
+  RETURN json_build_object('total', v_total, 'data', COALESCE(v_data, '[]'::json));
+END;
+$$;
+
 -- =======================
 -- Vista
 -- =======================
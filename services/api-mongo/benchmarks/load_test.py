@@ -0,0 +1,163 @@
+"""
+Latency under concurrency for a running api-mongo instance.
+
+Opens `--clients` keep-alive connections and has each one issue requests
+back to back for `--duration` seconds, cycling through the `--path` values, then prints
+throughput and p50/p90/p99 latency per path. Uses only the standard library
+so it can run against any checkout of the service.
+
+To compare the sync and async data paths, start the service from each
+revision and run the same command against both:
+
+    uv run uvicorn main:app --host 0.0.0.0 --port 3002 --workers 1
+    uv run python benchmarks/load_test.py --clients 200 --duration 30
+"""
+
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_URL = "http://127.0.0.1:3002"
+DEFAULT_PATHS = [
+    "/order/?skip=0&limit=10",
+    "/clients/",
+    "/products/?limit=100",
+    "/products/by-skus?skus=SKU-0001,SKU-0002",
+]
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    """Read one HTTP/1.1 response (Content-Length or chunked) and return the status."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed by server")
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", "0")))
+    return status
+
+
+async def _client(
+    host: str,
+    port: int,
+    paths: List[str],
+    offset: int,
+    deadline: float,
+    samples: Dict[str, List[float]],
+    errors: Dict[str, int],
+) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            request = (
+                f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                "Connection: keep-alive\r\n\r\n"
+            )
+            inicio = time.perf_counter()
+            try:
+                writer.write(request.encode("ascii"))
+                await writer.drain()
+                status = await _read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                errors[path] += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            samples[path].append(time.perf_counter() - inicio)
+            if status >= 400:
+                errors[path] += 1
+    finally:
+        writer.close()
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def _row(name: str, values: List[float], n_errors: int, seconds: float) -> Tuple:
+    if not values:
+        return (name, 0, n_errors, 0.0, "-", "-", "-")
+    return (
+        name,
+        len(values),
+        n_errors,
+        len(values) / seconds,
+        f"{_percentile(values, 50) * 1000:.1f}",
+        f"{_percentile(values, 90) * 1000:.1f}",
+        f"{_percentile(values, 99) * 1000:.1f}",
+    )
+
+
+async def run(url: str, paths: List[str], clients: int, duration: float) -> None:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    deadline = time.perf_counter() + duration
+    inicio = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _client(host, port, paths, i, deadline, samples, errors)
+            for i in range(clients)
+        )
+    )
+    seconds = time.perf_counter() - inicio
+
+    print(f"{clients} clients, {seconds:.1f}s against {url}\n")
+    header = ("path", "requests", "errors", "req/s", "p50 ms", "p90 ms", "p99 ms")
+    print(
+        f"{header[0]:<45} {header[1]:>9} {header[2]:>7} {header[3]:>8} {header[4]:>8} {header[5]:>8} {header[6]:>8}"
+    )
+    todas = []
+    for path in paths:
+        todas.extend(samples[path])
+        r = _row(path, samples[path], errors[path], seconds)
+        print(
+            f"{r[0]:<45} {r[1]:>9} {r[2]:>7} {r[3]:>8.1f} {r[4]:>8} {r[5]:>8} {r[6]:>8}"
+        )
+    r = _row("TOTAL", todas, sum(errors.values()), seconds)
+    print(f"{r[0]:<45} {r[1]:>9} {r[2]:>7} {r[3]:>8.1f} {r[4]:>8} {r[5]:>8} {r[6]:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="api-mongo latency under load")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds.")
+    parser.add_argument(
+        "--path",
+        action="append",
+        dest="paths",
+        help="Path to request (repeatable). Defaults to a mix of list and recommendation routes.",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.paths or DEFAULT_PATHS, args.clients, args.duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+CPU time to serialize listing payloads: previous pipeline vs MongoJSONResponse.
+
+Builds synthetic documents shaped like the `productos` and `ordenes`
+collections (ObjectId references, datetimes, nested items) and times turning
+a listing response into bytes with:
+
+  * before: recursive `_convert` (ObjectId -> str), FastAPI's
+    jsonable_encoder and JSONResponse.render (stdlib json)
+  * after:  MongoJSONResponse.render (orjson with the ObjectId hook)
+
+No database needed.
+
+Usage (from services/api-mongo):
+    uv run python -m benchmarks.serialize
+    uv run python -m benchmarks.serialize --products 10000 --orders 100 --runs 20
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from config.responses import MongoJSONResponse
+
+
+def _convert(o: Any):
+    # Previous per-controller traversal
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, dict):
+        return {k: _convert(v) for k, v in o.items()}
+    if isinstance(o, list):
+        return [_convert(v) for v in o]
+    return o
+
+
+def render_before(payload: dict) -> bytes:
+    safe = dict(payload, data=[_convert(doc) for doc in payload["data"]])
+    return JSONResponse(jsonable_encoder(safe)).body
+
+
+def render_after(payload: dict) -> bytes:
+    return MongoJSONResponse(payload).body
+
+
+def products_payload(n: int, rng: random.Random) -> dict:
+    data = [
+        {
+            "_id": str(ObjectId()),
+            "codigo_mongo": f"MN-{i:06d}",
+            "nombre": f"Producto {i}",
+            "categoria": rng.choice(["Electrónica", "Hogar", "Ropa", "Deportes"]),
+            "equivalencias": {"sku": f"SKU-{i:04d}", "codigo_alt": f"ALT-{i:05d}"},
+            "creado": datetime(2024, 1, 1) + timedelta(minutes=i),
+        }
+        for i in range(n)
+    ]
+    return {"total": n, "skip": 0, "limit": n, "data": data}
+
+
+def orders_payload(n: int, items: int, rng: random.Random) -> dict:
+    data = [
+        {
+            "_id": str(ObjectId()),
+            "cliente_id": ObjectId(),
+            "fecha": datetime(2025, 1, 1) + timedelta(minutes=i),
+            "canal": "WEB",
+            "moneda": "CRC",
+            "total": 1000 * items,
+            "items": [
+                {
+                    "producto_id": ObjectId(),
+                    "cantidad": rng.randint(1, 5),
+                    "precio_unit": 1000,
+                }
+                for _ in range(items)
+            ],
+        }
+        for i in range(n)
+    ]
+    return {
+        "total": n,
+        "total_exact": False,
+        "skip": 0,
+        "limit": n,
+        "next_after": None,
+        "data": data,
+    }
+
+
+def time_render(render, payload: dict, runs: int):
+    render(payload)
+    tiempos = []
+    for _ in range(runs):
+        inicio = time.process_time()
+        body = render(payload)
+        tiempos.append((time.process_time() - inicio) * 1000)
+    return statistics.median(tiempos), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="api-mongo response serialization")
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--items", type=int, default=10, help="Items per order.")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    payloads = [
+        (f"products x{args.products}", products_payload(args.products, rng)),
+        (f"orders x{args.orders}", orders_payload(args.orders, args.items, rng)),
+    ]
+
+    print(
+        f"{'payload':>18} {'bytes':>10} {'before ms':>10} {'after ms':>10} {'ratio':>7}"
+    )
+    for nombre, payload in payloads:
+        before, size = time_render(render_before, payload, args.runs)
+        after, _ = time_render(render_after, payload, args.runs)
+        print(
+            f"{nombre:>18} {size:>10} {before:>10.1f} {after:>10.1f} {after / before:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
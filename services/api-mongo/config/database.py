@@ -1,44 +1,72 @@
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
 from dotenv import load_dotenv
+from fastapi import HTTPException, Request
 from typing import Generator
 import pyodbc
 import os
 
+from config.dw_pool import DWConnectionPool, PoolClosedError, PoolTimeoutError
+
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB = os.getenv("MONGO_DB")
 
+# DW connection pool
+MSSQL_DW_POOL_SIZE = int(os.getenv("MSSQL_DW_POOL_SIZE", "10"))
+MSSQL_DW_POOL_MIN = int(os.getenv("MSSQL_DW_POOL_MIN", "2"))
+MSSQL_DW_POOL_TIMEOUT = float(os.getenv("MSSQL_DW_POOL_TIMEOUT", "5"))
+MSSQL_DW_POOL_HEALTHCHECK = float(os.getenv("MSSQL_DW_POOL_HEALTHCHECK", "30"))
+
+
+def get_mongo_client() -> AsyncMongoClient:
+    return AsyncMongoClient(MONGO_URI)
+
 
-def get_mongo_client():
-    return MongoClient(MONGO_URI)
+def get_database(request: Request) -> AsyncDatabase:
+    """FastAPI dependency: database of the client shared in app.state."""
+    return request.app.state.mongo_client[MONGO_DB]
 
 
-def get_database():
-    client = get_mongo_client()
-    return client[MONGO_DB]
+def _mssql_connection_string() -> str:
+    server = os.getenv("MSSQL_DW_HOST", "localhost")
+    database = os.getenv("MSSQL_DW_DB", "your_database")
+    username = os.getenv("MSSQL_DW_USER", "your_username")
+    password = os.getenv("MSSQL_DW_PASS", "your_password")
+    port = os.getenv("MSSQL_DW_PORT", "1433")
+    driver = os.getenv("DB_DRIVER", "{ODBC Driver 18 for SQL Server}")
 
+    # TrustServerCertificate=yes is required for self-signed certificates
+    return f"DRIVER={driver};SERVER={server},{port};DATABASE={database};UID={username};PWD={password};TrustServerCertificate=yes"
 
-db = get_database()
+
+def connect_mssql() -> pyodbc.Connection:
+    return pyodbc.connect(_mssql_connection_string())
+
+
+def create_dw_pool() -> DWConnectionPool:
+    """Create the DW pool and pre-open its minimum connections."""
+    pool = DWConnectionPool(
+        connect_mssql,
+        max_size=MSSQL_DW_POOL_SIZE,
+        min_size=MSSQL_DW_POOL_MIN,
+        timeout=MSSQL_DW_POOL_TIMEOUT,
+        health_check_after=MSSQL_DW_POOL_HEALTHCHECK,
+    )
+    try:
+        pool.open()
+    except pyodbc.Error as e:
+        # The DW may come up after the API; connections are opened on demand
+        print(f"⚠️ No se pudo pre-abrir el pool del DW: {e}")
+    return pool
 
 
-def get_mssql_connection() -> Generator:
-    connection = None
+def get_mssql_connection(request: Request) -> Generator:
+    """FastAPI dependency: borrow a DW connection from the app pool."""
+    pool: DWConnectionPool = request.app.state.dw_pool
     try:
-        server = os.getenv("MSSQL_DW_HOST", "localhost")
-        database = os.getenv("MSSQL_DW_DB", "your_database")
-        username = os.getenv("MSSQL_DW_USER", "your_username")
-        password = os.getenv("MSSQL_DW_PASS", "your_password")
-        port = os.getenv("MSSQL_DW_PORT", "1433")
-        driver = os.getenv("DB_DRIVER", "{ODBC Driver 18 for SQL Server}")
-
-        # TrustServerCertificate=yes is required for self-signed certificates
-        connection_string = f"DRIVER={driver};SERVER={server},{port};DATABASE={database};UID={username};PWD={password};TrustServerCertificate=yes"
-
-        # Crear conexión
-        connection = pyodbc.connect(connection_string)
-        yield connection
-
-    finally:
-        if connection:
-            connection.close()
+        with pool.connection() as connection:
+            yield connection
+    except (PoolTimeoutError, PoolClosedError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
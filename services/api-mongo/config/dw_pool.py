@@ -0,0 +1,232 @@
+"""
+Bounded pool of pyodbc connections to the MSSQL data warehouse.
+
+Opening a connection to the DW costs a TLS handshake plus a login, which used
+to be paid on every recommendation request. The pool keeps up to `max_size`
+connections open, hands them out LIFO (the most recently used connection is
+the one most likely to still be alive), checks connections that sat idle for
+a while with a `SELECT 1` before reusing them, and records how long callers
+wait for a connection.
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+import pyodbc
+
+
+class PoolTimeoutError(Exception):
+    """No connection became available within the checkout timeout."""
+
+
+class PoolClosedError(Exception):
+    """The pool has been closed (application shutting down)."""
+
+
+class DWConnectionPool:
+    """
+    Thread-safe, bounded pool of DW connections.
+
+    Usage:
+        pool = DWConnectionPool(connect, max_size=10)
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+        pool.close()
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], pyodbc.Connection],
+        max_size: int = 10,
+        min_size: int = 0,
+        timeout: float = 5.0,
+        health_check_after: float = 30.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self._connect = connect
+        self.max_size = max_size
+        self.min_size = min(min_size, max_size)
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+
+        # Idle connections as (connection, last_used_monotonic)
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        # One permit per checked-out connection; new connections are only opened
+        # when no idle one is left, so the pool never exceeds max_size
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._size = 0
+
+        # Metrics
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._created = 0
+        self._discarded = 0
+        self._failed_health_checks = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def open(self) -> "DWConnectionPool":
+        """Pre-open `min_size` connections so the first requests find them warm."""
+        for _ in range(self.min_size):
+            conn = self._new_connection()
+            self._idle.put((conn, time.monotonic()))
+        return self
+
+    def close(self) -> None:
+        """Close every idle connection; connections in use close on release."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    # ------------------------------------------------------------------
+    # Checkout / release
+    # ------------------------------------------------------------------
+
+    def acquire(self, timeout: Optional[float] = None) -> pyodbc.Connection:
+        """Take a connection from the pool, waiting up to `timeout` seconds."""
+        if self._closed:
+            raise PoolClosedError("DW connection pool is closed")
+
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            if not self._slots.acquire(timeout=timeout):
+                with self._lock:
+                    self._timeouts += 1
+                raise PoolTimeoutError(
+                    f"No DW connection available after {timeout:.1f}s "
+                    f"(pool size {self.max_size})"
+                )
+            waited = time.monotonic() - start
+            with self._lock:
+                self._waits += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+        try:
+            conn = self._take_idle() or self._new_connection()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._checkouts += 1
+        return conn
+
+    def release(self, conn: pyodbc.Connection, discard: bool = False) -> None:
+        """Give a connection back; `discard=True` closes it instead of reusing it."""
+        try:
+            if discard or self._closed:
+                self._discard(conn)
+                return
+            try:
+                # Leave no open transaction behind for the next caller
+                conn.rollback()
+            except pyodbc.Error:
+                self._discard(conn)
+                return
+            self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[pyodbc.Connection]:
+        """
+        Context manager around acquire/release. If the caller fails, the
+        connection is only reused when it still answers a health check.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=not self._is_alive(conn))
+            raise
+        self.release(conn)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _take_idle(self) -> Optional[pyodbc.Connection]:
+        """Pop idle connections until one passes the health check."""
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - last_used < self.health_check_after:
+                return conn
+            if self._is_alive(conn):
+                return conn
+            with self._lock:
+                self._failed_health_checks += 1
+            self._discard(conn)
+
+    @staticmethod
+    def _is_alive(conn: pyodbc.Connection) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _new_connection(self) -> pyodbc.Connection:
+        conn = self._connect()
+        with self._lock:
+            self._size += 1
+            self._created += 1
+        return conn
+
+    def _discard(self, conn: pyodbc.Connection) -> None:
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._discarded += 1
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> dict:
+        """Snapshot of pool usage (sizes, checkouts and wait times)."""
+        with self._lock:
+            idle = self._idle.qsize()
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "closed": self._closed,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "wait_avg_ms": round(
+                    self._wait_total / self._waits * 1000 if self._waits else 0.0, 2
+                ),
+                "wait_max_ms": round(self._wait_max * 1000, 2),
+                "connections_created": self._created,
+                "connections_discarded": self._discarded,
+                "failed_health_checks": self._failed_health_checks,
+            }
@@ -0,0 +1,168 @@
+"""
+In-process cache for the DW recommendation lookups.
+
+analytics.AssociationRules only changes once per ETL run, but the stored
+procedures were called on every cart change. Results are cached per
+normalized basket (sorted, de-duplicated SKU or code list, which is all the
+procedures depend on) in an LRU with a TTL. The whole cache is dropped when
+MAX(GeneratedAt) of the rules table changes, i.e. when the ETL publishes a new
+rule set; the version is re-read at most every `version_check_interval`
+seconds. Every ETL load republishes the rules after staging
+stg.map_producto, so the code -> SKU mappings are invalidated along with them.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+import pyodbc
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "5000"))
+RECOMMENDATION_CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", "3600"))
+RECOMMENDATION_CACHE_VERSION_CHECK = float(
+    os.getenv("RECOMMENDATION_CACHE_VERSION_CHECK", "30")
+)
+# Number of frequent antecedents to preload at startup (0 disables warm-up)
+RECOMMENDATION_CACHE_WARMUP = int(os.getenv("RECOMMENDATION_CACHE_WARMUP", "0"))
+
+# Seek on IX_AR_GeneratedAt
+query_rules_version = "SELECT MAX(GeneratedAt) FROM analytics.AssociationRules"
+
+
+def normalize_basket(values: Iterable[str]) -> Tuple[str, ...]:
+    """Sorted, de-duplicated, trimmed values (same set the procedures use)."""
+    return tuple(sorted({v.strip() for v in values if v and v.strip()}))
+
+
+class RecommendationCache:
+    """
+    LRU + TTL cache invalidated by the version of the published rules.
+
+    Usage:
+        rules = recommendation_cache.get_or_load(
+            "consequents", skus, db_connection,
+            lambda skus_string: repository.get_consequents_by_skus(
+                db_connection, skus_string
+            ),
+        )
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RECOMMENDATION_CACHE_SIZE,
+        ttl: float = RECOMMENDATION_CACHE_TTL,
+        version_check_interval: float = RECOMMENDATION_CACHE_VERSION_CHECK,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+
+        # (namespace, basket) -> (expires_at_monotonic, value)
+        self._entries: "OrderedDict[tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[Any] = None
+        self._version_checked_at: Optional[float] = None
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get_or_load(
+        self,
+        namespace: str,
+        values: Iterable[str],
+        db_connection: pyodbc.Connection,
+        loader: Callable[[str], Any],
+    ) -> Any:
+        """
+        Cached result for the basket, or loader(",".join(basket)) on a miss.
+        `namespace` separates the different lookups sharing the cache.
+        """
+        self.check_version(db_connection)
+
+        key = (namespace, normalize_basket(values))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            version = self._version
+
+        value = loader(",".join(key[1]))
+        # Skip the store if a new rule set was published while loading
+        if version == self._version:
+            self.put(namespace, key[1], value)
+        return value
+
+    def put(self, namespace: str, values: Iterable[str], value: Any) -> None:
+        key = (namespace, normalize_basket(values))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def check_version(
+        self, db_connection: pyodbc.Connection, force: bool = False
+    ) -> None:
+        """Drop every entry if the rules table has been republished."""
+        now = time.monotonic()
+        if (
+            not force
+            and self._version_checked_at is not None
+            and now - self._version_checked_at < self.version_check_interval
+        ):
+            return
+
+        cursor = db_connection.cursor()
+        cursor.execute(query_rules_version)
+        row = cursor.fetchone()
+        cursor.close()
+        version = row[0] if row else None
+
+        with self._lock:
+            self._version_checked_at = now
+            if version != self._version:
+                if self._entries:
+                    self._invalidations += 1
+                self._entries.clear()
+                self._version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "rules_version": str(self._version) if self._version else None,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
+
+
+recommendation_cache = RecommendationCache()
@@ -0,0 +1,46 @@
+"""
+JSON response class for raw MongoDB documents.
+
+Documents used to be walked twice before being sent: once by a recursive
+`_convert` in each controller to turn ObjectId values into strings, and again
+by FastAPI's jsonable_encoder. Endpoints now return the documents untouched in
+a MongoJSONResponse, which serializes them in a single pass with orjson;
+ObjectId and Decimal128 go through the `default` hook, datetimes are handled
+natively (ISO 8601, same format as before).
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _default(value: Any) -> Any:
+    """Types orjson does not know about (only called for those)."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MongoJSONResponse(JSONResponse):
+    """
+    Usage (return the instance so FastAPI skips jsonable_encoder):
+        @router.get("/", response_class=MongoJSONResponse)
+        async def list_items(...):
+            return MongoJSONResponse(await Controller.get_all(db))
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,9 +1,13 @@
-from typing import Any
+from datetime import datetime
+from typing import Any, Optional
 from fastapi import HTTPException
+from pymongo.asynchronous.database import AsyncDatabase
 from bson import ObjectId as BsonObjectId
 from bson.errors import InvalidId
+from config.count_cache import ESTIMATED, EXACT, orders_count_cache
 from repositories.orders import orderRepository
 from schemas.orders import order
+from schemas.pagination import decode_cursor, encode_cursor
 
 # module-level repo (same as current)
 order_repository = orderRepository()
@@ -42,58 +46,82 @@ class OrdersController:
         return order_dict
 
     @staticmethod
-    def get_all_orders(skip: int = 0, limit: int = 10):
-        orders = order_repository.get_all(skip=skip, limit=limit)
-        total = order_repository.count()
+    def _parse_after(after: str):
+        fecha, order_id = decode_cursor(after)
+        try:
+            return datetime.fromisoformat(fecha), BsonObjectId(order_id)
+        except (InvalidId, TypeError, ValueError):
+            raise HTTPException(
+                status_code=400, detail="Invalid 'after' cursor"
+            ) from None
+
+    @staticmethod
+    async def _count_orders(db: AsyncDatabase, exact: bool) -> int:
+        """Cached total; estimated from metadata unless `exact` is requested."""
+        key = EXACT if exact else ESTIMATED
+        total = orders_count_cache.get(key)
+        if total is None:
+            if exact:
+                total = await order_repository.count(db)
+            else:
+                total = await order_repository.estimated_count(db)
+            orders_count_cache.set(key, total)
+        return total
 
-        # ensure any nested ObjectId values are converted to str
-        def _convert(o: Any):
-            if isinstance(o, BsonObjectId):
-                return str(o)
-            if isinstance(o, dict):
-                return {k: _convert(v) for k, v in o.items()}
-            if isinstance(o, list):
-                return [_convert(v) for v in o]
-            return o
+    @staticmethod
+    async def get_all_orders(
+        db: AsyncDatabase,
+        skip: int = 0,
+        limit: int = 10,
+        after: Optional[str] = None,
+        exact: bool = False,
+    ):
+        key = OrdersController._parse_after(after) if after else None
+        orders = await order_repository.get_all(db, skip=skip, limit=limit, after=key)
+        total = await OrdersController._count_orders(db, exact)
 
-        safe_orders = [_convert(doc) for doc in orders]
-        return {"total": total, "skip": skip, "limit": limit, "data": safe_orders}
+        # Cursor of the next page (None on the last page)
+        next_after = (
+            encode_cursor(orders[-1]["fecha"], orders[-1]["_id"])
+            if len(orders) == limit
+            else None
+        )
+        return {
+            "total": total,
+            "total_exact": exact,
+            "skip": skip,
+            "limit": limit,
+            "next_after": next_after,
+            "data": orders,
+        }
 
     @staticmethod
-    def get_order_by_id(order_id: str):
-        order = order_repository.get(order_id)
+    async def get_order_by_id(db: AsyncDatabase, order_id: str):
+        order = await order_repository.get(db, order_id)
         if not order:
             raise HTTPException(status_code=404, detail=f"order {order_id} not found")
 
-        # convert nested ObjectId values if any
-        def _convert(o: Any):
-            if isinstance(o, BsonObjectId):
-                return str(o)
-            if isinstance(o, dict):
-                return {k: _convert(v) for k, v in o.items()}
-            if isinstance(o, list):
-                return [_convert(v) for v in o]
-            return o
-
-        return _convert(order)
+        return order
 
     @staticmethod
-    def create_order(order_data: order):
+    async def create_order(db: AsyncDatabase, order_data: order):
         order_dict = OrdersController._prepare_payload(order_data.dict())
-        order_id = order_repository.create(order_dict)
+        order_id = await order_repository.create(db, order_dict)
+        orders_count_cache.adjust(+1)
         return {"order_id": order_id}
 
     @staticmethod
-    def update_order(order_id: str, order_data: order):
+    async def update_order(db: AsyncDatabase, order_id: str, order_data: order):
         order_dict = OrdersController._prepare_payload(order_data.dict())
-        success = order_repository.update(order_id, order_dict)
+        success = await order_repository.update(db, order_id, order_dict)
         if not success:
             raise HTTPException(status_code=404, detail=f"order {order_id} not found")
         return {"message": "order updated"}
 
     @staticmethod
-    def delete_order(order_id: str):
-        success = order_repository.delete(order_id)
+    async def delete_order(db: AsyncDatabase, order_id: str):
+        success = await order_repository.delete(db, order_id)
         if not success:
             raise HTTPException(status_code=404, detail=f"order {order_id} not found")
+        orders_count_cache.adjust(-1)
         return {"message": "order deleted"}
@@ -1,7 +1,8 @@
 from typing import Dict, List, Any
 from fastapi import HTTPException
-from bson import ObjectId as BsonObjectId
 import pyodbc
+from pymongo.asynchronous.database import AsyncDatabase
+from config.recommendation_cache import recommendation_cache
 from repositories.products import productsRepository
 
 # module-level repo (same as current)
@@ -10,42 +11,21 @@ products_repository = productsRepository()
 
 class ProductsController:
     @staticmethod
-    def get_all_products(skip: int = 0, limit: int = 10000):
-        products = products_repository.get_all(skip=skip, limit=limit)
+    async def get_all_products(db: AsyncDatabase, skip: int = 0, limit: int = 10000):
+        products = await products_repository.get_all(db, skip=skip, limit=limit)
         total = len(products)
 
-        # ensure any nested ObjectId values are converted to str
-        def _convert(o: Any):
-            if isinstance(o, BsonObjectId):
-                return str(o)
-            if isinstance(o, dict):
-                return {k: _convert(v) for k, v in o.items()}
-            if isinstance(o, list):
-                return [_convert(v) for v in o]
-            return o
-
-        safe_products = [_convert(doc) for doc in products]
-        return {"total": total, "skip": skip, "limit": limit, "data": safe_products}
+        return {"total": total, "skip": skip, "limit": limit, "data": products}
 
     @staticmethod
-    def get_product_by_id(product_id: str):
-        product = products_repository.get(product_id)
+    async def get_product_by_id(db: AsyncDatabase, product_id: str):
+        product = await products_repository.get(db, product_id)
         if not product:
             raise HTTPException(
                 status_code=404, detail=f"product {product_id} not found"
             )
 
-        # convert nested ObjectId values if any
-        def _convert(o: Any):
-            if isinstance(o, BsonObjectId):
-                return str(o)
-            if isinstance(o, dict):
-                return {k: _convert(v) for k, v in o.items()}
-            if isinstance(o, list):
-                return [_convert(v) for v in o]
-            return o
-
-        return _convert(product)
+        return product
 
     @staticmethod
     def get_consequents_by_skus(
@@ -59,9 +39,14 @@ class ProductsController:
             if not skus_string.strip():
                 return {"rules": [], "count": 0}
 
-            # Ejecutar stored procedure PASANDO ambos parámetros
-            rules = products_repository.get_consequents_by_skus(
-                db_connection, skus_string
+            # Misma canasta (en cualquier orden) -> misma entrada de caché
+            rules = recommendation_cache.get_or_load(
+                "consequents",
+                skus,
+                db_connection,
+                lambda canasta: products_repository.get_consequents_by_skus(
+                    db_connection, canasta
+                ),
             )
 
             return {"rules": rules, "count": len(rules)}
@@ -84,11 +69,31 @@ class ProductsController:
                     "count": 0,
                 }  # Corregido: retornar estructura consistente
 
-            mappings = products_repository.get_skus_by_codigos_mongo(
-                db_connection, codigos_string
+            mappings = recommendation_cache.get_or_load(
+                "codigos",
+                codigos_mongo,
+                db_connection,
+                lambda codigos: products_repository.get_skus_by_codigos_mongo(
+                    db_connection, codigos
+                ),
             )
 
             return {"mappings": mappings, "count": len(mappings)}
 
         except Exception as e:
             raise Exception(f"Error al obtener SKUs: {str(e)}")
+
+    @staticmethod
+    def warm_up_recommendations(db_connection: pyodbc.Connection, top_n: int) -> int:
+        """Preload the cache with the `top_n` most frequent antecedents."""
+        antecedents = products_repository.get_top_antecedents(db_connection, top_n)
+        for antecedent in antecedents:
+            recommendation_cache.get_or_load(
+                "consequents",
+                antecedent.split(","),
+                db_connection,
+                lambda canasta: products_repository.get_consequents_by_skus(
+                    db_connection, canasta
+                ),
+            )
+        return len(antecedents)
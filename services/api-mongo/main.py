@@ -1,7 +1,13 @@
 import os
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from config.database import get_mongo_client, get_mssql_connection
+from config.database import create_dw_pool, get_mongo_client
+from config.recommendation_cache import (
+    RECOMMENDATION_CACHE_WARMUP,
+    recommendation_cache,
+)
+from controllers.products import ProductsController
 
 from routers.orders import router as orders_router
 from routers.clients import router as clients_router
@@ -21,11 +27,27 @@ app.add_middleware(
 )
 
 
+def _warm_up_recommendations(dw_pool) -> int:
+    with dw_pool.connection() as connection:
+        return ProductsController.warm_up_recommendations(
+            connection, RECOMMENDATION_CACHE_WARMUP
+        )
+
+
 @app.on_event("startup")
 async def startup_event():
-    # initialize and store mongo client for reuse
+    # shared async mongo client (see config.database.get_database)
     app.state.mongo_client = get_mongo_client()
-    app.state.mssql_connection = get_mssql_connection()
+    # bounded pool of DW connections for the recommendation endpoints
+    app.state.dw_pool = await run_in_threadpool(create_dw_pool)
+    if RECOMMENDATION_CACHE_WARMUP > 0:
+        try:
+            cargadas = await run_in_threadpool(
+                _warm_up_recommendations, app.state.dw_pool
+            )
+            print(f"✅ Caché de recomendaciones precargada con {cargadas} canastas")
+        except Exception as e:
+            print(f"⚠️ No se pudo precargar la caché de recomendaciones: {e}")
 
 
 @app.on_event("shutdown")
@@ -33,13 +55,13 @@ async def shutdown_event():
     client = getattr(app.state, "mongo_client", None)
     if client:
         try:
-            client.close()
+            await client.close()
         except Exception:
             pass
-    mssql_connection = getattr(app.state, "mssql_connection", None)
-    if mssql_connection:
+    dw_pool = getattr(app.state, "dw_pool", None)
+    if dw_pool:
         try:
-            mssql_connection.close()
+            dw_pool.close()
         except Exception:
             pass
 
@@ -55,6 +77,16 @@ async def root():
     return {"message": "Ready MongoDB"}
 
 
+@app.get("/health/dw-pool")
+async def dw_pool_metrics():
+    return app.state.dw_pool.metrics()
+
+
+@app.get("/health/recommendation-cache")
+async def recommendation_cache_stats():
+    return recommendation_cache.stats()
+
+
 def run_dev():
     import uvicorn
 
@@ -1,29 +1,29 @@
 from typing import List, Optional
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
-from config.database import db
+from pymongo.asynchronous.database import AsyncDatabase
 
 
-clients_collection = db["clientes"]
+CLIENTS_COLLECTION = "clientes"
 
 
 class clientsRepository:
     @staticmethod
-    def get(cliente_id: str) -> Optional[dict]:
+    async def get(db: AsyncDatabase, cliente_id: str) -> Optional[dict]:
         obj = _parse_objectid(cliente_id)
         if obj is None:
             return None
-        data = clients_collection.find_one({"_id": obj})
+        data = await db[CLIENTS_COLLECTION].find_one({"_id": obj})
         if data:
             data["_id"] = str(data["_id"])
             return data
         return None
 
     @staticmethod
-    def get_all() -> List[dict]:
+    async def get_all(db: AsyncDatabase) -> List[dict]:
         clients = []
-        cursor = clients_collection.find()
-        for doc in cursor:
+        cursor = db[CLIENTS_COLLECTION].find()
+        async for doc in cursor:
             doc["_id"] = str(doc["_id"])
             clients.append(doc)
         return clients
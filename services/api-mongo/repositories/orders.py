@@ -1,55 +1,88 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Tuple
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
-from config.database import db
+from pymongo.asynchronous.database import AsyncDatabase
 
-orders_collection = db["ordenes"]
+ORDERS_COLLECTION = "ordenes"
+
+# Listing order; backed by the {fecha: -1, _id: -1} index
+ORDERS_SORT = [("fecha", -1), ("_id", -1)]
 
 
 class orderRepository:
     @staticmethod
-    def create(order_data: dict) -> str:
-        result = orders_collection.insert_one(order_data)
+    async def create(db: AsyncDatabase, order_data: dict) -> str:
+        result = await db[ORDERS_COLLECTION].insert_one(order_data)
         return str(result.inserted_id)
 
     @staticmethod
-    def get(order_id: str) -> Optional[dict]:
+    async def get(db: AsyncDatabase, order_id: str) -> Optional[dict]:
         obj = _parse_objectid(order_id)
         if obj is None:
             return None
-        data = orders_collection.find_one({"_id": obj})
+        data = await db[ORDERS_COLLECTION].find_one({"_id": obj})
         if data:
             data["_id"] = str(data["_id"])
             return data
         return None
 
     @staticmethod
-    def get_all(skip: int = 0, limit: int = 10) -> List[dict]:
+    async def get_all(
+        db: AsyncDatabase,
+        skip: int = 0,
+        limit: int = 10,
+        after: Optional[Tuple[datetime, ObjectId]] = None,
+    ) -> List[dict]:
+        """
+        Orders newest first. With `after` (fecha, _id of the last order seen)
+        the page starts right after it with an index range; otherwise `skip`
+        is applied.
+        """
         orders = []
-        cursor = orders_collection.find().skip(skip).limit(limit)
-        for doc in cursor:
+        if after is not None:
+            fecha, oid = after
+            query = {
+                "$or": [
+                    {"fecha": {"$lt": fecha}},
+                    {"fecha": fecha, "_id": {"$lt": oid}},
+                ]
+            }
+            cursor = db[ORDERS_COLLECTION].find(query).sort(ORDERS_SORT).limit(limit)
+        else:
+            cursor = (
+                db[ORDERS_COLLECTION].find().sort(ORDERS_SORT).skip(skip).limit(limit)
+            )
+        async for doc in cursor:
             doc["_id"] = str(doc["_id"])
             orders.append(doc)
         return orders
 
     @staticmethod
-    def count(filter_query: Optional[dict] = None) -> int:
-        return orders_collection.count_documents(filter_query or {})
+    async def count(db: AsyncDatabase, filter_query: Optional[dict] = None) -> int:
+        return await db[ORDERS_COLLECTION].count_documents(filter_query or {})
+
+    @staticmethod
+    async def estimated_count(db: AsyncDatabase) -> int:
+        """Total from collection metadata (no scan)."""
+        return await db[ORDERS_COLLECTION].estimated_document_count()
 
     @staticmethod
-    def update(order_id: str, update_data: dict) -> bool:
+    async def update(db: AsyncDatabase, order_id: str, update_data: dict) -> bool:
         obj = _parse_objectid(order_id)
         if obj is None:
             return False
-        result = orders_collection.update_one({"_id": obj}, {"$set": update_data})
+        result = await db[ORDERS_COLLECTION].update_one(
+            {"_id": obj}, {"$set": update_data}
+        )
         return result.modified_count > 0
 
     @staticmethod
-    def delete(order_id: str) -> bool:
+    async def delete(db: AsyncDatabase, order_id: str) -> bool:
         obj = _parse_objectid(order_id)
         if obj is None:
             return False
-        result = orders_collection.delete_one({"_id": obj})
+        result = await db[ORDERS_COLLECTION].delete_one({"_id": obj})
         return result.deleted_count > 0
 
 
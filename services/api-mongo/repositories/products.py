@@ -2,28 +2,30 @@ from typing import List, Optional, Dict, Any
 import pyodbc
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
-from config.database import db
+from pymongo.asynchronous.database import AsyncDatabase
 
-products_collection = db["productos"]
+PRODUCTS_COLLECTION = "productos"
 
 
 class productsRepository:
     @staticmethod
-    def get(product_id: str) -> Optional[dict]:
+    async def get(db: AsyncDatabase, product_id: str) -> Optional[dict]:
         obj = _parse_objectid(product_id)
         if obj is None:
             return None
-        data = products_collection.find_one({"_id": obj})
+        data = await db[PRODUCTS_COLLECTION].find_one({"_id": obj})
         if data:
             data["_id"] = str(data["_id"])
             return data
         return None
 
     @staticmethod
-    def get_all(skip: int = 0, limit: int = 10000) -> List[dict]:
+    async def get_all(
+        db: AsyncDatabase, skip: int = 0, limit: int = 10000
+    ) -> List[dict]:
         products = []
-        cursor = products_collection.find().skip(skip).limit(limit)
-        for doc in cursor:
+        cursor = db[PRODUCTS_COLLECTION].find().skip(skip).limit(limit)
+        async for doc in cursor:
             doc["_id"] = str(doc["_id"])
             products.append(doc)
         return products
@@ -60,6 +62,27 @@ class productsRepository:
         except Exception as e:
             raise Exception(f"Error inesperado: {str(e)}")
 
+    @staticmethod
+    def get_top_antecedents(db_connection: pyodbc.Connection, limit: int) -> List[str]:
+        """Antecedents of the strongest rules, used to warm up the cache."""
+        try:
+            cursor = db_connection.cursor()
+            cursor.execute(
+                """
+                SELECT TOP (?) Antecedent
+                FROM analytics.AssociationRules
+                GROUP BY Antecedent
+                ORDER BY MAX(Support) DESC
+                """,
+                limit,
+            )
+            antecedents = [row.Antecedent for row in cursor.fetchall()]
+            cursor.close()
+            return antecedents
+
+        except pyodbc.Error as e:
+            raise Exception(f"Error obteniendo antecedentes: {str(e)}")
+
     @staticmethod
     def get_skus_by_codigos_mongo(
         db_connection: pyodbc.Connection, skus_list: str
@@ -1,16 +1,23 @@
 from typing import Any
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from pymongo.asynchronous.database import AsyncDatabase
+from config.database import get_database
+from config.responses import MongoJSONResponse
 from controllers.clients import clientsController
 
 
 router = APIRouter(prefix="/clients", tags=["Clients"])
 
 
-@router.get("/", summary="List clients")
-def list_clients() -> Any:
-    return clientsController.get_all_clients()
+@router.get("/", summary="List clients", response_class=MongoJSONResponse)
+async def list_clients(db: AsyncDatabase = Depends(get_database)) -> Any:
+    return MongoJSONResponse(await clientsController.get_all_clients(db))
 
 
-@router.get("/{cliente_id}", summary="Get client by id")
-def get_cliente(cliente_id: str) -> Any:
-    return clientsController.get_cliente_by_id(cliente_id)
+@router.get(
+    "/{cliente_id}", summary="Get client by id", response_class=MongoJSONResponse
+)
+async def get_cliente(
+    cliente_id: str, db: AsyncDatabase = Depends(get_database)
+) -> Any:
+    return MongoJSONResponse(await clientsController.get_cliente_by_id(db, cliente_id))
@@ -1,5 +1,8 @@
-from typing import Any
-from fastapi import APIRouter, status
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, Query, status
+from pymongo.asynchronous.database import AsyncDatabase
+from config.database import get_database
+from config.responses import MongoJSONResponse
 from controllers.orders import OrdersController
 from schemas.orders import order
 
@@ -7,26 +10,42 @@ from schemas.orders import order
 router = APIRouter(prefix="/order", tags=["Order"])
 
 
-@router.get("/", summary="List orders")
-def list_orders(skip: int = 0, limit: int = 10) -> Any:
-    return OrdersController.get_all_orders(skip=skip, limit=limit)
+@router.get("/", summary="List orders", response_class=MongoJSONResponse)
+async def list_orders(
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[str] = Query(
+        None, description="Cursor `next_after` of the previous page (ignores skip)"
+    ),
+    exact: bool = Query(False, description="Exact total instead of the estimate"),
+    db: AsyncDatabase = Depends(get_database),
+) -> Any:
+    return MongoJSONResponse(
+        await OrdersController.get_all_orders(
+            db, skip=skip, limit=limit, after=after, exact=exact
+        )
+    )
 
 
-@router.get("/{order_id}", summary="Get order by id")
-def get_order(order_id: str) -> Any:
-    return OrdersController.get_order_by_id(order_id)
+@router.get("/{order_id}", summary="Get order by id", response_class=MongoJSONResponse)
+async def get_order(order_id: str, db: AsyncDatabase = Depends(get_database)) -> Any:
+    return MongoJSONResponse(await OrdersController.get_order_by_id(db, order_id))
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, summary="Create order")
-def post_order(order: order) -> Any:
-    return OrdersController.create_order(order)
+async def post_order(order: order, db: AsyncDatabase = Depends(get_database)) -> Any:
+    return await OrdersController.create_order(db, order)
 
 
 @router.put("/{order_id}", summary="Update order")
-def put_order(order_id: str, order: order) -> Any:
-    return OrdersController.update_order(order_id, order)
+async def put_order(
+    order_id: str, order: order, db: AsyncDatabase = Depends(get_database)
+) -> Any:
+    return await OrdersController.update_order(db, order_id, order)
 
 
 @router.delete("/{order_id}", summary="Delete order")
-def delete_order_route(order_id: str) -> Any:
-    return OrdersController.delete_order(order_id)
+async def delete_order_route(
+    order_id: str, db: AsyncDatabase = Depends(get_database)
+) -> Any:
+    return await OrdersController.delete_order(db, order_id)
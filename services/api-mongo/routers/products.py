@@ -1,16 +1,23 @@
 from typing import Any
 from fastapi import APIRouter, Query, Depends
+from fastapi.concurrency import run_in_threadpool
+from pymongo.asynchronous.database import AsyncDatabase
 import pyodbc
-from config.database import get_mssql_connection
+from config.database import get_database, get_mssql_connection
+from config.responses import MongoJSONResponse
 from controllers.products import ProductsController
 
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
 
-@router.get("/", summary="List products")
-def list_products(skip: int = 0, limit: int = 10000) -> Any:
-    return ProductsController.get_all_products(skip=skip, limit=limit)
+@router.get("/", summary="List products", response_class=MongoJSONResponse)
+async def list_products(
+    skip: int = 0, limit: int = 10000, db: AsyncDatabase = Depends(get_database)
+) -> Any:
+    return MongoJSONResponse(
+        await ProductsController.get_all_products(db, skip=skip, limit=limit)
+    )
 
 
 @router.get("/by-skus")
@@ -21,7 +28,10 @@ async def get_consequents_by_skus_endpoint(
     # Convertir el string de SKUs separados por coma a lista
     skus_list = [sku.strip() for sku in skus.split(",") if sku.strip()]
 
-    return ProductsController.get_consequents_by_skus(skus_list, db_connection)
+    # pyodbc es bloqueante: se ejecuta fuera del event loop
+    return await run_in_threadpool(
+        ProductsController.get_consequents_by_skus, skus_list, db_connection
+    )
 
 
 @router.get("/by-codigos-mongo")
@@ -31,9 +41,15 @@ async def get_products_by_codigos_mongo_endpoint(
 ) -> Any:
     # Convertir el string de SKUs separados por coma a lista
     skus_list = [sku.strip() for sku in skus.split(",") if sku.strip()]
-    return ProductsController.get_skus_by_codigos_mongo(skus_list, db_connection)
+    return await run_in_threadpool(
+        ProductsController.get_skus_by_codigos_mongo, skus_list, db_connection
+    )
 
 
-@router.get("/{product_id}", summary="Get product by id")
-def get_product(product_id: str) -> Any:
-    return ProductsController.get_product_by_id(product_id)
+@router.get(
+    "/{product_id}", summary="Get product by id", response_class=MongoJSONResponse
+)
+async def get_product(
+    product_id: str, db: AsyncDatabase = Depends(get_database)
+) -> Any:
+    return MongoJSONResponse(await ProductsController.get_product_by_id(db, product_id))
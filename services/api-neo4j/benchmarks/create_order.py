@@ -0,0 +1,161 @@
+"""
+Create-order latency with toString() id matching vs indexed equality.
+
+Loads a synthetic catalog of `--products` :Producto nodes (ids 'BENCH-P000001'
+...) plus one :Cliente into the configured Neo4j, then times the order-creation
+query in both forms. Every timed order is created inside a transaction that is
+rolled back, so the only data written is the catalog, which is deleted at the
+end unless --keep is given.
+
+Usage (from services/api-neo4j, with NEO4J_* in .env):
+    uv run python -m benchmarks.create_order
+    uv run python -m benchmarks.create_order --products 100000 --items 5 --runs 50
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from config.database import get_neo4j_driver
+from repositories.orders import OrderRepository, createOrderQuery
+
+PREFIX = "BENCH-"
+BATCH_SIZE = 5_000
+
+# Previous form: the function call on the property rules out the index
+createOrderToStringQuery = """
+MATCH (c:Cliente)
+WHERE toString(c.id) = toString($cliente_id)
+CREATE (o:Orden {
+    id: $id,
+    fecha: datetime($fecha),
+    canal: $canal,
+    moneda: $moneda,
+    total: $total
+})
+CREATE (c)-[:REALIZO]->(o)
+WITH o, $items AS items
+UNWIND items AS item
+MATCH (p:Producto)
+WHERE toString(p.id) = toString(item.producto_id)
+CREATE (o)-[:CONTIENE {
+    cantidad: item.cantidad,
+    precio_unit: item.precio_unit
+}]->(p)
+RETURN DISTINCT o.id AS orden_id;
+"""
+
+createProductsQuery = """
+UNWIND $ids AS pid
+CREATE (:Producto {id: pid, nombre: 'Producto ' + pid, sku: pid})
+"""
+
+deleteBenchQuery = """
+MATCH (n)
+WHERE (n:Producto OR n:Cliente) AND n.id STARTS WITH $prefix
+CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+"""
+
+
+def product_id(i: int) -> str:
+    return f"{PREFIX}P{i:06d}"
+
+
+def seed(driver, n_products: int) -> None:
+    # createOrderQuery takes its id from the order sequence
+    OrderRepository.ensure_order_sequence()
+    with driver.session() as session:
+        session.run(
+            "MERGE (:Cliente {id: $id, nombre: 'Cliente benchmark', genero: 'Otro', pais: 'CR'})",
+            id=f"{PREFIX}C1",
+        ).consume()
+        for start in range(0, n_products, BATCH_SIZE):
+            ids = [
+                product_id(i) for i in range(start, min(start + BATCH_SIZE, n_products))
+            ]
+            session.run(createProductsQuery, ids=ids).consume()
+            print(
+                f"\r    productos: {start + len(ids):,}/{n_products:,}",
+                end="",
+                flush=True,
+            )
+    print()
+
+
+def cleanup(driver) -> None:
+    with driver.session() as session:
+        session.run(deleteBenchQuery, prefix=PREFIX).consume()
+
+
+def time_query(driver, query: str, n_products: int, n_items: int, runs: int):
+    """Latencies (ms) of `runs` order creations, each rolled back."""
+    rng = random.Random(42)
+    latencias = []
+    with driver.session() as session:
+        for run in range(runs):
+            items = [
+                {
+                    "producto_id": product_id(rng.randrange(n_products)),
+                    "cantidad": 1,
+                    "precio_unit": 1000,
+                }
+                for _ in range(n_items)
+            ]
+            params = {
+                "id": f"{PREFIX}O{run:06d}",
+                "cliente_id": f"{PREFIX}C1",
+                "fecha": "2025-01-01T00:00:00",
+                "canal": "WEB",
+                "moneda": "CRC",
+                "total": 1000 * n_items,
+                "items": items,
+            }
+            tx = session.begin_transaction()
+            inicio = time.perf_counter()
+            tx.run(query, **params).consume()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            tx.rollback()
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neo4j create-order latency")
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=5, help="Items per order.")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the synthetic catalog."
+    )
+    parser.add_argument(
+        "--skip-seed", action="store_true", help="Reuse a kept catalog."
+    )
+    args = parser.parse_args()
+
+    driver = get_neo4j_driver()
+    try:
+        if not args.skip_seed:
+            seed(driver, args.products)
+
+        print(f"{'query':>10} {'runs':>5} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for nombre, query in (
+            ("equality", createOrderQuery),
+            ("toString", createOrderToStringQuery),
+        ):
+            # First call warms up the plan cache
+            time_query(driver, query, args.products, args.items, 1)
+            lat = sorted(
+                time_query(driver, query, args.products, args.items, args.runs)
+            )
+            p99 = lat[min(len(lat) - 1, round(0.99 * (len(lat) - 1)))]
+            print(
+                f"{nombre:>10} {len(lat):>5} {statistics.median(lat):>9.1f} {p99:>9.1f} {lat[-1]:>9.1f}"
+            )
+    finally:
+        if not args.keep:
+            cleanup(driver)
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
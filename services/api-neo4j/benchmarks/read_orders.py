@@ -0,0 +1,198 @@
+"""
+Order read cost with one row per item vs items collected per order.
+
+Creates `--orders` synthetic orders of 1, 10 and 100 items (ids 'BENCH-...')
+in the configured Neo4j and times reading each group by id in two forms: the
+previous flat query (one row per item, rebuilt into orders in Python) and the
+current readOrderByIdQuery (one row per order, items nested with collect()).
+Reports latency, rows received and the size of the resulting JSON. The
+synthetic data is deleted at the end unless --keep is given.
+
+Usage (from services/api-neo4j, with NEO4J_* in .env):
+    uv run python -m benchmarks.read_orders
+    uv run python -m benchmarks.read_orders --orders 50 --runs 30
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from config.database import get_neo4j_driver
+from repositories.orders import readOrderByIdQuery
+
+PREFIX = "BENCH-"
+ITEM_COUNTS = (1, 10, 100)
+
+# Previous form: client and order columns repeated on every item row
+readOrderByIdFlatQuery = """
+MATCH (c:Cliente)-[:REALIZO]->(o:Orden {id: $id})-[r:CONTIENE]->(p:Producto)-[:PERTENECE_A]->(cat:Categoria)
+RETURN
+  o.id AS orden_id,
+  o.fecha AS fecha,
+  o.canal AS canal,
+  o.moneda AS moneda,
+  o.total AS total,
+  c.id AS cliente_id,
+  c.nombre AS cliente_nombre,
+  c.genero AS genero,
+  c.pais AS pais,
+  p.id AS producto_id,
+  p.nombre AS producto_nombre,
+  cat.id AS categoria_id,
+  cat.nombre AS categoria,
+  r.cantidad AS cantidad,
+  r.precio_unit AS precio_unit,
+  (r.cantidad * r.precio_unit) AS subtotal
+"""
+
+seedCatalogQuery = """
+MERGE (cat:Categoria {id: $prefix + 'CAT'})
+  ON CREATE SET cat.nombre = 'Categoria benchmark'
+MERGE (:Cliente {id: $prefix + 'C1', nombre: 'Cliente benchmark', genero: 'Otro', pais: 'CR'})
+WITH cat
+UNWIND range(1, $n_products) AS i
+CREATE (p:Producto {id: $prefix + 'P' + toString(i), nombre: 'Producto ' + toString(i)})
+CREATE (p)-[:PERTENECE_A]->(cat)
+"""
+
+seedOrdersQuery = """
+MATCH (c:Cliente {id: $prefix + 'C1'})
+UNWIND $order_ids AS oid
+CREATE (o:Orden {id: oid, fecha: datetime('2025-01-01T00:00:00'), canal: 'WEB', moneda: 'CRC', total: 1000 * $n_items})
+CREATE (c)-[:REALIZO]->(o)
+WITH o
+UNWIND range(1, $n_items) AS i
+MATCH (p:Producto {id: $prefix + 'P' + toString(i)})
+CREATE (o)-[:CONTIENE {cantidad: 1, precio_unit: 1000}]->(p)
+"""
+
+deleteBenchQuery = """
+MATCH (n)
+WHERE (n:Orden OR n:Producto OR n:Cliente OR n:Categoria) AND n.id STARTS WITH $prefix
+CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+"""
+
+
+def order_id(n_items: int, i: int) -> str:
+    return f"{PREFIX}O{n_items:03d}-{i:04d}"
+
+
+def seed(driver, n_orders: int) -> None:
+    with driver.session() as session:
+        session.run(
+            seedCatalogQuery, prefix=PREFIX, n_products=max(ITEM_COUNTS)
+        ).consume()
+        for n_items in ITEM_COUNTS:
+            session.run(
+                seedOrdersQuery,
+                prefix=PREFIX,
+                order_ids=[order_id(n_items, i) for i in range(n_orders)],
+                n_items=n_items,
+            ).consume()
+
+
+def cleanup(driver) -> None:
+    with driver.session() as session:
+        session.run(deleteBenchQuery, prefix=PREFIX).consume()
+
+
+def rebuild_flat(rows):
+    """What the controller used to do with the flat rows."""
+    order = None
+    for row in rows:
+        if order is None:
+            order = {
+                "id": row["orden_id"],
+                "fecha": row["fecha"],
+                "canal": row["canal"],
+                "moneda": row["moneda"],
+                "total": row["total"],
+                "cliente": {
+                    "id": row["cliente_id"],
+                    "nombre": row["cliente_nombre"],
+                    "genero": row["genero"],
+                    "pais": row["pais"],
+                },
+                "items": [],
+            }
+        order["items"].append(
+            {
+                k: row[k]
+                for k in (
+                    "producto_id",
+                    "producto_nombre",
+                    "categoria_id",
+                    "categoria",
+                    "cantidad",
+                    "precio_unit",
+                    "subtotal",
+                )
+            }
+        )
+    return order
+
+
+def read_flat(session, oid):
+    rows = [record.data() for record in session.run(readOrderByIdFlatQuery, id=oid)]
+    return rebuild_flat(rows), len(rows)
+
+
+def read_nested(session, oid):
+    rows = [record.data() for record in session.run(readOrderByIdQuery, id=oid)]
+    return rows[0], len(rows)
+
+
+def time_reader(driver, reader, n_items: int, n_orders: int, runs: int):
+    """(latencies ms, rows per order, JSON bytes per order)."""
+    latencias = []
+    rows = size = 0
+    with driver.session() as session:
+        reader(session, order_id(n_items, 0))  # plan cache
+        for run in range(runs):
+            oid = order_id(n_items, run % n_orders)
+            inicio = time.perf_counter()
+            order, rows = reader(session, oid)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            size = len(json.dumps(order, default=str))
+    return latencias, rows, size
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Neo4j order read: flat rows vs collect()"
+    )
+    parser.add_argument("--orders", type=int, default=20, help="Orders per item count.")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the synthetic orders."
+    )
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse kept orders.")
+    args = parser.parse_args()
+
+    driver = get_neo4j_driver()
+    try:
+        if not args.skip_seed:
+            seed(driver, args.orders)
+
+        print(
+            f"{'items':>5} {'query':>8} {'rows':>5} {'json B':>8} {'p50 ms':>8} {'p99 ms':>8}"
+        )
+        for n_items in ITEM_COUNTS:
+            for nombre, reader in (("flat", read_flat), ("collect", read_nested)):
+                lat, rows, size = time_reader(
+                    driver, reader, n_items, args.orders, args.runs
+                )
+                lat.sort()
+                p99 = lat[min(len(lat) - 1, round(0.99 * (len(lat) - 1)))]
+                print(
+                    f"{n_items:>5} {nombre:>8} {rows:>5} {size:>8} {statistics.median(lat):>8.2f} {p99:>8.2f}"
+                )
+    finally:
+        if not args.keep:
+            cleanup(driver)
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
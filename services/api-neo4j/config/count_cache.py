@@ -0,0 +1,70 @@
+"""
+Short-lived cache for the order totals returned by the list endpoints.
+
+Every page used to recompute the total of the collection. Totals are now read
+from cheap metadata by default (estimated counts) or computed exactly on
+request, and kept here for a few seconds under an "estimated"/"exact" key. The
+API's own writes are applied to the cached values (write-through), so a client
+that creates or deletes an order sees the total change immediately; writes
+made by other processes show up when the entry expires.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ORDERS_COUNT_TTL = float(os.getenv("ORDERS_COUNT_TTL", "30"))
+
+ESTIMATED = "estimated"
+EXACT = "exact"
+
+
+class CountCache:
+    """
+    Usage:
+        total = orders_count_cache.get(EXACT)
+        if total is None:
+            total = compute_exact_count()
+            orders_count_cache.set(EXACT, total)
+        ...
+        orders_count_cache.adjust(+1)   # after creating an order
+    """
+
+    def __init__(self, ttl: float = ORDERS_COUNT_TTL):
+        self.ttl = ttl
+        # key -> (expires_at_monotonic, value)
+        self._values: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key: str, value: int) -> None:
+        with self._lock:
+            self._values[key] = (time.monotonic() + self.ttl, value)
+
+    def adjust(self, delta: int) -> None:
+        """Apply a write made through this API to every cached total."""
+        with self._lock:
+            for key, (expires_at, value) in self._values.items():
+                self._values[key] = (expires_at, max(value + delta, 0))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+orders_count_cache = CountCache()
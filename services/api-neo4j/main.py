@@ -3,6 +3,7 @@ import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from config.database import get_neo4j_driver
+from repositories.orders import OrderRepository
 from routes.orders import router as orders_router
 from routes.clients import router as clients_router
 from routes.products import router as products_router
@@ -34,6 +35,9 @@ async def startup_event():
     app.state.neo4j_driver = get_neo4j_driver()
     app.state.neo4j_driver.verify_connectivity()
     print("Connection established.")
+    # contador atómico de ids de orden (se crea una sola vez)
+    valor = OrderRepository.ensure_order_sequence()
+    print(f"Order sequence ready (last: {valor}).")
 
 
 @app.on_event("shutdown")
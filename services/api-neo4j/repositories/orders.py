@@ -9,12 +9,26 @@ logger = logging.getLogger(__name__)
 # CRUD Queries
 # --------------------------------------------------
 
-# Queries actualizadas para retornar valores simples
+# Queries actualizadas para retornar valores simples.
+# Los ids de Cliente/Producto son strings (normalizados en el controller con
+# _normalize_id) y se comparan por igualdad, así los MATCH usan los índices de
+# las constraints cliente_id / producto_id en lugar de recorrer la etiqueta.
+#
+# El id de la orden sale del nodo (:Secuencia {nombre: 'orden'}), que se
+# incrementa en la misma transacción que crea la orden: el SET toma un lock de
+# escritura sobre el nodo, así que dos creaciones concurrentes nunca obtienen
+# el mismo número.
 createOrderQuery = """
-MATCH (c:Cliente)
-WHERE toString(c.id) = toString($cliente_id)
+MATCH (c:Cliente {id: $cliente_id})
+MATCH (seq:Secuencia {nombre: 'orden'})
+SET seq.valor = seq.valor + 1
+WITH c, toString(seq.valor) AS numero
+WITH c, 'ORD-' + CASE
+    WHEN size(numero) >= 6 THEN numero
+    ELSE substring('000000', size(numero)) + numero
+END AS orden_id
 CREATE (o:Orden {
-    id: $id,
+    id: orden_id,
     fecha: datetime($fecha),
     canal: $canal,
     moneda: $moneda,
@@ -23,8 +37,7 @@ CREATE (o:Orden {
 CREATE (c)-[:REALIZO]->(o)
 WITH o, $items AS items
 UNWIND items AS item
-MATCH (p:Producto)
-WHERE toString(p.id) = toString(item.producto_id)
+MATCH (p:Producto {id: item.producto_id})
 CREATE (o)-[:CONTIENE {
     cantidad: item.cantidad,
     precio_unit: item.precio_unit
@@ -33,8 +46,7 @@ RETURN DISTINCT o.id AS orden_id;
 """
 
 updateOrderRelationshipsQuery = """
-MATCH (c:Cliente)
-WHERE toString(c.id) = toString($cliente_id)
+MATCH (c:Cliente {id: $cliente_id})
 OPTIONAL MATCH (old:Orden {id: $id})
 DETACH DELETE old
 
@@ -48,8 +60,7 @@ CREATE (o:Orden {
 CREATE (c)-[:REALIZO]->(o)
 WITH o, $items AS items
 UNWIND items AS item
-MATCH (p:Producto)
-WHERE toString(p.id) = toString(item.producto_id)
+MATCH (p:Producto {id: item.producto_id})
 CREATE (o)-[:CONTIENE {
     cantidad: item.cantidad,
     precio_unit: item.precio_unit
@@ -57,86 +68,109 @@ CREATE (o)-[:CONTIENE {
 RETURN DISTINCT o.id AS orden_id;
 """
 
-readOrdersQuery = """
-MATCH (c:Cliente)-[:REALIZO]->(o:Orden)
-WITH c, o
-ORDER BY o.fecha ASC
-SKIP $skip
-LIMIT $limit
+# Orders are listed by (fecha, id) ascending, backed by the orden_fecha_id index.
+# The page is cut on Orden alone and the client/items are matched afterwards.
+# Each row is one order with its client and items already nested (collect),
+# in the shape returned by the API.
+_ORDERS_PAGE_RETURN = """
+MATCH (c:Cliente)-[:REALIZO]->(o)
 OPTIONAL MATCH (o)-[r:CONTIENE]->(p:Producto)-[:PERTENECE_A]->(cat:Categoria)
-RETURN 
-    o.id AS orden_id,
+WITH o, c, collect(CASE WHEN p IS NULL THEN NULL ELSE {
+    producto_id: p.id,
+    producto_nombre: p.nombre,
+    categoria_id: cat.id,
+    categoria: cat.nombre,
+    cantidad: r.cantidad,
+    precio_unit: r.precio_unit,
+    subtotal: r.cantidad * r.precio_unit
+} END) AS items
+RETURN
+    o.id AS id,
     o.fecha AS fecha,
     o.canal AS canal,
     o.moneda AS moneda,
     o.total AS total,
-    c.id AS cliente_id,
-    c.nombre AS cliente_nombre,
-    c.genero AS genero,
-    c.pais AS pais,
-    p.id AS producto_id,
-    p.nombre AS producto_nombre,
-    cat.id AS categoria_id,
-    cat.nombre AS categoria,
-    r.cantidad AS cantidad,
-    r.precio_unit AS precio_unit,
-    (r.cantidad * r.precio_unit) AS subtotal
-ORDER BY o.fecha ASC;
+    {id: c.id, nombre: c.nombre, genero: c.genero, pais: c.pais} AS cliente,
+    items
+ORDER BY o.fecha ASC, o.id ASC;
 """
 
+readOrdersQuery = (
+    """
+MATCH (o:Orden)
+WHERE o.fecha IS NOT NULL AND EXISTS { (:Cliente)-[:REALIZO]->(o) }
+WITH o
+ORDER BY o.fecha ASC, o.id ASC
+SKIP $skip
+LIMIT $limit
+"""
+    + _ORDERS_PAGE_RETURN
+)
 
-readOrderByIdQuery = """
-MATCH (c:Cliente)-[:REALIZO]->(o:Orden {id: $id})-[r:CONTIENE]->(p:Producto)-[:PERTENECE_A]->(cat:Categoria)
-RETURN 
-  o.id AS orden_id,
-  o.fecha AS fecha,
-  o.canal AS canal,
-  o.moneda AS moneda,
-  o.total AS total,
-  c.id AS cliente_id,
-  c.nombre AS cliente_nombre,
-  c.genero AS genero,
-  c.pais AS pais,
-  p.id AS producto_id,
-  p.nombre AS producto_nombre,
-  cat.id AS categoria_id,
-  cat.nombre AS categoria,
-  r.cantidad AS cantidad,
-  r.precio_unit AS precio_unit,
-  (r.cantidad * r.precio_unit) AS subtotal
-ORDER BY o.fecha ASC;
+# Keyset page: orders strictly after ($after_fecha, $after_id)
+readOrdersAfterQuery = (
+    """
+MATCH (o:Orden)
+WHERE o.fecha >= datetime($after_fecha)
+  AND (o.fecha > datetime($after_fecha) OR o.id > $after_id)
+  AND EXISTS { (:Cliente)-[:REALIZO]->(o) }
+WITH o
+ORDER BY o.fecha ASC, o.id ASC
+LIMIT $limit
 """
+    + _ORDERS_PAGE_RETURN
+)
+
+
+readOrderByIdQuery = (
+    """
+MATCH (o:Orden {id: $id})
+"""
+    + _ORDERS_PAGE_RETURN
+)
 
 deleteOrderQuery = """
 MATCH (o:Orden {id: $id})
 DETACH DELETE o;
 """
 
-getLastId = """
-MATCH (o:Orden)
-WHERE o.id =~ 'ORD-\\d+' OR o.id =~ 'O\\d+'
-RETURN o.id AS last_id,
-CASE
-    WHEN o.id STARTS WITH 'ORD-' THEN toInteger(replace(o.id, 'ORD-', ''))
-    WHEN o.id STARTS WITH 'O' THEN toInteger(substring(o.id, 1))
-    ELSE 0
-END AS numeric_id
-ORDER BY numeric_id DESC
-LIMIT 1
+# Crea el contador de órdenes si no existe, arrancando en el mayor número ya
+# usado, tanto en ids 'ORD-NNNNNN' como en los antiguos 'ONNN'. Solo recorre las
+# órdenes la primera vez.
+ensureOrderSequenceQuery = """
+OPTIONAL MATCH (seq:Secuencia {nombre: 'orden'})
+WITH seq
+CALL {
+    WITH seq
+    WITH seq WHERE seq IS NULL
+    MATCH (o:Orden)
+    WHERE o.id =~ 'ORD-\\d+' OR o.id =~ 'O\\d+'
+    RETURN max(toInteger(CASE
+        WHEN o.id STARTS WITH 'ORD-' THEN substring(o.id, 4)
+        ELSE substring(o.id, 1)
+    END)) AS ultimo
+}
+MERGE (s:Secuencia {nombre: 'orden'})
+ON CREATE SET s.valor = coalesce(ultimo, 0)
+RETURN s.valor AS valor
+"""
+
+orderSequenceExistsQuery = """
+MATCH (s:Secuencia {nombre: 'orden'})
+RETURN s.valor AS valor
+LIMIT 1;
 """
 
 clientExistsQuery = """
-MATCH (c:Cliente)
-WHERE toString(c.id) = toString($cliente_id)
+MATCH (c:Cliente {id: $cliente_id})
 RETURN c.id AS id
 LIMIT 1;
 """
 
 productsExistQuery = """
 UNWIND $producto_ids AS pid
-MATCH (p:Producto)
-WHERE toString(p.id) = toString(pid)
-RETURN collect(DISTINCT toString(p.id)) AS found_ids;
+MATCH (p:Producto {id: pid})
+RETURN collect(DISTINCT p.id) AS found_ids;
 """
 
 countOrdersQuery = """
@@ -144,54 +178,90 @@ MATCH (o:Orden)
 RETURN count(DISTINCT o.id) AS total;
 """
 
+# Answered from the count store (no node scan)
+countOrdersEstimatedQuery = """
+MATCH (o:Orden)
+RETURN count(o) AS total;
+"""
+
 
 # --------------------------------------------------
 # Class for CRUD operations on Orders
 # --------------------------------------------------
 class OrderRepository:
     @staticmethod
-    def create_order(id, cliente_id, fecha, canal, moneda, total, items):
-        """Crea una orden sin retornar resultados complejos"""
+    def create_order(cliente_id, fecha, canal, moneda, total, items):
+        """Crea una orden con el siguiente id de la secuencia y lo retorna
+        (None si no se pudo crear).
+
+        Si el contador (:Secuencia {nombre: 'orden'}) no existe, la creación
+        no hace nada; en ese caso se vuelve a crear con
+        ensureOrderSequenceQuery y se reintenta una vez."""
         if isinstance(fecha, datetime):
             fecha = fecha.isoformat()
         elif isinstance(fecha, date):
             fecha = datetime(fecha.year, fecha.month, fecha.day).isoformat()
 
+        params = dict(
+            cliente_id=cliente_id,
+            fecha=fecha,
+            canal=canal,
+            moneda=moneda,
+            total=total,
+            items=items,
+        )
         try:
             with driver.session() as session:
-                result = session.run(
-                    createOrderQuery,
-                    id=id,
-                    cliente_id=cliente_id,
-                    fecha=fecha,
-                    canal=canal,
-                    moneda=moneda,
-                    total=total,
-                    items=items,
-                )
+                record = session.run(createOrderQuery, **params).single()
+                if record:
+                    return record["orden_id"]
 
-                summary = result.consume()
-                return summary.counters.nodes_created > 0
+                # Sin fila: o falta el contador (no se creó nada) o falló otra
+                # parte de la orden; solo el primer caso se reintenta
+                if session.run(orderSequenceExistsQuery).single() is not None:
+                    return None
+
+                logger.warning(
+                    "Order sequence node is missing; recreating it and retrying"
+                )
+                session.execute_write(
+                    lambda tx: tx.run(ensureOrderSequenceQuery).single()
+                )
+                record = session.run(createOrderQuery, **params).single()
+                return record["orden_id"] if record else None
 
         except Exception:
             logger.exception("Error in create_order")
-            return False
+            return None
 
     @staticmethod
-    def read_orders(skip: int = 0, limit: int = 20):
+    def read_orders(skip: int = 0, limit: int = 20, after=None):
+        """One page of orders (one dict per order, items nested); `after` is
+        the (fecha, id) of the last order of the previous page."""
         with driver.session() as session:
             try:
-                result = session.run(readOrdersQuery, skip=skip, limit=limit)
+                if after is not None:
+                    result = session.run(
+                        readOrdersAfterQuery,
+                        after_fecha=after[0],
+                        after_id=after[1],
+                        limit=limit,
+                    )
+                else:
+                    result = session.run(readOrdersQuery, skip=skip, limit=limit)
                 return [record.data() for record in result]
             except Exception:
                 logger.exception("Error in read_orders")
                 return []
 
     @staticmethod
-    def count_orders() -> int:
+    def count_orders(exact: bool = True) -> int:
+        """Exact count of distinct order ids, or the count-store total of
+        :Orden nodes when `exact` is False."""
+        query = countOrdersQuery if exact else countOrdersEstimatedQuery
         with driver.session() as session:
             try:
-                result = session.run(countOrdersQuery)
+                result = session.run(query)
                 record = result.single()
                 return (
                     int(record["total"])
@@ -204,14 +274,16 @@ class OrderRepository:
 
     @staticmethod
     def read_order_by_id(order_id):
+        """La orden con sus items anidados, o None si no existe."""
         with driver.session() as session:
             try:
                 result = session.run(readOrderByIdQuery, id=order_id)
-                # Convertir a lista DENTRO de la sesión
-                return [record.data() for record in result]
+                # Leer el registro DENTRO de la sesión
+                record = result.single()
+                return record.data() if record else None
             except Exception:
                 logger.exception("Error in read_order_by_id")
-                return []
+                return None
 
     @staticmethod
     def delete_order(id):
@@ -254,13 +326,13 @@ class OrderRepository:
             return False
 
     @staticmethod
-    def get_last_order_id():
-        """Obtiene el último ID de orden numéricamente"""
-
+    def ensure_order_sequence() -> int:
+        """Crea el contador de órdenes si falta y retorna su valor actual."""
         with driver.session() as session:
-            result = session.run(getLastId)
-            record = result.single()
-            return record["last_id"] if record else None
+            record = session.execute_write(
+                lambda tx: tx.run(ensureOrderSequenceQuery).single()
+            )
+            return int(record["valor"])
 
     @staticmethod
     def client_exists(cliente_id: str) -> bool:
@@ -8,7 +8,9 @@ router = APIRouter(prefix="/orders", tags=["Orders"])
 
 @router.get("/", summary="List all orders")
 def list_orders(params: OrdersPagination = Depends()) -> Any:
-    return OrdersController.get_all_orders(skip=params.skip, limit=params.limit)
+    return OrdersController.get_all_orders(
+        skip=params.skip, limit=params.limit, after=params.after, exact=params.exact
+    )
 
 
 @router.get("/{order_id}", summary="Get order by ID")
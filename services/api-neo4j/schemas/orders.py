@@ -56,6 +56,10 @@ class Item(BaseModel):
 class OrdersPagination(BaseModel):
     skip: int = 0
     limit: int = 20
+    # Cursor `next_after` of the previous page; when present, skip is ignored
+    after: Optional[str] = None
+    # Total exacto en lugar del estimado (count store)
+    exact: bool = False
 
 
 # --- ORDER  ---
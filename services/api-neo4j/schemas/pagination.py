@@ -0,0 +1,34 @@
+"""
+Opaque keyset cursors for the order listings.
+
+A cursor encodes the sort key of the last order of a page, (fecha, id), as
+url-safe base64 JSON. The next page starts right after that key using an
+index range instead of skipping rows, so every page costs the same and
+concurrent inserts do not shift the page boundaries.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(fecha: Any, order_id: Any) -> str:
+    """Cursor pointing right after the order with this (fecha, id)."""
+    if isinstance(fecha, datetime):
+        fecha = fecha.isoformat()
+    payload = json.dumps({"f": fecha, "id": str(order_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[str, str]:
+    """(fecha ISO string, id) of a cursor; invalid cursors are a 400."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return str(payload["f"]), str(payload["id"])
+    except (binascii.Error, ValueError, UnicodeError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid 'after' cursor") from None
@@ -0,0 +1,92 @@
+"""
+Order listing latency: fn_listar_ordenes RPC vs the REST fallback.
+
+Times the same pages against the configured Supabase project through both
+repository paths: one async POST /rpc/fn_listar_ordenes on the pooled client,
+and the synchronous count + `orden` + `orden_completa` requests. The count
+cache is cleared before every call so both paths include the total, unless
+--cached-total is given. Only reads, nothing is written.
+
+Usage (from services/api-supabase, with SUPABASE_* in .env):
+    uv run python -m benchmarks.list_orders
+    uv run python -m benchmarks.list_orders --limit 50 --runs 100
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from config.count_cache import orders_count_cache
+from config.database import create_rest_client
+from repositories.orders import _get_orders_rest, _get_orders_rpc
+from schemas.pagination import decode_cursor
+
+
+async def time_path(name, call, runs: int, cached_total: bool):
+    """Latencies (ms) of `runs` calls to `call()`."""
+    await call()  # conexiones y plan cache
+    latencias = []
+    for _ in range(runs):
+        if not cached_total:
+            orders_count_cache.invalidate()
+        inicio = time.perf_counter()
+        page = await call()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if "error" in page:
+            raise RuntimeError(f"{name}: {page['error']}")
+    return sorted(latencias)
+
+
+async def run(limit: int, offset: int, runs: int, cached_total: bool) -> None:
+    rest_client = create_rest_client()
+    try:
+        # Clave de la primera página para medir también el modo keyset
+        first = await _get_orders_rpc(rest_client, 0, limit)
+        after = decode_cursor(first["next_after"]) if first["next_after"] else None
+
+        cases = [
+            ("rpc offset", lambda: _get_orders_rpc(rest_client, offset, limit)),
+            ("rest offset", lambda: asyncio.to_thread(_get_orders_rest, offset, limit)),
+        ]
+        if after is not None:
+            cases += [
+                ("rpc after", lambda: _get_orders_rpc(rest_client, 0, limit, after)),
+                (
+                    "rest after",
+                    lambda: asyncio.to_thread(_get_orders_rest, 0, limit, after),
+                ),
+            ]
+
+        print(
+            f"limit={limit} offset={offset} runs={runs} cached_total={cached_total}\n"
+        )
+        print(f"{'path':>12} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for name, call in cases:
+            lat = await time_path(name, call, runs, cached_total)
+            p90 = lat[min(len(lat) - 1, round(0.90 * (len(lat) - 1)))]
+            p99 = lat[min(len(lat) - 1, round(0.99 * (len(lat) - 1)))]
+            print(
+                f"{name:>12} {statistics.median(lat):>9.1f} {p90:>9.1f} {p99:>9.1f} {lat[-1]:>9.1f}"
+            )
+    finally:
+        await rest_client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="api-supabase order listing latency")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument(
+        "--cached-total",
+        action="store_true",
+        help="Keep the total cached between calls.",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run(args.limit, args.offset, args.runs, args.cached_total))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,101 @@
 from supabase import create_client
 from dotenv import load_dotenv
+from fastapi import HTTPException, Request
 from typing import Generator
+import httpx
 import pyodbc
 import os
 
+from config.dw_pool import DWConnectionPool, PoolClosedError, PoolTimeoutError
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# DW connection pool
+MSSQL_DW_POOL_SIZE = int(os.getenv("MSSQL_DW_POOL_SIZE", "10"))
+MSSQL_DW_POOL_MIN = int(os.getenv("MSSQL_DW_POOL_MIN", "2"))
+MSSQL_DW_POOL_TIMEOUT = float(os.getenv("MSSQL_DW_POOL_TIMEOUT", "5"))
+MSSQL_DW_POOL_HEALTHCHECK = float(os.getenv("MSSQL_DW_POOL_HEALTHCHECK", "30"))
+
+# Cliente HTTP asíncrono hacia PostgREST (listado de órdenes por RPC)
+SUPABASE_HTTP_POOL_SIZE = int(os.getenv("SUPABASE_HTTP_POOL_SIZE", "20"))
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "10"))
+# false -> el listado usa siempre las consultas REST (count + orden + orden_completa)
+SUPABASE_ORDERS_RPC = os.getenv("SUPABASE_ORDERS_RPC", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("Missing Supabase credentials in environment variables")
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 
-def get_mssql_connection() -> Generator:
-    connection = None
+def _mssql_connection_string() -> str:
+    server = os.getenv("MSSQL_DW_HOST", "localhost")
+    database = os.getenv("MSSQL_DW_DB", "your_database")
+    username = os.getenv("MSSQL_DW_USER", "your_username")
+    password = os.getenv("MSSQL_DW_PASS", "your_password")
+    port = os.getenv("MSSQL_DW_PORT", "1433")
+    driver = os.getenv("DB_DRIVER", "{ODBC Driver 18 for SQL Server}")
+
+    # TrustServerCertificate=yes is required for self-signed certificates
+    return f"DRIVER={driver};SERVER={server},{port};DATABASE={database};UID={username};PWD={password};TrustServerCertificate=yes"
+
+
+def connect_mssql() -> pyodbc.Connection:
+    return pyodbc.connect(_mssql_connection_string())
+
+
+def create_dw_pool() -> DWConnectionPool:
+    """Create the DW pool and pre-open its minimum connections."""
+    pool = DWConnectionPool(
+        connect_mssql,
+        max_size=MSSQL_DW_POOL_SIZE,
+        min_size=MSSQL_DW_POOL_MIN,
+        timeout=MSSQL_DW_POOL_TIMEOUT,
+        health_check_after=MSSQL_DW_POOL_HEALTHCHECK,
+    )
     try:
-        server = os.getenv("MSSQL_DW_HOST", "localhost")
-        database = os.getenv("MSSQL_DW_DB", "your_database")
-        username = os.getenv("MSSQL_DW_USER", "your_username")
-        password = os.getenv("MSSQL_DW_PASS", "your_password")
-        port = os.getenv("MSSQL_DW_PORT", "1433")
-        driver = os.getenv("DB_DRIVER", "{ODBC Driver 18 for SQL Server}")
-
-        # TrustServerCertificate=yes is required for self-signed certificates
-        connection_string = f"DRIVER={driver};SERVER={server},{port};DATABASE={database};UID={username};PWD={password};TrustServerCertificate=yes"
-
-        # Crear conexión
-        connection = pyodbc.connect(connection_string)
-        yield connection
-
-    finally:
-        if connection:
-            connection.close()
+        pool.open()
+    except pyodbc.Error as e:
+        # The DW may come up after the API; connections are opened on demand
+        print(f"⚠️ No se pudo pre-abrir el pool del DW: {e}")
+    return pool
+
+
+def get_mssql_connection(request: Request) -> Generator:
+    """FastAPI dependency: borrow a DW connection from the app pool."""
+    pool: DWConnectionPool = request.app.state.dw_pool
+    try:
+        with pool.connection() as connection:
+            yield connection
+    except (PoolTimeoutError, PoolClosedError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def create_rest_client() -> httpx.AsyncClient:
+    """Keep-alive client for PostgREST RPCs, shared by the whole app."""
+    return httpx.AsyncClient(
+        base_url=f"{SUPABASE_URL.rstrip('/')}/rest/v1",
+        headers={
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        },
+        limits=httpx.Limits(
+            max_connections=SUPABASE_HTTP_POOL_SIZE,
+            max_keepalive_connections=SUPABASE_HTTP_POOL_SIZE,
+        ),
+        timeout=SUPABASE_HTTP_TIMEOUT,
+    )
+
+
+def get_rest_client(request: Request) -> httpx.AsyncClient:
+    """FastAPI dependency: the app's pooled PostgREST client."""
+    return request.app.state.rest_client
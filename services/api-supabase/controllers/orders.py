@@ -1,13 +1,25 @@
 from schemas.orders import Order
 from repositories.orders import OrderRepository
+from schemas.pagination import decode_cursor
 from pydantic import ValidationError
+from typing import Optional
 
 
 class OrdersController:
     @staticmethod
-    def get_all_orders(offset: int = 0, limit: int = 10):
+    async def get_all_orders(
+        rest_client=None,
+        offset: int = 0,
+        limit: int = 10,
+        after: Optional[str] = None,
+        exact: bool = False,
+    ):
+        # Cursor inválido -> 400
+        key = decode_cursor(after) if after else None
         try:
-            orders = OrderRepository.get_orders(offset=offset, limit=limit)
+            orders = await OrderRepository.get_orders(
+                rest_client, offset=offset, limit=limit, after=key, exact=exact
+            )
             return orders
         except Exception as e:
             print("❌ Error en OrdersController.get_all_orders:", e)
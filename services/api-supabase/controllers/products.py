@@ -1,5 +1,6 @@
 from typing import Dict, List, Any
 import pyodbc
+from config.recommendation_cache import recommendation_cache
 from repositories.products import productsRepository
 
 products_repository = productsRepository()
@@ -27,9 +28,14 @@ class ProductsController:
             if not skus_string.strip():
                 return {"rules": [], "count": 0}
 
-            # Ejecutar stored procedure PASANDO ambos parámetros
-            rules = products_repository.get_consequents_by_skus(
-                db_connection, skus_string
+            # Misma canasta (en cualquier orden) -> misma entrada de caché
+            rules = recommendation_cache.get_or_load(
+                "consequents",
+                skus,
+                db_connection,
+                lambda canasta: products_repository.get_consequents_by_skus(
+                    db_connection, canasta
+                ),
             )
 
             return {"rules": rules, "count": len(rules)}
@@ -52,11 +58,31 @@ class ProductsController:
                     "count": 0,
                 }  # Corregido: retornar estructura consistente
 
-            mappings = products_repository.get_skus_by_code_supabase(
-                db_connection, codigos_string
+            mappings = recommendation_cache.get_or_load(
+                "codigos",
+                codes_supabase,
+                db_connection,
+                lambda codigos: products_repository.get_skus_by_code_supabase(
+                    db_connection, codigos
+                ),
             )
 
             return {"mappings": mappings, "count": len(mappings)}
 
         except Exception as e:
             raise Exception(f"Error al obtener SKUs: {str(e)}")
+
+    @staticmethod
+    def warm_up_recommendations(db_connection: pyodbc.Connection, top_n: int) -> int:
+        """Preload the cache with the `top_n` most frequent antecedents."""
+        antecedents = products_repository.get_top_antecedents(db_connection, top_n)
+        for antecedent in antecedents:
+            recommendation_cache.get_or_load(
+                "consequents",
+                antecedent.split(","),
+                db_connection,
+                lambda canasta: products_repository.get_consequents_by_skus(
+                    db_connection, canasta
+                ),
+            )
+        return len(antecedents)
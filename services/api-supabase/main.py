@@ -1,7 +1,13 @@
 import os
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from config.database import get_mssql_connection
+from config.database import create_dw_pool, create_rest_client
+from config.recommendation_cache import (
+    RECOMMENDATION_CACHE_WARMUP,
+    recommendation_cache,
+)
+from controllers.products import ProductsController
 from routes.orders import router as orders_router
 from routes.clients import router as clients_router
 from routes.products import router as products_router
@@ -20,19 +26,40 @@ app.add_middleware(
 )
 
 
+def _warm_up_recommendations(dw_pool) -> int:
+    with dw_pool.connection() as connection:
+        return ProductsController.warm_up_recommendations(
+            connection, RECOMMENDATION_CACHE_WARMUP
+        )
+
+
 @app.on_event("startup")
 async def startup_event():
-    app.state.mssql_connection = get_mssql_connection()
+    # pooled async HTTP client for the order listing RPC
+    app.state.rest_client = create_rest_client()
+    # bounded pool of DW connections for the recommendation endpoints
+    app.state.dw_pool = await run_in_threadpool(create_dw_pool)
+    if RECOMMENDATION_CACHE_WARMUP > 0:
+        try:
+            cargadas = await run_in_threadpool(
+                _warm_up_recommendations, app.state.dw_pool
+            )
+            print(f"✅ Caché de recomendaciones precargada con {cargadas} canastas")
+        except Exception as e:
+            print(f"⚠️ No se pudo precargar la caché de recomendaciones: {e}")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    mssql_connection = getattr(app.state, "mssql_connection", None)
-    if mssql_connection:
+    dw_pool = getattr(app.state, "dw_pool", None)
+    if dw_pool:
         try:
-            mssql_connection.close()
+            dw_pool.close()
         except Exception:
             pass
+    rest_client = getattr(app.state, "rest_client", None)
+    if rest_client:
+        await rest_client.aclose()
 
 
 # Include routers (each router can have its own prefix)
@@ -46,6 +73,16 @@ async def root():
     return {"message": "Ready Supabase"}
 
 
+@app.get("/health/dw-pool", tags=["Root"])
+async def dw_pool_metrics():
+    return app.state.dw_pool.metrics()
+
+
+@app.get("/health/recommendation-cache", tags=["Root"])
+async def recommendation_cache_stats():
+    return recommendation_cache.stats()
+
+
 def run_dev():
     import uvicorn
 
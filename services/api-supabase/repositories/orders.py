@@ -1,9 +1,16 @@
-from config.database import supabase
+from config.database import SUPABASE_ORDERS_RPC, supabase
+from config.count_cache import ESTIMATED, EXACT, orders_count_cache
+from schemas.pagination import encode_cursor
 from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
 from postgrest import APIError as PostgrestAPIError
-from typing import Any, Optional
+from typing import Any, List, Optional, Tuple
+import httpx
 import json
 
+# False tras un 404 de PostgREST: fn_listar_ordenes no está desplegada
+_orders_rpc_available = True
+
 
 # --------------------------------------------------
 # Helpers
@@ -103,12 +110,14 @@ def create_order(canal, cliente_id, fecha, items, moneda):
         ).execute()
 
         data = _normalize_rpc_data(response.data)
+        orders_count_cache.adjust(+1)
 
         print("✅ Orden creada:", data)
         return data
     except PostgrestAPIError as e:
         parsed = _extract_success_from_error(e)
         if parsed:
+            orders_count_cache.adjust(+1)
             print("✅ Orden creada:", parsed)
             return parsed
         print("❌ Error al crear orden:", e)
@@ -148,6 +157,7 @@ def delete_order(p_orden_id):
         response = supabase.rpc(
             "fn_eliminar_orden", {"p_orden_id": p_orden_id}
         ).execute()
+        orders_count_cache.adjust(-1)
 
         print("✅ Orden eliminada:", response.data)
         return response.data
@@ -203,28 +213,77 @@ def _map_items_by_order(order_ids):
         return {oid: [] for oid in order_ids}, {}
 
 
-def _count_orders_total():
+def _count_orders_total(exact: bool = False):
+    """
+    Total de órdenes, cacheado. Por defecto usa count="estimated" (exacto en
+    tablas pequeñas, estadísticas del planner en las grandes); exact=True
+    fuerza el COUNT(*).
+    """
+    key = EXACT if exact else ESTIMATED
+    cached = orders_count_cache.get(key)
+    if cached is not None:
+        return cached
     try:
         response = (
-            supabase.table("orden").select("orden_id", count="exact").limit(1).execute()
+            supabase.table("orden")
+            .select("orden_id", count="exact" if exact else "estimated")
+            .limit(1)
+            .execute()
         )
-        return response.count or 0
+        total = response.count or 0
+        orders_count_cache.set(key, total)
+        return total
     except Exception as e:
         print("❌ Error obteniendo total de órdenes:", e)
         return 0
 
 
-def get_orders(offset: int = 0, limit: int = 10):
+def _orders_page(orders: List[dict], offset: int, limit: int, total: int, exact: bool):
+    # Cursor de la siguiente página (None en la última)
+    next_after = (
+        encode_cursor(orders[-1]["fecha"], orders[-1]["orden_id"])
+        if len(orders) == limit
+        else None
+    )
+
+    return {
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "total_exact": exact,
+        "count": len(orders),
+        "next_after": next_after,
+        "data": orders,
+    }
+
+
+def _get_orders_rest(
+    offset: int = 0,
+    limit: int = 10,
+    after: Optional[Tuple[str, str]] = None,
+    exact: bool = False,
+):
+    """
+    Fallback path: total, page of `orden` and `orden_completa` items as three
+    separate (synchronous) PostgREST requests.
+    """
     try:
-        total_orders = _count_orders_total()
+        total_orders = _count_orders_total(exact)
 
-        orders_response = (
+        query = (
             supabase.table("orden")
             .select("orden_id, fecha, canal, moneda, total, cliente_id")
             .order("fecha", desc=True)
-            .range(offset, offset + limit - 1)
-            .execute()
+            .order("orden_id", desc=True)
         )
+        if after is not None:
+            fecha, orden_id = after
+            query = query.or_(
+                f'fecha.lt."{fecha}",and(fecha.eq."{fecha}",orden_id.lt.{orden_id})'
+            ).limit(limit)
+        else:
+            query = query.range(offset, offset + limit - 1)
+        orders_response = query.execute()
 
         order_rows = orders_response.data or []
         order_ids = [row.get("orden_id") for row in order_rows if row.get("orden_id")]
@@ -261,22 +320,91 @@ def get_orders(offset: int = 0, limit: int = 10):
             f"✅ Órdenes obtenidas: {len(orders)} (offset={offset}, limit={limit}, total={total_orders})"
         )
 
-        return {
-            "offset": offset,
-            "limit": limit,
-            "total": total_orders,
-            "count": len(orders),
-            "data": orders,
-        }
+        return _orders_page(orders, offset, limit, total_orders, exact)
     except Exception as e:
         print("❌ Error en OrderRepository.get_orders:", e)
         return {"error": str(e)}
 
 
+async def _get_orders_rpc(
+    rest_client: httpx.AsyncClient,
+    offset: int = 0,
+    limit: int = 10,
+    after: Optional[Tuple[str, str]] = None,
+    exact: bool = False,
+):
+    """
+    One POST /rpc/fn_listar_ordenes returning the page with client and items
+    nested, plus the estimated total when it is not cached. An exact total
+    still comes from _count_orders_total (cached as well).
+    """
+    key = EXACT if exact else ESTIMATED
+    total_orders = orders_count_cache.get(key)
+    if exact and total_orders is None:
+        total_orders = await run_in_threadpool(_count_orders_total, True)
+
+    payload = {
+        "p_limit": limit,
+        "p_offset": offset,
+        "p_con_total": total_orders is None,
+    }
+    if after is not None:
+        payload["p_after_fecha"], payload["p_after_id"] = after
+
+    response = await rest_client.post("/rpc/fn_listar_ordenes", json=payload)
+    response.raise_for_status()
+    page = response.json()
+
+    if total_orders is None:
+        total_orders = int(page.get("total") or 0)
+        orders_count_cache.set(ESTIMATED, total_orders)
+
+    orders = page.get("data") or []
+    print(
+        f"✅ Órdenes obtenidas (rpc): {len(orders)} (offset={offset}, limit={limit}, total={total_orders})"
+    )
+    return _orders_page(orders, offset, limit, total_orders, exact)
+
+
+async def get_orders(
+    rest_client: Optional[httpx.AsyncClient],
+    offset: int = 0,
+    limit: int = 10,
+    after: Optional[Tuple[str, str]] = None,
+    exact: bool = False,
+):
+    """
+    Orders newest first, ordered by (fecha, orden_id) DESC (ix_orden_fecha_id).
+    With `after` (fecha, orden_id of the last order seen) the page starts right
+    after it with an index range; otherwise `offset` is applied.
+
+    Uses fn_listar_ordenes (one round trip) and falls back to the REST queries
+    if the RPC is disabled, not deployed or fails.
+    """
+    global _orders_rpc_available
+    if SUPABASE_ORDERS_RPC and _orders_rpc_available and rest_client is not None:
+        try:
+            return await _get_orders_rpc(rest_client, offset, limit, after, exact)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                _orders_rpc_available = False
+            print("⚠️ fn_listar_ordenes falló, usando consultas REST:", e)
+        except (httpx.HTTPError, ValueError) as e:
+            print("⚠️ fn_listar_ordenes falló, usando consultas REST:", e)
+
+    return await run_in_threadpool(_get_orders_rest, offset, limit, after, exact)
+
+
 class OrderRepository:
     @staticmethod
-    def get_orders(offset: int = 0, limit: int = 10):
-        return get_orders(offset, limit)
+    async def get_orders(
+        rest_client=None,
+        offset: int = 0,
+        limit: int = 10,
+        after=None,
+        exact: bool = False,
+    ):
+        return await get_orders(rest_client, offset, limit, after, exact)
 
     @staticmethod
     def create_order(canal, cliente_id, fecha, items, moneda):
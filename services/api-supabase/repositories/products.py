@@ -55,6 +55,27 @@ class productsRepository:
         except Exception as e:
             raise Exception(f"Error inesperado: {str(e)}")
 
+    @staticmethod
+    def get_top_antecedents(db_connection: pyodbc.Connection, limit: int) -> List[str]:
+        """Antecedents of the strongest rules, used to warm up the cache."""
+        try:
+            cursor = db_connection.cursor()
+            cursor.execute(
+                """
+                SELECT TOP (?) Antecedent
+                FROM analytics.AssociationRules
+                GROUP BY Antecedent
+                ORDER BY MAX(Support) DESC
+                """,
+                limit,
+            )
+            antecedents = [row.Antecedent for row in cursor.fetchall()]
+            cursor.close()
+            return antecedents
+
+        except pyodbc.Error as e:
+            raise Exception(f"Error obteniendo antecedentes: {str(e)}")
+
     @staticmethod
     def get_skus_by_code_supabase(
         db_connection: pyodbc.Connection, codes_list: str
@@ -1,5 +1,6 @@
-from typing import Any
-from fastapi import APIRouter, status, Query
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, status, Query
+from config.database import get_rest_client
 from controllers.orders import OrdersController
 from schemas.orders import Order
 
@@ -7,11 +8,18 @@ router = APIRouter(prefix="/orders", tags=["Orders"])
 
 
 @router.get("/", summary="List all orders with pagination")
-def list_orders(
+async def list_orders(
     offset: int = Query(0, description="Starting index of records (default: 0)"),
     limit: int = Query(10, description="Number of records to return (default: 10)"),
+    after: Optional[str] = Query(
+        None, description="Cursor `next_after` of the previous page (ignores offset)"
+    ),
+    exact: bool = Query(False, description="Exact total instead of the estimate"),
+    rest_client=Depends(get_rest_client),
 ) -> Any:
-    return OrdersController.get_all_orders(offset=offset, limit=limit)
+    return await OrdersController.get_all_orders(
+        rest_client, offset=offset, limit=limit, after=after, exact=exact
+    )
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, summary="Create a new order")
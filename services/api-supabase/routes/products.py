@@ -1,5 +1,6 @@
 from typing import Any
 from fastapi import APIRouter, Query, Depends
+from fastapi.concurrency import run_in_threadpool
 from controllers.products import ProductsController
 from config.database import get_mssql_connection
 import pyodbc
@@ -21,7 +22,10 @@ async def get_consequents_by_skus_endpoint(
     # Convertir el string de SKUs separados por coma a lista
     skus_list = [sku.strip() for sku in skus.split(",") if sku.strip()]
 
-    return ProductsController.get_consequents_by_skus(skus_list, db_connection)
+    # pyodbc es bloqueante: se ejecuta fuera del event loop
+    return await run_in_threadpool(
+        ProductsController.get_consequents_by_skus, skus_list, db_connection
+    )
 
 
 @router.get("/by-codigos-supabase")
@@ -31,4 +35,6 @@ async def get_products_by_codigos_supabase_endpoint(
 ) -> Any:
     # Convertir el string de SKUs separados por coma a lista
     skus_list = [sku.strip() for sku in skus.split(",") if sku.strip()]
-    return ProductsController.get_skus_by_codes_supabase(skus_list, db_connection)
+    return await run_in_threadpool(
+        ProductsController.get_skus_by_codes_supabase, skus_list, db_connection
+    )